@@ -1,3 +1,14 @@
 __author__ = 'psebek'
 
-from pypete.pypete import Pypete
+from pypete.concurrency import concurrent
+from pypete.discovery import benchmark
+from pypete.scaling import complexity
+from pypete.sections import section, timed_section
+
+
+def __getattr__(name):
+    # plugin is imported lazily, so isolated interpreters do not import nose
+    if name == 'Pypete':
+        from pypete.pypete import Pypete
+        return Pypete
+    raise AttributeError("module 'pypete' has no attribute '{0}'".format(name))
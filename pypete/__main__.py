@@ -0,0 +1,5 @@
+from pypete.cli import main
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+"""
+Benchmarking of coroutine tests. Test written as ``async def`` is awaited on
+one event loop reused by all experiments, so creation of loop is not
+measured. Every call either awaits the test once or gathers ``tasks``
+concurrent runs of it.
+"""
+from __future__ import division
+import asyncio
+import functools
+import inspect
+import os
+import time
+import unittest
+
+from pypete.case import test_function
+from pypete.timers import gc_control
+
+
+LOOPS = ('asyncio', 'uvloop')
+
+
+def is_coroutine_test(case):
+    """
+    Return whether test function of case is coroutine function
+    :param case: unittest or nose test case
+    :return: bool
+    """
+    return inspect.iscoroutinefunction(test_function(case))
+
+
+def test_coroutine(case):
+    """
+    Return function creating coroutine of test with its arguments bound
+    :param case: unittest or nose test case
+    :return: callable without arguments
+    """
+    return functools.partial(test_function(case), *getattr(case, 'arg', ()))
+
+
+def new_event_loop(kind='asyncio'):
+    """
+    Create event loop of given kind
+    :param kind: one of LOOPS
+    :return: event loop
+    """
+    if kind == 'uvloop':
+        try:
+            import uvloop
+        except ImportError:
+            raise ImportError('uvloop is optional dependency. Download it or don\'t use it')
+        return uvloop.new_event_loop()
+    return asyncio.new_event_loop()
+
+
+class EventLoop(object):
+    """
+    Event loop created with first use and recreated in forked process, as
+    selector of loop must not be shared between processes
+    :param kind: one of LOOPS
+    """
+
+    def __init__(self, kind='asyncio'):
+        self.kind = kind
+        self._loop = None
+        self._pid = None
+
+    def get(self):
+        if self._loop is None or self._pid != os.getpid():
+            self._loop = new_event_loop(self.kind)
+            self._pid = os.getpid()
+        return self._loop
+
+    def __getstate__(self):
+        return {'kind': self.kind, '_loop': None, '_pid': None}
+
+    def run(self, coroutine):
+        return self.get().run_until_complete(coroutine)
+
+    def sync(self, case):
+        """
+        Return callable running one call of coroutine test to completion
+        :param case: unittest or nose test case
+        :return: callable without arguments
+        """
+        call = test_coroutine(case)
+        return lambda: self.run(call())
+
+
+class AsyncCase(unittest.TestCase):
+    """
+    Test case running coroutine test of other case to completion, so that
+    its outcome can be checked
+    """
+
+    def __init__(self, case, loop):
+        super(AsyncCase, self).__init__('runTest')
+        self.case = case
+        self.loop = loop
+
+    def setUp(self):
+        self.case.setUp()
+        if hasattr(self.case, 'asyncSetUp'):
+            self.loop.run(self.case.asyncSetUp())
+
+    def tearDown(self):
+        if hasattr(self.case, 'asyncTearDown'):
+            self.loop.run(self.case.asyncTearDown())
+        self.case.tearDown()
+
+    def runTest(self):
+        self.loop.run(test_coroutine(self.case)())
+
+    def __str__(self):
+        return str(self.case)
+
+
+async def _noop():
+    pass
+
+
+class AsyncTimer(object):
+    """
+    Timer with interface of ``timeit.Timer`` awaiting coroutine test in loop.
+    setUp (and asyncSetUp) runs before and tearDown after every experiment.
+    Overhead of awaiting empty coroutine is subtracted.
+    """
+
+    def __init__(self, case, loop, timer=time.perf_counter, gc_mode='off', tasks=0):
+        self.case = case
+        self.loop = loop
+        self.timer = timer
+        self.gc_mode = gc_mode
+        self.tasks = tasks
+        self.call = test_coroutine(case)
+        self.overhead = None
+
+    async def _calls(self, call, number):
+        timer = self.timer
+        if self.tasks:
+            tasks = range(self.tasks)
+            t0 = timer()
+            for _ in range(number):
+                await asyncio.gather(*[call() for _ in tasks])
+            return timer() - t0
+        t0 = timer()
+        for _ in range(number):
+            await call()
+        return timer() - t0
+
+    async def _experiment(self, number):
+        self.case.setUp()
+        if hasattr(self.case, 'asyncSetUp'):
+            await self.case.asyncSetUp()
+        try:
+            with gc_control(self.gc_mode):
+                return await self._calls(self.call, number)
+        finally:
+            if hasattr(self.case, 'asyncTearDown'):
+                await self.case.asyncTearDown()
+            self.case.tearDown()
+
+    def _overhead(self):
+        if self.overhead is None:
+            calls = 1000
+            self.overhead = min(self.loop.run(self._calls(_noop, calls)) for _ in range(5)) / calls
+        return self.overhead
+
+    def timeit(self, number):
+        overhead = self._overhead()
+        return max(self.loop.run(self._experiment(number)) - number * overhead, 0.0)
+
+    def repeat(self, repeat, number):
+        return [self.timeit(number) for _ in range(repeat)]
@@ -0,0 +1,155 @@
+"""
+Interleaved comparison with baseline git revision. Baseline is checked out to
+temporary git worktree, test is loaded into two isolated interpreters, one
+importing code from the worktree, and their experiments alternate, so changes
+of CPU frequency and background load affect both versions alike.
+"""
+from __future__ import division
+import os
+import sys
+import shutil
+import logging
+import tempfile
+import subprocess
+
+from pypete import stats as statistics
+from pypete.isolate import IsolatedInterpreter
+
+
+log = logging.getLogger('nose.plugins.pypete')
+
+
+class Worktree(object):
+    """
+    Temporary git worktree with baseline revision of repository containing
+    current working directory
+    :param revision: git revision
+    """
+
+    def __init__(self, revision):
+        self.revision = revision
+        self.root = self.git('rev-parse', '--show-toplevel', cwd=os.getcwd())
+        self.path = tempfile.mkdtemp(prefix='pypete-baseline-')
+        try:
+            self.git('worktree', 'add', '--detach', self.path, revision)
+        except Exception:
+            shutil.rmtree(self.path, ignore_errors=True)
+            raise
+
+    def git(self, *args, **kwargs):
+        """
+        Run git command in repository
+        :return: stripped output
+        """
+        cwd = kwargs.get('cwd', getattr(self, 'root', None))
+        try:
+            output = subprocess.check_output(('git',) + args, cwd=cwd, stderr=subprocess.STDOUT)
+        except subprocess.CalledProcessError as e:
+            raise ValueError('git {0} failed: {1}'.format(' '.join(args),
+                                                         e.output.decode('utf-8').strip()))
+        return output.decode('utf-8').strip()
+
+    def map_path(self, path):
+        """
+        Map path inside repository to the same path inside worktree
+        :param path: path
+        :return: path
+        """
+        absolute = os.path.abspath(path or os.curdir)
+        relative = os.path.relpath(absolute, self.root)
+        if relative == os.curdir:
+            return self.path
+        if relative.startswith(os.pardir):
+            return path
+        return os.path.join(self.path, relative)
+
+    def remove(self):
+        try:
+            self.git('worktree', 'remove', '--force', self.path)
+        except ValueError as e:
+            log.warning('Baseline worktree not removed: %s', e)
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def speedup(baseline, candidate):
+    """
+    Speedup of candidate against baseline from paired experiments
+    :param baseline: timing of baseline
+    :param candidate: timing of candidate paired with baseline
+    :return: dict with ratio and its 95% confidence interval, ratio above 1
+        means candidate is faster
+    """
+    ratio, low, high = statistics.ratio_interval(baseline, candidate)
+    return {'ratio': ratio, 'low': low, 'high': high, 'pairs': len(candidate)}
+
+
+class ABComparison(object):
+    """
+    Pair of isolated interpreters, candidate importing current code and
+    baseline importing code from worktree. Interpreters are started with
+    first comparison and reused by following ones. Pair started before fork
+    is used by forked worker too, but only the process that started it
+    restarts or closes it.
+    :param worktree: Worktree with baseline
+    :param pairs: number of pairs of experiments
+    :param core: core the interpreters are pinned to
+    """
+
+    def __init__(self, worktree, pairs=10, core=None):
+        self.worktree = worktree
+        self.pairs = pairs
+        self.core = core
+        self.pid = None
+        self.candidate = None
+        self.baseline = None
+
+    def start(self):
+        """
+        Start interpreters unless they run, interpreters that exited are
+        restarted
+        :return:
+        """
+        if self.pid == os.getpid() and any(interpreter.process.poll() is not None
+                                           for interpreter in (self.candidate, self.baseline)):
+            self.close()
+        if self.candidate is None:
+            self.candidate = IsolatedInterpreter()
+            self.baseline = IsolatedInterpreter([self.worktree.map_path(p) for p in sys.path],
+                                                cwd=self.worktree.map_path(os.getcwd()))
+            if self.core is not None and hasattr(os, 'sched_setaffinity'):
+                for interpreter in (self.candidate, self.baseline):
+                    os.sched_setaffinity(interpreter.process.pid, [self.core])
+            self.pid = os.getpid()
+
+    def compare(self, benchmark, case, number):
+        """
+        Alternate experiments of baseline and candidate, every pair starting
+        with the other one than previous pair
+        :param benchmark: pypete.core.Benchmark
+        :param case: unittest or nose test case
+        :param number: number of calls in one experiment
+        :return: speedup as returned by speedup function
+        """
+        self.start()
+        self.candidate.load(benchmark, case)
+        self.baseline.load(benchmark, case)
+        warmup = benchmark.warmup + 1
+        self.baseline.experiments(number, warmup)
+        self.candidate.experiments(number, warmup)
+        baseline, candidate = [], []
+        for i in range(self.pairs):
+            if i % 2:
+                candidate.extend(self.candidate.experiments(number))
+                baseline.extend(self.baseline.experiments(number))
+            else:
+                baseline.extend(self.baseline.experiments(number))
+                candidate.extend(self.candidate.experiments(number))
+        return speedup(baseline, candidate)
+
+    def close(self):
+        # interpreters of parent process are left to it
+        if self.pid == os.getpid():
+            self.candidate.close()
+            self.baseline.close()
+        self.pid = None
+        self.candidate = self.baseline = None
@@ -0,0 +1,64 @@
+"""
+Helpers for access to parts of unittest and nose test cases
+"""
+import copy
+
+
+def test_function(case):
+    """
+    Return function that is body of given unittest test case
+    :param case: unittest or nose test case
+    :return: function
+    """
+    if type(case).__module__ in ('nose.case', 'pypete.isolate'):
+        # nose MethodTestCase and FunctionTestCase and cases rebuilt in
+        # isolated interpreter keep tested function aside
+        for attr in ('method', 'test'):
+            func = getattr(case, attr, None)
+            if func is not None:
+                return func
+    return getattr(case, case._testMethodName)
+
+
+def test_body(case):
+    """
+    Return callable running only body of test case without setUp, tearDown
+    and unittest result handling
+    :param case: unittest or nose test case
+    :return: callable without arguments
+    """
+    return getattr(case, case._testMethodName)
+
+
+def test_generator(case):
+    """
+    Return generator function that yielded nose test case
+    :param case: unittest or nose test case
+    :return: function or None if case was not yielded by generator
+    """
+    if type(case).__module__ == 'nose.case':
+        return getattr(case, 'descriptor', None)
+    return None
+
+
+def fresh_case(case):
+    """
+    Return new instance of test case, so that state set up for one call does
+    not leak into other calls. Cases of nose test functions and cases rebuilt
+    in isolated interpreter keep no state of their own and are copied, so
+    methods of one test class instance rebuilt in isolated interpreter share
+    it. unittest case whose class can not be created from method name alone
+    is copied too.
+    :param case: unittest or nose test case
+    :return: unittest or nose test case
+    """
+    if type(case).__module__ == 'nose.case' and hasattr(case, 'inst'):
+        # MethodTestCase creates new instance of the test class
+        test = None if getattr(case.test, '__self__', None) is case.inst else case.test
+        return type(case)(case.method, test, case.arg, case.descriptor)
+    if type(case).__module__ in ('nose.case', 'pypete.isolate'):
+        return copy.copy(case)
+    try:
+        return type(case)(case._testMethodName)
+    except TypeError:
+        return copy.copy(case)
@@ -0,0 +1,434 @@
+"""
+Standalone runner started by ``python -m pypete``. It runs benchmarks without
+nose through the same measurement core as the plugin and queries saved
+results:
+
+    python -m pypete run [options] [MODULE|FILE|DIRECTORY ...]
+    python -m pypete compare BASELINE.json CANDIDATE.json
+    python -m pypete history [--limit N] TEST_ID FILE
+
+``run`` is the default command. It caches calibrations, reuses results of
+unchanged benchmarks and checks regressions in results file through the same
+core functions as the plugin. Results files
+are parsed as stream of their top-level items, so large files are never
+loaded whole. ``history`` accepts results file as well as SQLite history
+database. Only modules needed by the command are imported, so queries of
+results start fast.
+"""
+from __future__ import division
+import os
+import sys
+import json
+import optparse
+import traceback
+
+from pypete.history import History, robust_time, update_record
+
+
+COMMANDS = ('run', 'compare', 'history')
+
+_SQLITE_HEADER = b'SQLite format 3\x00'
+
+_WHITESPACE = ' \t\n\r'
+
+_DELIMITERS = _WHITESPACE + ',:]}'
+
+
+class _Reader(object):
+    """
+    Buffered reader of JSON values from text stream
+    """
+
+    def __init__(self, stream, size):
+        self.stream = stream
+        self.size = size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.position = 0
+        self.eof = False
+
+    def more(self, size=None):
+        data = self.stream.read(size or self.size)
+        self.buffer = self.buffer[self.position:] + data
+        self.position = 0
+        self.eof = not data
+        return not self.eof
+
+    def peek(self):
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in _WHITESPACE:
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self.more():
+                raise ValueError('Unexpected end of JSON')
+
+    def expect(self, chars):
+        char = self.peek()
+        if char not in chars:
+            raise ValueError('Expected one of {0!r}, found {1!r}'.format(chars, char))
+        self.position += 1
+        return char
+
+    def value(self):
+        self.peek()
+        # reads grow, so large value is not parsed again too many times
+        size = self.size
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+            except ValueError:
+                if self.eof:
+                    raise
+                self.more(size)
+                size *= 2
+                continue
+            # number is complete only when followed by delimiter
+            if self.eof or (end < len(self.buffer) and self.buffer[end] in _DELIMITERS):
+                self.position = end
+                return value
+            self.more(size)
+            size *= 2
+
+
+def iter_items(stream, size=1 << 16):
+    """
+    Yield key and value of every item of top-level JSON object one by one
+    :param stream: text stream
+    :param size: size of chunks read from stream
+    :return: generator of tuples key, value
+    """
+    reader = _Reader(stream, size)
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+    while True:
+        key = reader.value()
+        reader.expect(':')
+        yield key, reader.value()
+        if reader.expect(',}') == '}':
+            return
+
+
+def format_result(test_id, stats):
+    """
+    Return lines of text report of benchmark
+    :param test_id: id of benchmark
+    :param stats: processed results
+    :return: list of strings
+    """
+    from pypete.report import detail_lines, extra_lines, summary_line
+
+    return [summary_line(test_id, stats)] + detail_lines(stats, samples=True) + extra_lines(stats)
+
+
+def _write_item(out, first, key, value):
+    out.write('{0}\n  {1}: {2}'.format('' if first else ',', json.dumps(key),
+                                        json.dumps(value, indent=2).replace('\n', '\n  ')))
+
+
+def write_records(path, records):
+    """
+    Write results file with updated records of tests. Records of other tests
+    are copied from the old file one by one, so it is never loaded whole.
+    :param path: results file
+    :param records: dict of updated records by test id
+    :return:
+    """
+    records = dict(records)
+    temporary = path + '.tmp'
+    first = True
+    with open(temporary, 'w') as out:
+        out.write('{')
+        try:
+            with open(path) as f:
+                for key, value in iter_items(f):
+                    _write_item(out, first, key, records.pop(key, value))
+                    first = False
+        except (IOError, OSError):
+            pass
+        for key in sorted(records):
+            _write_item(out, first, key, records[key])
+            first = False
+        out.write('\n}\n')
+    os.replace(temporary, path)
+
+
+def run(options, targets, out=sys.stdout):
+    """
+    Discover benchmarks, check that they pass and benchmark them. Only
+    records of discovered benchmarks are read from results file.
+    :param options: parsed options of run command
+    :param targets: modules, files or directories with benchmarks
+    :param out: stream of report
+    :return: exit status
+    """
+    import unittest
+    from pypete.aio import AsyncCase, is_coroutine_test
+    from pypete.core import (Benchmark, experiment_record, parse_percentage, process_measurement,
+                             reuse_result, run_info)
+    from pypete.discovery import discover
+    from pypete.exporters import create_exporter
+    from pypete.regression import check_sample_size, compare_with_best, regression_messages
+
+    core = Benchmark(repeat=options.repeat, number=options.number,
+                     threshold=options.threshold, mode=options.mode, gc=options.gc,
+                     warmup=options.warmup, timer=options.timer,
+                     precision=parse_percentage(options.precision),
+                     precision_statistic=options.precision_statistic,
+                     max_samples=options.max_samples, max_time=options.max_time,
+                     histogram=options.histogram, memory=options.memory,
+                     profile=options.profile, profile_top=options.profile_top,
+                     calibration_tolerance=options.calibration_tolerance)
+    fail_on_regression = parse_percentage(options.fail_on_regression)
+    if fail_on_regression is not None:
+        check_sample_size(options.repeat, options.alpha)
+    benchmarks = discover(targets or ['.'], options.match)
+    info = run_info(core)
+    history = None
+    if options.history:
+        history = History(options.history)
+        history.start_run(info)
+    records = {}
+    if options.file:
+        ids = set(bench_id for bench_id, _ in benchmarks)
+        try:
+            with open(options.file) as f:
+                records = dict(item for item in iter_items(f) if item[0] in ids)
+        except (IOError, OSError):
+            pass
+    updated = {}
+    exporters = [create_exporter(spec, info) for spec in options.export]
+    status = 0
+    for bench_id, case in benchmarks:
+        result = unittest.TestResult()
+        (AsyncCase(case, core.loop) if is_coroutine_test(case) else case)(result)
+        if not result.wasSuccessful():
+            status = 1
+            out.write('{0} ... not benchmarked, benchmark did not pass\n'.format(bench_id))
+            for exporter in exporters:
+                exporter.skip(bench_id, 'benchmark did not pass')
+            for _, formatted in result.errors + result.failures:
+                sys.stderr.write(formatted)
+            continue
+        record = records.get(bench_id)
+        stats = None
+        if options.changed_only:
+            stats = reuse_result(record, core.fingerprint(case), info, options.full_run_every)
+        if stats is None:
+            calibration = core.cached_calibration(record, case) if options.number == 0 else None
+            try:
+                measurement = core.measure(case, bench_id, calibration)
+                stats = process_measurement(measurement)
+            except Exception:
+                status = 1
+                out.write('{0} ... not benchmarked, benchmark raised exception\n'.format(bench_id))
+                for exporter in exporters:
+                    exporter.skip(bench_id, 'benchmark raised exception')
+                traceback.print_exc()
+                continue
+            if options.number == 0:
+                stats['calibration'] = core.calibrate(record, case, bench_id, stats['best'],
+                                                      measurement['number'])
+            if options.changed_only:
+                stats['fingerprint'] = core.fingerprint(case)
+        out.write('\n'.join(format_result(bench_id, stats)) + '\n')
+        if fail_on_regression is not None and record is not None and 'reused' not in stats:
+            messages = regression_messages(
+                compare_with_best(stats, record['best'], options.alpha, fail_on_regression),
+                options.alpha)
+            if messages:
+                status = 1
+                out.write('    regression: {0}\n'.format(', '.join(messages)))
+        for exporter in exporters:
+            exporter.write(bench_id, stats)
+        experiment = experiment_record(info, stats)
+        if 'calibration' in stats:
+            experiment['calibration'] = stats['calibration']
+        if history is not None:
+            history.append(bench_id, experiment)
+        if options.file:
+            updated[bench_id] = update_record(record, experiment)
+            if 'calibration' in stats:
+                updated[bench_id]['calibration'] = stats['calibration']
+    if options.file:
+        write_records(options.file, updated)
+    for exporter in exporters:
+        exporter.close()
+    if history is not None:
+        history.close()
+    return status
+
+
+def _comparable(record):
+    last = record['last']
+    return robust_time(last), last.get('samples', [])
+
+
+def compare(options, baseline_path, candidate_path, out=sys.stdout):
+    """
+    Compare last results of tests in two results files. Change is
+    significant if one-sided Mann-Whitney U test of samples rejects at
+    alpha level.
+    :param options: parsed options of compare command
+    :param baseline_path: results file of baseline
+    :param candidate_path: results file of candidate
+    :param out: stream of report
+    :return: exit status, 1 if any test is significantly slower
+    """
+    from pypete import stats as statistics
+
+    with open(baseline_path) as f:
+        baseline = dict((test_id, _comparable(record)) for test_id, record in iter_items(f))
+    status = 0
+    with open(candidate_path) as f:
+        for test_id, record in iter_items(f):
+            new_time, new_samples = _comparable(record)
+            if test_id not in baseline:
+                out.write('{0} ... {1:.6f} s, new\n'.format(test_id, new_time))
+                continue
+            old_time, old_samples = baseline.pop(test_id)
+            verdict = 'no significant change'
+            if old_samples and new_samples:
+                if statistics.mann_whitney(new_samples, old_samples) <= options.alpha:
+                    verdict = 'slower'
+                    status = 1
+                elif statistics.mann_whitney(old_samples, new_samples) <= options.alpha:
+                    verdict = 'faster'
+            ratio = new_time / old_time if old_time > 0 else float('inf')
+            out.write('{0} ... {1:.6f} s -> {2:.6f} s, {3:.3f}x, {4}\n'.format(
+                test_id, old_time, new_time, ratio, verdict))
+    for test_id in sorted(baseline):
+        out.write('{0} ... {1:.6f} s, missing in {2}\n'.format(
+            test_id, baseline[test_id][0], candidate_path))
+    return status
+
+
+def _format_experiment(label, experiment):
+    return '{0}  best {1[best]:.6f} s, median {2:.6f} s, avg {1[avg]:.6f} s, ' \
+           'worst {1[worst]:.6f} s\n'.format(label, experiment, robust_time(experiment))
+
+
+def history(options, test_id, path, out=sys.stdout):
+    """
+    Print saved results of test from results file or history database
+    :param options: parsed options of history command
+    :param test_id: id of test
+    :param path: results file or SQLite history database
+    :param out: stream of report
+    :return: exit status, 1 if test has no results
+    """
+    with open(path, 'rb') as f:
+        is_database = f.read(len(_SQLITE_HEADER)) == _SQLITE_HEADER
+    if is_database:
+        database = History(path)
+        try:
+            experiments = database.last_runs(test_id, options.limit)
+        finally:
+            database.close()
+        for experiment in experiments:
+            out.write(_format_experiment(experiment['info']['date'], experiment))
+        return 0 if experiments else 1
+    with open(path) as f:
+        for key, record in iter_items(f):
+            if key == test_id:
+                for label in ('last', 'best', 'worst'):
+                    out.write(_format_experiment(
+                        '{0:5} {1}'.format(label, record[label]['info']['date']), record[label]))
+                return 0
+    return 1
+
+
+def _parser(command):
+    usage = {'run': '%prog [run] [options] [MODULE|FILE|DIRECTORY ...]',
+             'compare': '%prog compare [options] BASELINE CANDIDATE',
+             'history': '%prog history [options] TEST_ID FILE'}[command]
+    parser = optparse.OptionParser(prog='python -m pypete', usage=usage)
+    if command == 'run':
+        from pypete.timers import GC_MODES, TIMERS
+        parser.add_option('-r', '--repeat', type='int', default=3,
+                          help='How many times repeat experiment')
+        parser.add_option('-n', '--number', type='int', default=0,
+                          help='How many times run benchmark in one experiment, '
+                               '0 determines it by threshold')
+        parser.add_option('--threshold', type='float', default=0.1,
+                          help='Minimal time of experiment in seconds when number is determined')
+        parser.add_option('--calibration-tolerance', type='float', default=0.5,
+                          help='Relative drift of time per call from calibration cached in '
+                               'results file after which number is recalibrated')
+        parser.add_option('--mode', type='choice', default='default',
+                          choices=['default', 'pedantic', 'batched'],
+                          help='default times whole call with setup, pedantic runs setup and '
+                               'teardown around every call, batched sets up all calls first')
+        parser.add_option('--gc', type='choice', choices=GC_MODES, default='off',
+                          help='Garbage collector during experiments: ' + ', '.join(GC_MODES))
+        parser.add_option('--warmup', type='int', default=0,
+                          help='Number of untimed experiments before measurement')
+        parser.add_option('--timer', type='choice', choices=sorted(TIMERS),
+                          default='perf_counter',
+                          help='Clock used for timing: ' + ', '.join(sorted(TIMERS)))
+        parser.add_option('--precision', default=None, metavar='PERCENT',
+                          help='Keep repeating experiment until confidence interval of '
+                               'result is narrower than PERCENT, e.g. 2%')
+        parser.add_option('--precision-statistic', type='choice', default='mean',
+                          choices=['mean', 'median'],
+                          help='Statistic whose confidence interval is used by precision')
+        parser.add_option('--max-samples', type='int', default=100,
+                          help='Maximal number of experiments with precision set')
+        parser.add_option('--max-time', type='float', default=10.0,
+                          help='Maximal time in seconds spent by experiments of one benchmark '
+                               'with precision set')
+        parser.add_option('--histogram', action='store_true', default=False,
+                          help='Time individual calls and report percentiles of their latency')
+        parser.add_option('--memory', action='store_true', default=False,
+                          help='Measure memory allocated by benchmark under tracemalloc')
+        parser.add_option('--profile', default=None, metavar='DIR',
+                          help='Profile calibrated loop of every benchmark by cProfile and '
+                               'save profiles to DIR')
+        parser.add_option('--profile-top', type='int', default=10,
+                          help='Number of hotspots reported for every profiled benchmark')
+        parser.add_option('--fail-on-regression', default=None, metavar='PERCENT',
+                          help='Fail benchmarks significantly slower than their best run in '
+                               'results file by more than PERCENT, e.g. 5%')
+        parser.add_option('--alpha', type='float', default=0.05,
+                          help='Significance level of regression test')
+        parser.add_option('--changed-only', action='store_true', default=False,
+                          help='Reuse last results of benchmarks whose code and dependencies '
+                               'did not change')
+        parser.add_option('--full-run-every', type='int', default=10,
+                          help='With changed-only, benchmark every benchmark at least every '
+                               'FULL_RUN_EVERY runs, 0 means never force')
+        parser.add_option('-k', '--match', default=None,
+                          help='Run only benchmarks whose id contains this string')
+        parser.add_option('--file', default=None,
+                          help='Results file updated with results of run')
+        parser.add_option('--history', default=None,
+                          help='SQLite database where results are appended')
+        parser.add_option('--export', action='append', default=[], metavar='FORMAT:PATH',
+                          help='Export results as they are measured, FORMAT is one of '
+                               'openmetrics, csv or junit, may be given more times')
+    elif command == 'compare':
+        parser.add_option('--alpha', type='float', default=0.05,
+                          help='Significance level of Mann-Whitney U test')
+    else:
+        parser.add_option('--limit', type='int', default=20,
+                          help='Number of newest runs shown from history database')
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    command = argv[0] if argv and argv[0] in COMMANDS else 'run'
+    if argv and argv[0] == command:
+        argv = argv[1:]
+    parser = _parser(command)
+    options, args = parser.parse_args(argv)
+    if command == 'run':
+        sys.exit(run(options, args))
+    if command == 'compare':
+        if len(args) != 2:
+            parser.error('exactly two results files are required')
+        sys.exit(compare(options, *args))
+    if len(args) != 2:
+        parser.error('TEST_ID and FILE are required')
+    sys.exit(history(options, *args))
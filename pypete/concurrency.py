@@ -0,0 +1,125 @@
+"""
+Throughput of test body called from several threads or processes at once.
+Test marked by ``pypete.concurrent`` is run at every concurrency level, each
+worker calls the body ``calls`` times after all workers are started, so
+aggregate throughput, latency of one call and scaling efficiency relative to
+the lowest level are measured.
+"""
+from __future__ import division
+import threading
+import time
+
+
+def concurrent(levels=(1, 2, 4, 8, 16), processes=False):
+    """
+    Mark test to be measured at concurrency levels
+
+        @pypete.concurrent(levels=[1, 2, 4, 8])
+        def test_cache_lookup():
+            cache.get('key')
+
+    :param levels: numbers of threads calling test body at once
+    :param processes: measure the same levels with processes too
+    :return: decorator
+    """
+    def decorator(func):
+        func.pypete_concurrent = {'levels': sorted(levels), 'processes': processes}
+        return func
+    return decorator
+
+
+def _calls(body, calls, barrier, timer=time.perf_counter_ns):
+    """
+    Call body calls times after all workers reached barrier
+    :return: tuple start, end and sum of latencies in nanoseconds
+    """
+    barrier.wait()
+    latency = 0
+    start = timer()
+    for _ in range(calls):
+        t0 = timer()
+        body()
+        latency += timer() - t0
+    return start, timer(), latency
+
+
+def _thread_level(body, level, calls):
+    barrier = threading.Barrier(level)
+    results = [None] * level
+
+    def work(i):
+        results[i] = _calls(body, calls, barrier)
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(level)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def _process_work(body, calls, barrier, connection):
+    connection.send(_calls(body, calls, barrier))
+    connection.close()
+
+
+def _process_level(body, level, calls):
+    import multiprocessing
+
+    context = multiprocessing.get_context('fork')
+    barrier = context.Barrier(level)
+    pipes = [context.Pipe(duplex=False) for _ in range(level)]
+    processes = [context.Process(target=_process_work, args=(body, calls, barrier, sender))
+                 for _, sender in pipes]
+    for process in processes:
+        process.start()
+    results = []
+    for process, (receiver, sender) in zip(processes, pipes):
+        sender.close()
+        results.append(receiver.recv())
+        process.join()
+    return results
+
+
+def run_level(body, level, calls, processes=False):
+    """
+    Run body from level threads or processes at once
+    :param body: callable without arguments
+    :param level: number of threads or processes
+    :param calls: number of calls in every thread or process
+    :param processes: use processes instead of threads
+    :return: dict with throughput in calls per second and mean latency of one call
+    """
+    results = (_process_level if processes else _thread_level)(body, level, calls)
+    wall = max(r[1] for r in results) - min(r[0] for r in results)
+    total = level * calls
+    return {'level': level,
+            'throughput': total / wall * 1e9 if wall > 0 else float('inf'),
+            'latency': sum(r[2] for r in results) / total / 1e9}
+
+
+def scaling(levels):
+    """
+    Add scaling efficiency to results of levels, i.e. throughput per worker
+    relative to throughput per worker at the lowest level
+    :param levels: list of results of run_level ordered by level
+    :return: levels
+    """
+    base = levels[0]['throughput'] / levels[0]['level']
+    for level in levels:
+        level['efficiency'] = level['throughput'] / level['level'] / base if base > 0 else 0.0
+    return levels
+
+
+def measure_concurrency(body, marker, calls):
+    """
+    Measure body at all levels of marker
+    :param body: callable without arguments
+    :param marker: dict set by concurrent decorator
+    :param calls: number of calls in every worker
+    :return: dict with results of threads and optionally processes
+    """
+    result = {'threads': scaling([run_level(body, level, calls) for level in marker['levels']])}
+    if marker['processes']:
+        result['processes'] = scaling([run_level(body, level, calls, processes=True)
+                                       for level in marker['levels']])
+    return result
@@ -0,0 +1,511 @@
+"""
+Measurement of single test case. It does not depend on nose, so it runs
+the same in nose process, forked workers and isolated interpreters. Caching
+of calibrations and reuse of results of unchanged tests are shared by the
+plugin and standalone runner too.
+"""
+from __future__ import division
+import math
+import logging
+import datetime
+import timeit as ti
+
+from pypete import profiling
+from pypete import resources
+from pypete.aio import AsyncTimer, EventLoop, is_coroutine_test, test_coroutine
+from pypete import stats as statistics
+from pypete.case import test_body, test_function
+from pypete.concurrency import measure_concurrency
+from pypete.environment import environment
+from pypete.fingerprint import code_fingerprint, dependency_fingerprint
+from pypete.fixtures import BatchedTimer, PedanticTimer
+from pypete.histogram import record_awaits, record_calls
+from pypete.memory import measure_memory, measure_memory_awaits
+from pypete.sections import SectionTimer
+from pypete.timers import TIMERS, Timer
+
+
+log = logging.getLogger('nose.plugins.pypete')
+
+# settings in run information that change results, results measured with
+# other settings are not reused
+MEASUREMENT_SETTINGS = ('repeat', 'number', 'threshold', 'mode', 'gc', 'warmup', 'timer',
+                        'precision', 'precision_statistic', 'max_samples', 'max_time',
+                        'histogram', 'memory', 'profile', 'profile_top', 'resources', 'loop',
+                        'tasks', 'baseline')
+
+
+def parse_percentage(value):
+    """
+    Parse relative value given either as percentage ``2%`` or fraction ``0.02``
+    :param value: string
+    :return: float
+    """
+    if value is None:
+        return None
+    value = value.strip()
+    if value.endswith('%'):
+        return float(value[:-1]) / 100
+    return float(value)
+
+
+class Benchmark(object):
+    """
+    Settings of measurement and measurement of test cases with them
+    """
+
+    def __init__(self, repeat=3, number=0, threshold=0.1, mode='default', gc='off',
+                 warmup=0, timer='perf_counter', precision=None, precision_statistic='mean',
+                 max_samples=100, max_time=10.0, histogram=False, memory=False,
+                 profile=None, profile_top=10, loop='asyncio', tasks=0, resources=False,
+                 calibration_tolerance=0.5):
+        self.repeat = repeat
+        self.number = number
+        self.threshold = threshold
+        self.mode = mode
+        self.gc = gc
+        self.warmup = warmup
+        self.timer = timer
+        self.precision = precision
+        self.precision_statistic = precision_statistic
+        self.max_samples = max_samples
+        self.max_time = max_time
+        self.histogram = histogram
+        self.memory = memory
+        self.profile = profile
+        self.profile_top = profile_top
+        self.loop = EventLoop(loop)
+        self.tasks = tasks
+        self.resources = resources
+        self.calibration_tolerance = calibration_tolerance
+
+    def settings(self):
+        """
+        Return settings of measurement recorded in information about run
+        :return: dict
+        """
+        return {'repeat': self.repeat,
+                'number': self.number,
+                'threshold': self.threshold,
+                'mode': self.mode,
+                'gc': self.gc,
+                'warmup': self.warmup,
+                'timer': self.timer,
+                'precision': self.precision,
+                'precision_statistic': self.precision_statistic,
+                'max_samples': self.max_samples,
+                'max_time': self.max_time,
+                'histogram': self.histogram,
+                'memory': self.memory,
+                'profile': self.profile,
+                'profile_top': self.profile_top,
+                'resources': self.resources,
+                'loop': self.loop.kind,
+                'tasks': self.tasks}
+
+    @staticmethod
+    def code_hash(case):
+        """
+        Hash of code object of test
+        :param case: unittest test case
+        :return: hex digest
+        """
+        return code_fingerprint(test_function(case))
+
+    @staticmethod
+    def fingerprint(case):
+        """
+        Fingerprint of test code and its dependencies
+        :param case: unittest test case
+        :return: hex digest
+        """
+        return dependency_fingerprint(test_function(case))
+
+    def cached_calibration(self, record, case):
+        """
+        Return calibration saved in record if the test code and mode, which
+        decides what is timed, did not change
+        :param record: saved record of test or None
+        :param case: unittest test case
+        :return: calibration dict or None
+        """
+        calibration = (record or {}).get('calibration')
+        if calibration is None or calibration['hash'] != self.code_hash(case) or \
+                calibration.get('mode', 'default') != self.mode:
+            return None
+        return calibration
+
+    def calibrate(self, record, case, test_id, per_call, number):
+        """
+        Return calibration to cache for next runs. Number is recalibrated
+        from current measurement when time per call drifted out of tolerance.
+        :param record: saved record of test or None
+        :param case: unittest test case
+        :param test_id: id of test
+        :param per_call: measured time of one call
+        :param number: number used in measurement
+        :return: calibration dict
+        """
+        calibration = self.cached_calibration(record, case)
+        if calibration is not None:
+            drift = abs(per_call / calibration['per_call'] - 1)
+            if drift <= self.calibration_tolerance:
+                return calibration
+            log.info('Time per call of %s drifted by %.0f%%, recalibrating', test_id, drift * 100)
+        number = int(math.ceil(self.threshold / per_call)) if per_call > 0 else number
+        return {'hash': self.code_hash(case),
+                'mode': self.mode,
+                'number': number,
+                'per_call': per_call}
+
+    def determine_number(self, case, budget=None):
+        """
+        Determine number so that it is bigger than threshold. Number of calls
+        is increased tenfold until they take at least tenth of threshold, so
+        fast tests get estimate from more than few calls. With budget
+        calibration takes at most its fifth and number is limited so that
+        experiments fit into the budget. Calibration uses timer of the mode,
+        so it measures what is timed in experiments; it also stops when calls
+        with fixtures take threshold, as timed part may be too short to grow.
+        :param case: unittest test case
+        :param budget: time budget of test in seconds
+        :return:
+        """
+        init_number = 1
+        elapsed = 0
+        timer = self.get_timer(case)
+        while True:
+            start = ti.default_timer()
+            x = timer.timeit(number=init_number)
+            wall = ti.default_timer() - start
+            elapsed += wall
+            if x >= self.threshold / 10 or wall >= self.threshold or \
+                    (budget is not None and elapsed >= budget / 5):
+                break
+            init_number *= 10
+        per_call = x / init_number
+        number = int(math.ceil(self.threshold / per_call)) if per_call > 0 else init_number
+        return self.limit_number(number, per_call, budget)
+
+    def limit_number(self, number, per_call, budget):
+        """
+        Limit number so that experiments fit into budget
+        :param number: number of calls in one experiment
+        :param per_call: estimated time of one call
+        :param budget: time budget of test in seconds or None
+        :return: number
+        """
+        if budget is None or per_call <= 0:
+            return number
+        return max(1, min(number, int(budget * 0.8 / self.repeat / per_call)))
+
+    def get_number(self, case, calibration=None, budget=None):
+        """
+        Return number of calls in one experiment
+        :param case: unittest test case
+        :param calibration: cached calibration or None
+        :param budget: time budget of test in seconds or None
+        :return: number
+        """
+        if self.number:
+            return self.number
+        if calibration is None:
+            return self.determine_number(case, budget)
+        # number follows current threshold, only time per call is cached
+        per_call = calibration['per_call']
+        number = int(math.ceil(self.threshold / per_call)) if per_call > 0 else calibration['number']
+        return self.limit_number(number, per_call, budget)
+
+    def measure(self, case, test_id, calibration=None, budget=None):
+        """
+        Measure test case, determine number first if needed
+        :param case: unittest test case
+        :param test_id: id of test
+        :param calibration: cached calibration used instead of determining number
+        :param budget: time budget of calibration and experiments in seconds
+        :return: dict with timing, number and optional measurements
+        """
+        start = ti.default_timer()
+        number = self.get_number(case, calibration, budget)
+        timer = self.get_timer(case)
+        for _ in range(self.warmup):
+            if budget is not None and ti.default_timer() - start >= budget / 2:
+                break
+            timer.timeit(number)
+        if self.mode != 'default' and hasattr(timer, 'fixture'):
+            timer.fixture = []
+        timer = SectionTimer(timer)
+        remaining = None if budget is None else budget - (ti.default_timer() - start)
+        before = resources.snapshot() if self.resources else None
+        if self.precision:
+            timing = self.sample(timer, number, remaining)
+        else:
+            timing = self.repeat_within(timer, number, remaining)
+        measurement = {'timing': timing, 'number': number}
+        if before is not None:
+            measurement['resources'] = resources.usage(before, resources.snapshot(),
+                                                       number * len(timing))
+        if self.mode != 'default' and hasattr(timer, 'fixture'):
+            measurement['fixture'] = timer.fixture
+        if timer.recorder.samples:
+            measurement['sections'] = timer.recorder.samples
+        if isinstance(timer.timer, AsyncTimer):
+            measurement['async'] = {'loop': self.loop.kind, 'tasks': self.tasks}
+        measurement.update(self.measure_extras(case, test_id, number))
+        measurement['elapsed'] = ti.default_timer() - start
+        return measurement
+
+    def measure_extras(self, case, test_id, number):
+        """
+        Run measurements apart from the timed experiments
+        :param case: unittest test case
+        :param test_id: id of test
+        :param number: number of calls in one experiment
+        :return: dict with histogram, memory, profile and concurrency if selected
+        """
+        extras = {}
+        timer = TIMERS[self.timer][1]
+        if self.histogram:
+            calls = number * self.repeat
+            extras['histogram'] = self.measure_body(
+                case, 'histogram', lambda body: record_calls(body, calls, timer=timer),
+                lambda call: record_awaits(call, calls, timer=timer))
+        if self.memory:
+            extras['memory'] = self.measure_body(case, 'memory', measure_memory,
+                                                 measure_memory_awaits)
+        if self.profile:
+            stats = self.measure_body(case, 'profile',
+                                      lambda body: profiling.profile(body, number),
+                                      lambda call: profiling.profile_awaits(call, number))
+            if stats is not None:
+                extras['profile'] = self.profile_test(test_id, stats)
+        marker = getattr(test_function(case), 'pypete_concurrent', None)
+        if marker is not None:
+            extras['concurrency'] = self.measure_body(
+                case, 'concurrency', lambda body: measure_concurrency(body, marker, number))
+        return dict((k, v) for k, v in extras.items() if v is not None)
+
+    def repeat_within(self, timer, number, budget=None):
+        """
+        Repeat experiment repeat times, but stop after budget is spent
+        :param timer: timeit.Timer
+        :param number: number of calls in one experiment
+        :param budget: time budget in seconds or None
+        :return: timing
+        """
+        if budget is None:
+            return timer.repeat(repeat=self.repeat, number=number)
+        deadline = ti.default_timer() + budget
+        timing = []
+        while len(timing) < self.repeat and (not timing or ti.default_timer() < deadline):
+            timing.append(timer.timeit(number))
+        return timing
+
+    def sample(self, timer, number, budget=None):
+        """
+        Repeat experiment until confidence interval of result is narrower than
+        precision or maximal number of samples or time is reached. At least
+        repeat experiments are run within time, but never less than one.
+        :param timer: timeit.Timer
+        :param number: number of calls in one experiment
+        :param budget: time budget in seconds, lowers max_time
+        :return: timing
+        """
+        start = ti.default_timer()
+        max_time = self.max_time if budget is None else min(self.max_time, budget)
+        minimum = max(self.repeat, 2)
+        timing = []
+        while not timing or (
+                len(timing) < self.max_samples and ti.default_timer() - start < max_time and
+                (len(timing) < minimum or
+                 statistics.relative_precision(timing, self.precision_statistic) > self.precision)):
+            timing.append(timer.timeit(number))
+        return timing
+
+    def profile_test(self, test_id, stats):
+        """
+        Dump profile of test and compare it with profile from previous run
+        :param test_id: id of test
+        :param stats: pstats.Stats of test
+        :return: dict with path to profile, hotspots and differences
+        """
+        path, previous = profiling.dump(stats, self.profile, test_id)
+        result = {'path': path,
+                  'top': profiling.top_functions(stats, self.profile_top)}
+        if previous is not None:
+            result['diff'] = profiling.diff_profiles(previous, stats, self.profile_top)
+        return result
+
+    def get_timer(self, case):
+        """
+        Return timer of test case according to mode, coroutine tests are
+        awaited in reused event loop in any mode
+        :param case: unittest test case
+        :return: timeit.Timer or timer with the same interface
+        """
+        seconds, nanoseconds = TIMERS[self.timer]
+        if is_coroutine_test(case):
+            return AsyncTimer(case, self.loop, seconds, self.gc, self.tasks)
+        if self.mode == 'pedantic':
+            return PedanticTimer(case, nanoseconds, self.gc)
+        if self.mode == 'batched':
+            return BatchedTimer(case, nanoseconds, self.gc)
+        return Timer(case, case.setUp, seconds, self.gc)
+
+    def measure_body(self, case, name, measure, measure_awaits=None):
+        """
+        Measure body of test case apart from the timed experiments, between
+        its setUp and tearDown. Coroutine test is measured by measure_awaits
+        in single coroutine run in the reused event loop, between its
+        asyncSetUp and asyncTearDown.
+        :param case: unittest test case
+        :param name: name of measurement
+        :param measure: function taking body of test and returning measurement
+        :param measure_awaits: coroutine function taking function creating
+        coroutine of test and returning measurement
+        :return: measurement or None if test failed
+        """
+        try:
+            case.setUp()
+            try:
+                if not is_coroutine_test(case):
+                    return measure(test_body(case))
+                if measure_awaits is None:
+                    return measure(self.loop.sync(case))
+                return self.loop.run(self._measure_awaits(case, measure_awaits))
+            finally:
+                case.tearDown()
+        except Exception:
+            log.warning('Test %s raised exception, %s not measured', case, name)
+            return None
+
+    @staticmethod
+    async def _measure_awaits(case, measure_awaits):
+        if hasattr(case, 'asyncSetUp'):
+            await case.asyncSetUp()
+        try:
+            return await measure_awaits(test_coroutine(case))
+        finally:
+            if hasattr(case, 'asyncTearDown'):
+                await case.asyncTearDown()
+
+
+# measurements kept in processed results as they are
+_PROCESSED_EXTRAS = ('node', 'memory', 'profile', 'speedup', 'concurrency', 'sections',
+                     'resources')
+
+# processed results saved in experiment as they are
+_RECORDED = ('median', 'mad', 'iqr', 'outliers', 'fixture', 'memory', 'percentiles', 'speedup',
+             'complexity', 'concurrency', 'async', 'sections', 'resources', 'fingerprint',
+             'reused', 'node')
+
+
+def process_measurement(measurement):
+    """
+    Turn measurement into results per call: best, average and worst time,
+    samples with their robust statistics and optional measurements
+    :param measurement: dict returned by Benchmark.measure
+    :return: dict
+    """
+    timing = measurement['timing']
+    number = measurement['number']
+    stats = {'best': min(timing) / number,
+             'worst': max(timing) / number,
+             'average': sum(timing) / len(timing) / number,
+             'repeat': len(timing),
+             'number': number,
+             'samples': statistics.as_array(t / number for t in timing)}
+    stats.update(statistics.summarize(stats['samples']))
+    if 'fixture' in measurement:
+        stats['fixture'] = sum(measurement['fixture']) / len(timing) / number
+    if 'histogram' in measurement:
+        percentiles = measurement['histogram'].percentiles()
+        factor = measurement['node']['factor'] if 'node' in measurement else 1.0
+        stats['percentiles'] = dict((k, v / 1e9 * factor) for k, v in percentiles.items())
+    for key in _PROCESSED_EXTRAS:
+        if key in measurement:
+            stats[key] = measurement[key]
+    if 'async' in measurement:
+        stats['async'] = dict(measurement['async'])
+        stats['async']['throughput'] = max(stats['async']['tasks'], 1) / stats['average']
+    return stats
+
+
+def run_info(benchmark, **extra):
+    """
+    Return information about run saved with its experiments: settings of
+    measurement, date and environment
+    :param benchmark: Benchmark
+    :param extra: other information about run
+    :return: dict
+    """
+    info = benchmark.settings()
+    info.update({'date': str(datetime.datetime.now()),
+                 'loop_overhead_subtracted': benchmark.mode == 'default',
+                 'environment': environment()})
+    info.update(extra)
+    return info
+
+
+def reuse_result(record, fingerprint, info, full_run_every=0):
+    """
+    Return last result of test as processed results if its fingerprint and
+    measurement settings did not change and it was not reused too many
+    times in a row
+    :param record: saved record of test or None
+    :param fingerprint: current fingerprint of test
+    :param info: dict with information about current run
+    :param full_run_every: maximal number of reuses in a row, 0 means no limit
+    :return: dict or None if test has to be benchmarked
+    """
+    if record is None:
+        return None
+    last = record['last']
+    reused = last.get('reused', 0) + 1
+    if full_run_every and reused >= full_run_every:
+        return None
+    if last.get('fingerprint') != fingerprint:
+        return None
+    if any(last['info'].get(key) != info.get(key) for key in MEASUREMENT_SETTINGS):
+        return None
+    stats = {'best': last['best'],
+             'worst': last['worst'],
+             'average': last['avg'],
+             'repeat': last['repeat'],
+             'number': last['number'],
+             'samples': statistics.as_array(last['samples']),
+             'fingerprint': last['fingerprint'],
+             'reused': reused}
+    for key in ('median', 'mad', 'iqr', 'ci', 'outliers', 'fixture', 'percentiles', 'memory',
+                'speedup', 'concurrency', 'async', 'sections', 'resources'):
+        if key in last:
+            stats[key] = last[key]
+    if 'calibration' in record:
+        stats['calibration'] = record['calibration']
+    return stats
+
+
+def experiment_record(info, stats):
+    """
+    Return experiment as saved in results file and history
+    :param info: dict with information about run
+    :param stats: processed results of test
+    :return: dict
+    """
+    experiment = {
+        'info': info,
+        'best': stats['best'],
+        'avg': stats['average'],
+        'worst': stats['worst'],
+        'repeat': stats['repeat'],
+        'number': stats['number'],
+        'samples': list(stats['samples']),
+    }
+    if 'ci' in stats:
+        experiment['ci'] = list(stats['ci'])
+    if 'profile' in stats:
+        experiment['profile'] = stats['profile']['path']
+    for key in _RECORDED:
+        if key in stats:
+            experiment[key] = stats[key]
+    return experiment
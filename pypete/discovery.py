@@ -0,0 +1,141 @@
+"""
+Discovery of benchmarks for standalone runner. Benchmark is function named
+``bench_*`` or decorated by ``@pypete.benchmark`` defined in module given by
+name or path, or in ``bench*.py`` file found in given directory. Nothing but
+the benchmark modules is imported, so discovery starts fast.
+"""
+import os
+import sys
+import types
+import hashlib
+import importlib
+import importlib.util
+
+
+PREFIX = 'bench_'
+
+
+def benchmark(func=None, name=None):
+    """
+    Mark function as benchmark, used either as ``@benchmark`` or
+    ``@benchmark(name='name')``
+    :param func: decorated function
+    :param name: name of benchmark, name of function by default
+    :return: decorator or decorated function
+    """
+    def decorator(func):
+        func.pypete_benchmark = name or func.__name__
+        return func
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+
+def is_benchmark(obj, module):
+    """
+    Return whether object is benchmark defined in module
+    :param obj: attribute of module
+    :param module: module
+    :return: bool
+    """
+    if not isinstance(obj, types.FunctionType) or obj.__module__ != module.__name__:
+        return False
+    return hasattr(obj, 'pypete_benchmark') or obj.__name__.startswith(PREFIX)
+
+
+def module_name(path):
+    """
+    Return name of module imported from file. It is the name of the file
+    unless module of that name is imported from other file, then hash of
+    the path is appended, so modules of different files never collide.
+    :param path: absolute path of Python file
+    :return: string
+    """
+    name = os.path.splitext(os.path.basename(path))[0]
+    module = sys.modules.get(name)
+    if module is None or _module_path(module) == path:
+        return name
+    return '{0}_{1}'.format(name, hashlib.sha1(path.encode('utf-8')).hexdigest()[:8])
+
+
+def _module_path(module):
+    path = getattr(module, '__file__', None)
+    return os.path.abspath(path) if path else None
+
+
+def import_path(path):
+    """
+    Import module from file, its directory is put at the start of sys.path.
+    Module is keyed by its path, see module_name.
+    :param path: path of Python file
+    :return: module
+    """
+    path = os.path.abspath(path)
+    directory = os.path.dirname(path)
+    name = module_name(path)
+    if directory not in sys.path:
+        sys.path.insert(0, directory)
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[name]
+        raise
+    return module
+
+
+def find_modules(target):
+    """
+    Import modules given by target
+    :param target: name of module, path of Python file or directory
+    :return: list of modules
+    """
+    if os.path.isdir(target):
+        paths = []
+        for root, dirs, files in os.walk(target):
+            dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+            paths.extend(os.path.join(root, f) for f in sorted(files)
+                         if f.startswith('bench') and f.endswith('.py'))
+        return [import_path(path) for path in paths]
+    if os.path.isfile(target):
+        return [import_path(target)]
+    return [importlib.import_module(target)]
+
+
+def benchmark_id(func):
+    """
+    Return id of benchmark function
+    :param func: function
+    :return: string
+    """
+    name = getattr(func, 'pypete_benchmark', None) or func.__qualname__
+    return '{0}.{1}'.format(func.__module__, name)
+
+
+def discover(targets, match=None):
+    """
+    Find benchmarks in targets in order of their definition
+    :param targets: names of modules, paths of files or directories
+    :param match: substring that id of benchmark must contain
+    :return: list of tuples of id and test case
+    """
+    # pypete.isolate is run as script by interpreters of isolated benchmarks,
+    # importing it with package would make runpy warn about it
+    from pypete.isolate import IsolatedCase
+
+    found = []
+    seen = set()
+    for target in targets:
+        for module in find_modules(target):
+            for obj in list(vars(module).values()):
+                if not is_benchmark(obj, module) or id(obj) in seen:
+                    continue
+                seen.add(id(obj))
+                bench_id = benchmark_id(obj)
+                if match is None or match in bench_id:
+                    found.append((bench_id, IsolatedCase(obj)))
+    return found
@@ -0,0 +1,88 @@
+"""
+Fingerprint of machine and interpreter recorded with every run and noise of
+machine measured by reference micro-benchmark before and after the suite
+"""
+from __future__ import division
+import os
+import platform
+import sys
+import sysconfig
+
+from pypete import stats as statistics
+from pypete.reference import reference_time
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except (IOError, OSError):
+        return None
+
+
+def cpu_model():
+    """
+    Return model name of CPU from /proc/cpuinfo or platform
+    :return: string
+    """
+    cpuinfo = _read('/proc/cpuinfo') or ''
+    for line in cpuinfo.splitlines():
+        key, _, value = line.partition(':')
+        if key.strip() in ('model name', 'Hardware', 'cpu model'):
+            return value.strip()
+    return platform.processor() or None
+
+
+def cpu_frequency():
+    """
+    Return governor and current, minimal and maximal frequency in MHz of
+    first CPU from /sys where available
+    :return: dict
+    """
+    base = '/sys/devices/system/cpu/cpu0/cpufreq/'
+    result = {'governor': _read(base + 'scaling_governor')}
+    for name, path in (('current', 'scaling_cur_freq'), ('min', 'scaling_min_freq'),
+                       ('max', 'scaling_max_freq')):
+        value = _read(base + path)
+        result[name] = int(value) / 1000 if value and value.isdigit() else None
+    return result
+
+
+def interpreter():
+    """
+    Return version, build and commit of Python interpreter
+    :return: dict
+    """
+    git = getattr(sys, '_git', None)
+    return {'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'build': ' '.join(platform.python_build()),
+            'compiler': platform.python_compiler(),
+            'config_args': sysconfig.get_config_var('CONFIG_ARGS'),
+            'commit': git[1] if git and git[1] else platform.python_revision() or None}
+
+
+def environment():
+    """
+    Return fingerprint of environment of run
+    :return: dict
+    """
+    result = interpreter()
+    result.update({'platform': platform.platform(),
+                   'node': platform.node(),
+                   'cpu': cpu_model(),
+                   'cpus': os.cpu_count(),
+                   'frequency': cpu_frequency(),
+                   'load': os.getloadavg() if hasattr(os, 'getloadavg') else None})
+    return result
+
+
+def reference_sample(samples=5):
+    """
+    Run reference micro-benchmark several times
+    :param samples: number of runs
+    :return: dict with best time and noise as coefficient of variation
+    """
+    times = [reference_time() for _ in range(samples)]
+    mean = statistics.mean(times)
+    return {'time': min(times), 'noise': statistics.stdev(times) / mean if mean > 0 else 0.0}
@@ -0,0 +1,206 @@
+"""
+Machine-readable exports of results selected by ``FORMAT:PATH``. Every
+exporter writes result of test as soon as it is measured:
+
+* ``openmetrics`` - OpenMetrics text file with gauge per test and statistic
+  for textfile collector of node exporter; it is written next to PATH and
+  renamed to PATH when complete, so the collector never reads half of it
+* ``csv`` - flat table with row per test
+* ``junit`` - JUnit XML with test case per test, its median as time and
+  statistics as properties; tests that were not benchmarked are skipped
+"""
+from __future__ import division
+import os
+import csv
+import datetime
+from xml.sax.saxutils import escape, quoteattr
+
+
+# statistics of result exported in this order, missing ones are left out
+STATISTICS = ('best', 'median', 'average', 'worst', 'mad', 'iqr', 'fixture')
+
+
+def _statistics(stats):
+    values = [(name, stats[name]) for name in STATISTICS if name in stats]
+    if 'ci' in stats:
+        values.extend([('ci_low', stats['ci'][0]), ('ci_high', stats['ci'][1])])
+    for name, value in sorted(stats.get('percentiles', {}).items()):
+        values.append((name, value))
+    return values
+
+
+class Exporter(object):
+    """
+    Base of exporters, subclasses write header when opened, result of every
+    test and footer when closed
+    :param path: path of exported file
+    :param info: dict with information about run
+    """
+    newline = None
+
+    def __init__(self, path, info):
+        self.path = path
+        self.info = info
+        self.file = open(self.output_path(), 'w', newline=self.newline)
+
+    def output_path(self):
+        return self.path
+
+    def write(self, test_id, stats):
+        """
+        Export result of test
+        :param test_id: id of test
+        :param stats: processed results of test
+        :return:
+        """
+        raise NotImplementedError
+
+    def skip(self, test_id, reason):
+        """
+        Export test that was not benchmarked
+        :param test_id: id of test
+        :param reason: why test was not benchmarked
+        :return:
+        """
+
+    def close(self):
+        self.file.close()
+
+
+class OpenMetricsExporter(Exporter):
+    """
+    OpenMetrics text file with single metric family, so results of tests can
+    follow one another
+    """
+    family = 'pypete_benchmark_seconds'
+
+    def __init__(self, path, info):
+        super(OpenMetricsExporter, self).__init__(path, info)
+        self.file.write('# TYPE {0} gauge\n# UNIT {0} seconds\n'
+                        '# HELP {0} Time of one call of benchmarked test.\n'.format(self.family))
+        self.file.flush()
+
+    def output_path(self):
+        return self.path + '.tmp'
+
+    @staticmethod
+    def label(value):
+        return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    def write(self, test_id, stats):
+        for name, value in _statistics(stats):
+            self.file.write('{0}{{test="{1}",statistic="{2}"}} {3!r}\n'.format(
+                self.family, self.label(test_id), name, float(value)))
+        self.file.flush()
+
+    def close(self):
+        self.file.write('# EOF\n')
+        super(OpenMetricsExporter, self).close()
+        os.rename(self.output_path(), self.path)
+
+
+class CSVExporter(Exporter):
+    """
+    CSV file with row per test
+    """
+    columns = ('test', 'date', 'repeat', 'number') + STATISTICS + (
+        'ci_low', 'ci_high', 'outliers', 'cached')
+    newline = ''
+
+    def __init__(self, path, info):
+        super(CSVExporter, self).__init__(path, info)
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(self.columns)
+        self.file.flush()
+
+    def write(self, test_id, stats):
+        row = dict(_statistics(stats))
+        row.update({'test': test_id,
+                    'date': self.info['date'],
+                    'repeat': stats['repeat'],
+                    'number': stats['number'],
+                    'outliers': stats.get('outliers'),
+                    'cached': int('reused' in stats)})
+        self.writer.writerow(['' if row.get(c) is None else row[c] for c in self.columns])
+        self.file.flush()
+
+
+class JUnitExporter(Exporter):
+    """
+    JUnit XML with test case per test. Number of tests is not known when
+    results start to be written, so suite has no counts.
+    """
+
+    def __init__(self, path, info):
+        super(JUnitExporter, self).__init__(path, info)
+        # JUnit schema requires ISO 8601 timestamp without time zone
+        timestamp = datetime.datetime.fromisoformat(self.info['date']).isoformat(timespec='seconds')
+        self.file.write('<?xml version="1.0" encoding="utf-8"?>\n<testsuites>\n'
+                        '  <testsuite name="pypete" timestamp={0}>\n'.format(quoteattr(timestamp)))
+        self.file.flush()
+
+    @staticmethod
+    def names(test_id):
+        # arguments of generated tests may contain dots, e.g. test(0.5,)
+        path, paren, arguments = test_id.partition('(')
+        classname, _, name = path.rpartition('.')
+        return quoteattr(classname), quoteattr(name + paren + arguments)
+
+    def write(self, test_id, stats):
+        classname, name = self.names(test_id)
+        properties = [('repeat', stats['repeat']), ('number', stats['number'])]
+        properties.extend(_statistics(stats))
+        if 'outliers' in stats:
+            properties.append(('outliers', stats['outliers']))
+        self.file.write('    <testcase classname={0} name={1} time="{2:.9f}">\n'
+                        '      <properties>\n'.format(
+                            classname, name, stats.get('median', stats['average'])))
+        for key, value in properties:
+            self.file.write('        <property name={0} value={1}/>\n'.format(
+                quoteattr(key), quoteattr(repr(value) if isinstance(value, float) else str(value))))
+        self.file.write('      </properties>\n    </testcase>\n')
+        self.file.flush()
+
+    def skip(self, test_id, reason):
+        classname, name = self.names(test_id)
+        self.file.write('    <testcase classname={0} name={1} time="0">\n'
+                        '      <skipped message={2}>{3}</skipped>\n    </testcase>\n'.format(
+                            classname, name, quoteattr(reason), escape(reason)))
+        self.file.flush()
+
+    def close(self):
+        self.file.write('  </testsuite>\n</testsuites>\n')
+        super(JUnitExporter, self).close()
+
+
+EXPORTERS = {
+    'openmetrics': OpenMetricsExporter,
+    'csv': CSVExporter,
+    'junit': JUnitExporter,
+}
+
+
+def parse_export(spec):
+    """
+    Parse selection of export
+    :param spec: ``FORMAT:PATH``
+    :return: tuple of format and path
+    """
+    fmt, sep, path = spec.partition(':')
+    if not sep or not path:
+        raise ValueError('Export {0!r} is not in form FORMAT:PATH'.format(spec))
+    if fmt not in EXPORTERS:
+        raise ValueError('Unknown export format {0!r}, use one of {1}'.format(
+            fmt, ', '.join(sorted(EXPORTERS))))
+    return fmt, path
+
+
+def create_exporter(spec, info):
+    """
+    Create exporter selected by ``FORMAT:PATH``
+    :param spec: format and path of export
+    :param info: dict with information about run
+    :return: Exporter
+    """
+    fmt, path = parse_export(spec)
+    return EXPORTERS[fmt](path, info)
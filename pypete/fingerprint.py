@@ -0,0 +1,139 @@
+"""
+Fingerprints of test code used to find out whether test changed between runs
+"""
+import hashlib
+import os.path
+import sys
+import sysconfig
+import types
+
+
+def _const_repr(const):
+    """
+    Representation of constant of code object that is the same in every
+    process; order of items of frozenset depends on hash seed of strings
+    """
+    if isinstance(const, types.CodeType):
+        digest = hashlib.sha1()
+        _update_code(digest, const)
+        return '<code {0}>'.format(digest.hexdigest())
+    if isinstance(const, (frozenset, set)):
+        return 'frozenset({{{0}}})'.format(', '.join(sorted(_const_repr(c) for c in const)))
+    if isinstance(const, tuple):
+        return '({0})'.format(''.join(_const_repr(c) + ', ' for c in const))
+    return repr(const)
+
+
+def _update_code(digest, code):
+    digest.update(code.co_code)
+    digest.update(repr(code.co_names).encode('utf-8'))
+    for const in code.co_consts:
+        digest.update(_const_repr(const).encode('utf-8'))
+
+
+def _update_function(digest, func, seen):
+    func = getattr(func, '__func__', func)
+    if id(func) in seen:
+        return
+    seen.add(id(func))
+    code = getattr(func, '__code__', None)
+    if code is None:
+        name = '{0}.{1}'.format(getattr(func, '__module__', None),
+                                getattr(func, '__qualname__', repr(func)))
+        digest.update(name.encode('utf-8'))
+        return
+    _update_code(digest, code)
+    # decorators keep the decorated function in closure
+    for cell in func.__closure__ or ():
+        try:
+            content = cell.cell_contents
+        except ValueError:
+            continue
+        if isinstance(content, (types.FunctionType, types.MethodType)):
+            _update_function(digest, content, seen)
+
+
+def code_fingerprint(func):
+    """
+    Return hash of bytecode of function and functions it decorates
+    :param func: function
+    :return: hex digest
+    """
+    digest = hashlib.sha1()
+    _update_function(digest, func, set())
+    return digest.hexdigest()
+
+
+_file_hashes = {}
+
+
+def _library_paths():
+    paths = set()
+    for name in ('stdlib', 'platstdlib', 'purelib', 'platlib'):
+        path = sysconfig.get_paths().get(name)
+        if path:
+            paths.add(os.path.realpath(path))
+    return tuple(paths)
+
+
+def _source(module, libraries):
+    path = getattr(module, '__file__', None)
+    if not path:
+        return None
+    path = os.path.realpath(path)
+    if path.endswith(('.pyc', '.pyo')):
+        path = path[:-1]
+    if path.startswith(libraries) or not os.path.exists(path):
+        return None
+    return path
+
+
+def _file_hash(path):
+    if path not in _file_hashes:
+        with open(path, 'rb') as f:
+            _file_hashes[path] = hashlib.sha1(f.read()).hexdigest()
+    return _file_hashes[path]
+
+
+def dependencies(module):
+    """
+    Return source files of module and of project modules it imports,
+    transitively. Modules of standard library and installed packages are
+    left out, only their names matter.
+    :param module: module
+    :return: sorted list of paths
+    """
+    libraries = _library_paths()
+    seen = set()
+    sources = set()
+    queue = [module]
+    while queue:
+        module = queue.pop()
+        if module is None or id(module) in seen:
+            continue
+        seen.add(id(module))
+        path = _source(module, libraries)
+        if path is None:
+            continue
+        sources.add(path)
+        for value in list(vars(module).values()):
+            if isinstance(value, types.ModuleType):
+                queue.append(value)
+            elif isinstance(getattr(value, '__module__', None), str):
+                queue.append(sys.modules.get(value.__module__))
+    return sorted(sources)
+
+
+def dependency_fingerprint(func):
+    """
+    Return hash of bytecode of function together with source files of its
+    module and project modules imported by it
+    :param func: function
+    :return: hex digest
+    """
+    digest = hashlib.sha1(code_fingerprint(func).encode('utf-8'))
+    module = sys.modules.get(getattr(func, '__module__', None))
+    for path in dependencies(module):
+        digest.update(path.encode('utf-8'))
+        digest.update(_file_hash(path).encode('utf-8'))
+    return digest.hexdigest()
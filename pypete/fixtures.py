@@ -0,0 +1,107 @@
+"""
+Timers running setUp and tearDown of test around every call and timing only
+the test body. They have interface of ``timeit.Timer``, time spent in fixtures
+of every experiment is collected in ``fixture`` list.
+"""
+from __future__ import division
+import time
+
+from pypete.case import fresh_case, test_body
+from pypete.histogram import call_overhead
+from pypete.timers import gc_control
+
+
+# maximal number of copies of test case set up at once by BatchedTimer
+MAX_BATCH = 10000
+
+
+def _noop():
+    pass
+
+
+class PedanticTimer(object):
+    """
+    Run setUp, body and tearDown for every call, time body only with
+    overhead of timer subtracted
+    """
+
+    def __init__(self, case, timer=time.perf_counter_ns, gc_mode='off'):
+        self.case = case
+        self.timer = timer
+        self.gc_mode = gc_mode
+        self.overhead = call_overhead(timer)
+        self.fixture = []
+
+    def timeit(self, number):
+        with gc_control(self.gc_mode):
+            return self._timeit(number)
+
+    def _timeit(self, number):
+        timer = self.timer
+        body = test_body(self.case)
+        measured = 0
+        fixture = 0
+        for _ in range(number):
+            t0 = timer()
+            self.case.setUp()
+            t1 = timer()
+            body()
+            t2 = timer()
+            self.case.tearDown()
+            t3 = timer()
+            measured += t2 - t1
+            fixture += t1 - t0 + t3 - t2
+        self.fixture.append(fixture / 1e9)
+        return max(measured - number * self.overhead, 0) / 1e9
+
+    def repeat(self, repeat, number):
+        return [self.timeit(number) for _ in range(repeat)]
+
+
+class BatchedTimer(PedanticTimer):
+    """
+    Prepare ``number`` new instances of test case with setUp called on each,
+    then time calls of their bodies back to back and tear them down
+    afterwards. Experiment with more than MAX_BATCH calls runs in batches of
+    this size. See fresh_case for cases that can not be instantiated anew.
+    """
+
+    def __init__(self, case, timer=time.perf_counter_ns, gc_mode='off'):
+        super(BatchedTimer, self).__init__(case, timer, gc_mode)
+        self.loop_overhead = {}
+
+    def _loop_overhead(self, number):
+        if number not in self.loop_overhead:
+            bodies = [_noop] * number
+            t0 = self.timer()
+            for body in bodies:
+                body()
+            self.loop_overhead[number] = self.timer() - t0
+        return self.loop_overhead[number]
+
+    def _timeit(self, number):
+        measured = 0
+        fixture = 0
+        for start in range(0, number, MAX_BATCH):
+            batch_measured, batch_fixture = self._batch(min(MAX_BATCH, number - start))
+            measured += batch_measured
+            fixture += batch_fixture
+        self.fixture.append(fixture / 1e9)
+        return measured / 1e9
+
+    def _batch(self, number):
+        timer = self.timer
+        overhead = self._loop_overhead(number)
+        t0 = timer()
+        cases = [fresh_case(self.case) for _ in range(number)]
+        for case in cases:
+            case.setUp()
+        bodies = [test_body(case) for case in cases]
+        t1 = timer()
+        for body in bodies:
+            body()
+        t2 = timer()
+        for case in cases:
+            case.tearDown()
+        t3 = timer()
+        return max(t2 - t1 - overhead, 0), t1 - t0 + t3 - t2
@@ -0,0 +1,141 @@
+"""
+Latency histogram of individual calls kept in fixed memory
+"""
+from __future__ import division
+import math
+import time
+from array import array
+
+
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+class Histogram(object):
+    """
+    Log-bucketed histogram of non-negative integers in the spirit of
+    HdrHistogram. Values smaller than ``2 ** precision`` are counted exactly,
+    bigger values are grouped by power of two and every power of two is split
+    to ``2 ** (precision - 1)`` linear sub-buckets, so relative error of
+    recorded value is below ``2 ** (1 - precision)``. Memory use depends only on
+    ``precision`` and ``max_bits``, not on number of recorded values.
+    """
+
+    def __init__(self, precision=8, max_bits=48):
+        self.precision = precision
+        self.half = 1 << (precision - 1)
+        self.max_value = (1 << max_bits) - 1
+        self.counts = array('L', [0]) * ((max_bits - precision + 2) * self.half)
+        self.total = 0
+
+    def _index(self, value):
+        shift = value.bit_length() - self.precision
+        if shift <= 0:
+            return value
+        return shift * self.half + (value >> shift)
+
+    def _value(self, index):
+        """
+        Middle of bucket with given index
+        """
+        if index < 2 * self.half:
+            return index
+        shift = index // self.half - 1
+        sub = index - shift * self.half
+        return (sub << shift) + (1 << shift) // 2
+
+    def record(self, value, count=1):
+        """
+        Record value
+        :param value: non-negative integer, bigger values than max are clamped
+        :param count: number of occurrences
+        :return:
+        """
+        self.counts[self._index(min(max(value, 0), self.max_value))] += count
+        self.total += count
+
+    def percentile(self, percent):
+        """
+        Return value at given percentile
+        :param percent: float from 0 to 100
+        :return: value or None if histogram is empty
+        """
+        if not self.total:
+            return None
+        rank = max(int(math.ceil(percent / 100 * self.total)), 1)
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return self._value(index)
+
+    def percentiles(self, percents=PERCENTILES):
+        """
+        Return dict with values of given percentiles named like ``p99.9``
+        """
+        return dict(('p{0:g}'.format(p), self.percentile(p)) for p in percents)
+
+
+def _noop():
+    pass
+
+
+def call_overhead(timer=time.perf_counter_ns, samples=10000):
+    """
+    Median time measured around call of empty function, i.e. overhead of timer
+    and of call itself
+    :param timer: timer returning integer
+    :param samples: number of measurements
+    :return: overhead in timer units
+    """
+    timing = []
+    for _ in range(samples):
+        t0 = timer()
+        _noop()
+        t1 = timer()
+        timing.append(t1 - t0)
+    timing.sort()
+    return timing[len(timing) // 2]
+
+
+def record_calls(func, calls, histogram=None, timer=time.perf_counter_ns):
+    """
+    Time individual calls of func and record them in histogram with timer
+    and call overhead subtracted
+    :param func: callable without arguments
+    :param calls: number of calls
+    :param histogram: histogram to update, new one is created if None
+    :param timer: timer returning nanoseconds
+    :return: histogram of call durations in nanoseconds
+    """
+    if histogram is None:
+        histogram = Histogram()
+    overhead = call_overhead(timer)
+    record = histogram.record
+    for _ in range(calls):
+        t0 = timer()
+        func()
+        t1 = timer()
+        record(t1 - t0 - overhead)
+    return histogram
+
+
+async def record_awaits(call, calls, histogram=None, timer=time.perf_counter_ns):
+    """
+    Time individual awaits of coroutines created by call, all of them in
+    single coroutine, so event loop is started only once
+    :param call: callable without arguments returning coroutine
+    :param calls: number of calls
+    :param histogram: histogram to update, new one is created if None
+    :param timer: timer returning nanoseconds
+    :return: histogram of call durations in nanoseconds
+    """
+    if histogram is None:
+        histogram = Histogram()
+    overhead = call_overhead(timer)
+    record = histogram.record
+    for _ in range(calls):
+        t0 = timer()
+        await call()
+        t1 = timer()
+        record(t1 - t0 - overhead)
+    return histogram
@@ -0,0 +1,237 @@
+"""
+Append-only history of benchmark results stored in SQLite database. Every
+result is committed as soon as it is measured and all runs are kept together
+with their environment, indexed by test id and date.
+"""
+import json
+import sqlite3
+from collections.abc import Mapping
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    info TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    test_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    best REAL NOT NULL,
+    avg REAL NOT NULL,
+    worst REAL NOT NULL,
+    experiment TEXT NOT NULL,
+    median REAL
+);
+CREATE INDEX IF NOT EXISTS results_test_date ON results (test_id, date);
+CREATE TABLE IF NOT EXISTS complexity (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    group_id TEXT NOT NULL,
+    complexity TEXT NOT NULL,
+    coefficient REAL NOT NULL,
+    changed INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS complexity_group ON complexity (group_id, run_id);
+"""
+
+
+def robust_time(experiment):
+    """
+    Return time by which experiments are ranked: median of samples, average
+    for experiments saved without it
+    :param experiment: dict of saved experiment
+    :return: float
+    """
+    return experiment.get('median', experiment['avg'])
+
+
+def new_record(experiment):
+    """
+    Return record of test in results file with single experiment
+    :param experiment: dict of experiment
+    :return: dict with last, best and worst experiment
+    """
+    return {'last': experiment, 'best': experiment, 'worst': experiment}
+
+
+def update_record(record, experiment):
+    """
+    Update record of test in results file with new experiment
+    :param record: dict with last, best and worst experiment or None
+    :param experiment: dict of experiment
+    :return: updated record
+    """
+    if record is None:
+        return new_record(experiment)
+    record['last'] = experiment
+    if robust_time(record['best']) > robust_time(experiment):
+        record['best'] = experiment
+    if robust_time(record['worst']) < robust_time(experiment):
+        record['worst'] = experiment
+    return record
+
+
+class History(object):
+    """
+    History of results in SQLite database
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+        self._migrate()
+        self.run_id = None
+
+    def _migrate(self):
+        columns = [row[1] for row in self.connection.execute('PRAGMA table_info(results)')]
+        with self.connection:
+            if 'median' not in columns:
+                self.connection.execute('ALTER TABLE results ADD COLUMN median REAL')
+            # rows of older versions have no median, they are ranked by average
+            self.connection.execute('UPDATE results SET median = avg WHERE median IS NULL')
+            self.connection.execute('DROP INDEX IF EXISTS results_test_avg')
+            self.connection.execute('CREATE INDEX IF NOT EXISTS results_test_median '
+                                    'ON results (test_id, median)')
+
+    def start_run(self, info):
+        """
+        Register new run, results appended later belong to it
+        :param info: dict with information about run and environment
+        :return: id of run
+        """
+        with self.connection:
+            cursor = self.connection.execute('INSERT INTO runs (date, info) VALUES (?, ?)',
+                                             (info['date'], json.dumps(info)))
+        self.run_id = cursor.lastrowid
+        return self.run_id
+
+    def update_run(self, info):
+        """
+        Replace information about current run
+        :param info: dict with information about run and environment
+        :return:
+        """
+        with self.connection:
+            self.connection.execute('UPDATE runs SET info = ? WHERE id = ?',
+                                    (json.dumps(info), self.run_id))
+
+    def append(self, test_id, experiment):
+        """
+        Store result of test in current run
+        :param test_id: id of test
+        :param experiment: dict with info, best, avg, worst and other measurements
+        :return:
+        """
+        with self.connection:
+            self.connection.execute(
+                'INSERT INTO results (run_id, test_id, date, best, avg, worst, median, experiment) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (self.run_id, test_id, experiment['info']['date'], experiment['best'],
+                 experiment['avg'], experiment['worst'], robust_time(experiment),
+                 json.dumps(experiment)))
+
+    def append_complexity(self, group_id, fit):
+        """
+        Store fitted complexity of generator test in current run
+        :param group_id: id of generator test
+        :param fit: dict with complexity, coefficient and changed flag
+        :return:
+        """
+        with self.connection:
+            self.connection.execute(
+                'INSERT INTO complexity (run_id, group_id, complexity, coefficient, changed) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (self.run_id, group_id, fit['complexity'], fit['coefficient'], int(fit['changed'])))
+
+    def last_complexity(self, group_id, before_run=None):
+        """
+        Return complexity fitted in last run of generator test
+        :param group_id: id of generator test
+        :param before_run: consider only runs older than this run id
+        :return: name of complexity or None
+        """
+        row = self.connection.execute(
+            'SELECT complexity FROM complexity WHERE group_id = ? AND run_id < ? '
+            'ORDER BY run_id DESC LIMIT 1', (group_id, self._bound(before_run))).fetchone()
+        return row[0] if row else None
+
+    def _select(self, query, parameters):
+        return [json.loads(row[0]) for row in self.connection.execute(query, parameters)]
+
+    def last_runs(self, test_id, limit=50, before_run=None):
+        """
+        Return experiments of last runs of test, newest first
+        :param test_id: id of test
+        :param limit: maximal number of experiments
+        :param before_run: consider only runs older than this run id
+        :return: list of experiments
+        """
+        return self._select('SELECT experiment FROM results WHERE test_id = ? AND run_id < ? '
+                            'ORDER BY date DESC LIMIT ?',
+                            (test_id, self._bound(before_run), limit))
+
+    def summary(self, test_id, before_run=None):
+        """
+        Return last, best and worst experiment of test as saved in results
+        file, best and worst are according to median, see robust_time
+        :param test_id: id of test
+        :param before_run: consider only runs older than this run id
+        :return: dict or None if test has no results
+        """
+        bound = self._bound(before_run)
+        last = self.last_runs(test_id, 1, before_run)
+        if not last:
+            return None
+        query = 'SELECT experiment FROM results WHERE test_id = ? AND run_id < ? ORDER BY median {0} LIMIT 1'
+        record = {'last': last[0],
+                  'best': self._select(query.format('ASC'), (test_id, bound))[0],
+                  'worst': self._select(query.format('DESC'), (test_id, bound))[0]}
+        if 'calibration' in last[0]:
+            record['calibration'] = last[0]['calibration']
+        return record
+
+    def summaries(self, before_run=None):
+        """
+        Return lazy mapping test id -> summary
+        :param before_run: consider only runs older than this run id
+        :return: Summaries
+        """
+        return Summaries(self, before_run)
+
+    def test_ids(self):
+        return [row[0] for row in self.connection.execute('SELECT DISTINCT test_id FROM results')]
+
+    def _bound(self, before_run):
+        return 2 ** 62 if before_run is None else before_run
+
+    def close(self):
+        self.connection.close()
+
+
+class Summaries(Mapping):
+    """
+    Read-only mapping of test ids to summaries computed on demand, so only
+    results of tests that are asked for are loaded
+    """
+
+    def __init__(self, history, before_run=None):
+        self.history = history
+        self.before_run = before_run
+        self._cache = {}
+
+    def __getitem__(self, test_id):
+        if test_id not in self._cache:
+            self._cache[test_id] = self.history.summary(test_id, self.before_run)
+        if self._cache[test_id] is None:
+            raise KeyError(test_id)
+        return self._cache[test_id]
+
+    def __iter__(self):
+        return iter(self.history.test_ids())
+
+    def __len__(self):
+        return len(self.history.test_ids())
@@ -0,0 +1,324 @@
+"""
+Benchmarking in fresh Python interpreter. Parent spawns ``python -m
+pypete.isolate``, sends it description of the test case and settings of
+measurement through its stdin and receives samples through a dedicated pipe,
+so output of the test does not interfere. Samples are sent as packed array of
+doubles, other measurements are pickled.
+
+Every message is prefixed by its length. Responses start with status byte,
+``0`` for success and ``1`` for error followed by formatted traceback.
+"""
+import os
+import sys
+import pickle
+import struct
+import traceback
+import subprocess
+import unittest
+from array import array
+
+
+class IsolationError(Exception):
+    """
+    Test could not be benchmarked in isolated interpreter
+    """
+
+
+_LENGTH = struct.Struct('<I')
+_HEADER = struct.Struct('<QI')
+
+
+def write_frame(stream, data):
+    stream.write(_LENGTH.pack(len(data)) + data)
+    stream.flush()
+
+
+def _read_exactly(stream, size):
+    data = b''
+    while len(data) < size:
+        chunk = stream.read(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+def read_frame(stream):
+    """
+    Read one message
+    :param stream: binary stream
+    :return: bytes or None at end of stream
+    """
+    header = _read_exactly(stream, _LENGTH.size)
+    if header is None:
+        return None
+    return _read_exactly(stream, _LENGTH.unpack(header)[0])
+
+
+def encode_measurement(measurement):
+    """
+    Encode measurement as number and count of experiments followed by their
+    timing as doubles and pickle of other measurements
+    """
+    timing = measurement['timing']
+    extras = dict((k, v) for k, v in measurement.items() if k not in ('timing', 'number'))
+    return (_HEADER.pack(measurement['number'], len(timing)) +
+            array('d', timing).tobytes() + pickle.dumps(extras, pickle.HIGHEST_PROTOCOL))
+
+
+def decode_measurement(data):
+    number, count = _HEADER.unpack_from(data)
+    end = _HEADER.size + 8 * count
+    timing = array('d')
+    timing.frombytes(data[_HEADER.size:end])
+    measurement = pickle.loads(data[end:])
+    measurement['timing'] = timing.tolist()
+    measurement['number'] = number
+    return measurement
+
+
+def case_spec(case):
+    """
+    Describe test case, so it can be rebuilt in other interpreter. Test
+    classes and functions are pickled by reference, so unpickling imports the
+    test module.
+    :param case: unittest or nose test case
+    :return: dict
+    """
+    if type(case).__module__ == 'nose.case':
+        if hasattr(case, 'inst'):
+            if getattr(case.test, '__self__', None) is case.inst:
+                return {'class': case.cls, 'name': case.test.__name__, 'arg': case.arg}
+            return {'class': case.cls, 'function': case.test, 'arg': case.arg}
+        return {'function': case.test, 'arg': case.arg,
+                'setup': case.setUpFunc, 'teardown': case.tearDownFunc}
+    return {'case_class': type(case), 'name': case._testMethodName}
+
+
+def _first_attribute(obj, names):
+    for name in names:
+        func = getattr(obj, name, None)
+        if func is not None:
+            return func
+    return None
+
+
+class IsolatedCase(unittest.TestCase):
+    """
+    Test case rebuilt from function, its arguments and fixtures
+    """
+
+    def __init__(self, func, arg=(), setup=None, teardown=None):
+        super(IsolatedCase, self).__init__('runTest')
+        self.func = self.test = func
+        self.arg = arg
+        self.setup = setup
+        self.teardown = teardown
+
+    def setUp(self):
+        if self.setup is not None:
+            self.setup()
+
+    def tearDown(self):
+        if self.teardown is not None:
+            self.teardown()
+
+    def runTest(self):
+        self.func(*self.arg)
+
+    def __str__(self):
+        return '{0}{1}'.format(getattr(self.func, '__qualname__', self.func), self.arg or '')
+
+
+def build_case(spec):
+    """
+    Rebuild test case from its description
+    :param spec: dict returned by case_spec
+    :return: unittest test case
+    """
+    if 'case_class' in spec:
+        return spec['case_class'](spec['name'])
+    if 'class' in spec:
+        inst = spec['class']()
+        func = getattr(inst, spec['name']) if 'name' in spec else spec['function']
+        return IsolatedCase(func, spec['arg'],
+                            _first_attribute(inst, ('setup', 'setUp')),
+                            _first_attribute(inst, ('teardown', 'tearDown')))
+    func = spec['function']
+    return IsolatedCase(func, spec['arg'],
+                        spec['setup'] or _first_attribute(func, ('setup', 'setUp', 'setUpFunc')),
+                        spec['teardown'] or _first_attribute(func, ('teardown', 'tearDown',
+                                                                    'tearDownFunc')))
+
+
+class Client(object):
+    """
+    Client sending commands to server of isolated interpreter or remote node
+    :param commands: binary stream of commands
+    :param results: binary stream of responses
+    :param path: sys.path of server
+    """
+
+    def __init__(self, commands, results, path):
+        self.commands = commands
+        self.results = results
+        self.path = path
+        self.broken = False
+
+    def exited(self):
+        """
+        Return description of server that closed connection
+        :return: string
+        """
+        return 'Server closed connection'
+
+    def call(self, command, **payload):
+        """
+        Send command to server and wait for its response
+        :param command: name of command
+        :param payload: arguments of command
+        :return: bytes of response
+        """
+        payload['command'] = command
+        try:
+            write_frame(self.commands, pickle.dumps(payload, pickle.HIGHEST_PROTOCOL))
+            response = read_frame(self.results)
+        except (OSError, ValueError):
+            response = None
+        if response is None:
+            self.broken = True
+            raise IsolationError(self.exited())
+        if response[:1] != b'\x00':
+            raise IsolationError(response[1:].decode('utf-8'))
+        return response[1:]
+
+    def load(self, benchmark, case):
+        """
+        Load test case and settings of measurement
+        :param benchmark: pypete.core.Benchmark
+        :param case: unittest or nose test case
+        :return:
+        """
+        try:
+            spec = pickle.dumps(case_spec(case), pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, AttributeError, TypeError) as e:
+            raise IsolationError('Test {0} can not be isolated: {1}'.format(case, e))
+        self.call('load', path=self.path, spec=spec, benchmark=benchmark)
+
+    def measure(self, test_id, calibration=None, budget=None):
+        """
+        Measure loaded test case
+        :return: measurement as returned by Benchmark.measure
+        """
+        return decode_measurement(self.call('measure', test_id=test_id,
+                                            calibration=calibration, budget=budget))
+
+    def experiments(self, number, count=1):
+        """
+        Run experiments of loaded test case with given number
+        :param number: number of calls in one experiment
+        :param count: number of experiments
+        :return: list of timings
+        """
+        timing = array('d')
+        timing.frombytes(self.call('experiments', number=number, count=count))
+        return timing.tolist()
+
+    def close(self):
+        self.commands.close()
+        self.results.close()
+
+
+class IsolatedInterpreter(Client):
+    """
+    Fresh Python interpreter benchmarking one test case
+    :param path: sys.path of interpreter, defaults to the current one
+    :param cwd: working directory of interpreter
+    """
+
+    def __init__(self, path=None, cwd=None):
+        receiver, sender = os.pipe()
+        # pypete itself is always imported from current path, path is set when test is loaded
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(p for p in sys.path if p))
+        try:
+            self.process = subprocess.Popen([sys.executable, '-m', 'pypete.isolate', str(sender)],
+                                            stdin=subprocess.PIPE, pass_fds=(sender,),
+                                            cwd=cwd, env=env)
+        finally:
+            os.close(sender)
+        super(IsolatedInterpreter, self).__init__(self.process.stdin, os.fdopen(receiver, 'rb'),
+                                                  list(sys.path if path is None else path))
+
+    def exited(self):
+        return 'Isolated interpreter exited with code {0}'.format(self.process.wait())
+
+    def close(self):
+        super(IsolatedInterpreter, self).close()
+        self.process.wait()
+
+
+def run_isolated(benchmark, case, test_id, calibration=None, budget=None):
+    """
+    Measure test case in fresh interpreter
+    :param benchmark: pypete.core.Benchmark
+    :param case: unittest or nose test case
+    :param test_id: id of test
+    :param calibration: cached calibration
+    :param budget: time budget in seconds
+    :return: measurement as returned by Benchmark.measure
+    """
+    interpreter = IsolatedInterpreter()
+    try:
+        interpreter.load(benchmark, case)
+        return interpreter.measure(test_id, calibration, budget)
+    finally:
+        interpreter.close()
+
+
+class Server(object):
+    """
+    Command loop of isolated interpreter
+    """
+
+    def __init__(self):
+        self.benchmark = None
+        self.case = None
+        self.timer = None
+
+    def load(self, path, spec, benchmark):
+        sys.path[:] = path
+        self.case = build_case(pickle.loads(spec))
+        self.benchmark = benchmark
+        self.timer = None
+        return b''
+
+    def experiments(self, number, count):
+        if self.timer is None:
+            self.timer = self.benchmark.get_timer(self.case)
+        return array('d', [self.timer.timeit(number) for _ in range(count)]).tobytes()
+
+    def measure(self, test_id, calibration, budget):
+        return encode_measurement(self.benchmark.measure(self.case, test_id, calibration, budget))
+
+    def serve(self, commands, results):
+        while True:
+            frame = read_frame(commands)
+            if frame is None:
+                return
+            try:
+                payload = pickle.loads(frame)
+                response = b'\x00' + getattr(self, payload.pop('command'))(**payload)
+            except Exception:
+                response = b'\x01' + traceback.format_exc().encode('utf-8')
+            write_frame(results, response)
+
+
+def main():
+    with os.fdopen(int(sys.argv[1]), 'wb') as results:
+        Server().serve(sys.stdin.buffer, results)
+
+
+if __name__ == '__main__':
+    # run from imported module, so rebuilt cases belong to pypete.isolate and not __main__
+    from pypete.isolate import main
+    main()
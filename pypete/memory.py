@@ -0,0 +1,97 @@
+"""
+Memory measurement of test body by tracemalloc
+"""
+from __future__ import division
+import linecache
+import tracemalloc
+
+
+class MemoryTrace(object):
+    """
+    Tracing of memory between start and stop. Retained memory and retained
+    blocks are net differences of traced blocks before and after, so they
+    count only blocks still alive after the calls, not all allocations made
+    by them: tracemalloc forgets freed blocks and does not count allocations.
+    Retained blocks per call stand for allocations per call in reports and
+    regression checks.
+    """
+
+    def start(self):
+        self.was_tracing = tracemalloc.is_tracing()
+        if not self.was_tracing:
+            tracemalloc.start()
+        self.before = tracemalloc.take_snapshot()
+        self.current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+
+    def stop(self):
+        try:
+            _, self.peak = tracemalloc.get_traced_memory()
+            self.after = tracemalloc.take_snapshot()
+        finally:
+            if not self.was_tracing:
+                tracemalloc.stop()
+
+    def result(self, calls=1, top=5):
+        """
+        :param calls: number of calls between start and stop, results are per call
+        :param top: number of top allocating source lines
+        :return: dict with peak, retained, retained_blocks and top lines
+        """
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__),
+                   tracemalloc.Filter(False, __file__)]
+        differences = self.after.filter_traces(filters).compare_to(
+            self.before.filter_traces(filters), 'lineno')
+        return {'peak': self.peak - self.current,
+                'retained': sum(d.size_diff for d in differences) / calls,
+                'retained_blocks': sum(d.count_diff for d in differences) / calls,
+                'top': [_format_line(d, calls) for d in
+                        sorted(differences, key=lambda d: d.size_diff, reverse=True)[:top]
+                        if d.size_diff > 0]}
+
+
+def measure_memory(func, calls=1, top=5):
+    """
+    Run func under tracemalloc and measure its memory, see MemoryTrace
+    :param func: callable without arguments
+    :param calls: number of calls, results are per call
+    :param top: number of top allocating source lines
+    :return: dict with peak, retained, retained_blocks and top lines
+    """
+    trace = MemoryTrace()
+    trace.start()
+    try:
+        for _ in range(calls):
+            func()
+    finally:
+        trace.stop()
+    return trace.result(calls, top)
+
+
+async def measure_memory_awaits(call, calls=1, top=5):
+    """
+    Await coroutines created by call under tracemalloc and measure their
+    memory, see MemoryTrace
+    :param call: callable without arguments returning coroutine
+    :param calls: number of calls, results are per call
+    :param top: number of top allocating source lines
+    :return: dict with peak, retained, retained_blocks and top lines
+    """
+    trace = MemoryTrace()
+    trace.start()
+    try:
+        for _ in range(calls):
+            await call()
+    finally:
+        trace.stop()
+    return trace.result(calls, top)
+
+
+def _format_line(difference, calls):
+    frame = difference.traceback[0]
+    source = linecache.getline(frame.filename, frame.lineno).strip()
+    return {'file': frame.filename,
+            'line': frame.lineno,
+            'source': source,
+            'size': difference.size_diff / calls,
+            'count': difference.count_diff / calls}
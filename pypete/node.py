@@ -0,0 +1,396 @@
+"""
+Benchmarking on remote nodes. ``pypete-worker ADDRESS`` listens on TCP
+``host:port`` or Unix socket path and serves the same commands as isolated
+interpreter to coordinator, i.e. nose process run with ``--pypete-nodes``.
+Test code must be available on the node at the same import path. Every
+connection is served by forked child of the node, so each coordinator imports
+the current test code.
+
+Commands are pickled, so every connection is authenticated by shared key
+before any of them is read: both sides prove knowledge of the key by HMAC of
+random challenge of the other side. Key is read from file given by
+``--authkey-file`` (``--pypete-nodes-authkey-file`` of coordinator) or from
+``PYPETE_AUTHKEY`` environment variable. It is required on TCP; Unix socket
+without key relies on permissions of the socket file.
+
+Coordinator hands tests out to nodes as they become free. Coordinator and
+node run reference micro-benchmark alternately when connected and timings,
+sections and concurrency results of the node are scaled by ratio of the
+fastest reference times, so results of different hosts are comparable. Ratio
+within noise of the reference benchmark is not applied.
+"""
+from __future__ import division
+import os
+import sys
+import hmac
+import queue
+import socket
+import struct
+import hashlib
+import logging
+import optparse
+import threading
+import traceback
+
+from pypete import stats as statistics
+from pypete.isolate import Client, IsolationError, Server, read_frame, write_frame
+from pypete.reference import reference_time
+
+
+log = logging.getLogger('nose.plugins.pypete')
+
+_DOUBLE = struct.Struct('<d')
+
+# size of random challenge of authentication
+_CHALLENGE = 32
+
+# seconds given to peer to authenticate
+_HANDSHAKE_TIMEOUT = 10.0
+
+# number of alternating reference samples of coordinator and node
+REFERENCE_SAMPLES = 5
+
+# ratios of reference times closer to 1 are not applied
+MIN_SCALING = 0.05
+
+
+def parse_address(address):
+    """
+    Parse address of node
+    :param address: ``host:port`` or path of Unix socket
+    :return: tuple of socket family and address
+    """
+    if os.sep in address or ':' not in address:
+        return socket.AF_UNIX, address
+    host, _, port = address.rpartition(':')
+    return socket.AF_INET, (host or 'localhost', int(port))
+
+
+def read_authkey(path=None):
+    """
+    Read shared key of nodes and coordinator
+    :param path: file with key, PYPETE_AUTHKEY environment variable is used without it
+    :return: bytes or None if no key is given
+    """
+    if path:
+        with open(path, 'rb') as f:
+            return f.read().strip() or None
+    key = os.environ.get('PYPETE_AUTHKEY')
+    return key.encode('utf-8') if key else None
+
+
+def _digest(authkey, role, challenge):
+    return hmac.new(authkey, role + challenge, hashlib.sha256).digest()
+
+
+def accept_peer(commands, results, authkey):
+    """
+    Authenticate coordinator on node side. Node announces whether key is
+    required and sends its challenge, coordinator answers it together with
+    its own challenge, which node answers back.
+    :param commands: binary stream from coordinator
+    :param results: binary stream to coordinator
+    :param authkey: shared key or None
+    :return: whether coordinator is authenticated
+    """
+    if authkey is None:
+        write_frame(results, b'\x00')
+        return True
+    challenge = os.urandom(_CHALLENGE)
+    write_frame(results, b'\x01' + challenge)
+    answer = read_frame(commands)
+    if answer is None or len(answer) != hashlib.sha256().digest_size + _CHALLENGE or \
+            not hmac.compare_digest(answer[:-_CHALLENGE], _digest(authkey, b'client', challenge)):
+        return False
+    write_frame(results, _digest(authkey, b'server', answer[-_CHALLENGE:]))
+    return True
+
+
+def connect_peer(commands, results, authkey):
+    """
+    Authenticate node on coordinator side, see accept_peer
+    :param commands: binary stream to node
+    :param results: binary stream from node
+    :param authkey: shared key or None
+    :return:
+    """
+    greeting = read_frame(results)
+    if greeting is None:
+        raise IsolationError('Node closed connection')
+    if greeting[:1] == b'\x00':
+        if authkey is not None:
+            raise IsolationError('Node does not authenticate, refusing to use it with key')
+        return
+    if authkey is None:
+        raise IsolationError('Node requires authentication key')
+    challenge = os.urandom(_CHALLENGE)
+    write_frame(commands, _digest(authkey, b'client', greeting[1:]) + challenge)
+    answer = read_frame(results)
+    if answer is None:
+        raise IsolationError('Node rejected authentication key')
+    if not hmac.compare_digest(answer, _digest(authkey, b'server', challenge)):
+        raise IsolationError('Node failed authentication')
+
+
+class NodeServer(Server):
+    """
+    Command loop of node serving one coordinator. Path of coordinator is
+    added to path of node where the directories exist.
+    """
+
+    def load(self, path, spec, benchmark):
+        sys.path[:0] = [p for p in path if p and p not in sys.path and os.path.isdir(p)]
+        return super(NodeServer, self).load(list(sys.path), spec, benchmark)
+
+    def reference(self):
+        return _DOUBLE.pack(reference_time())
+
+
+def serve(address, once=False, authkey=None):
+    """
+    Serve coordinators connecting to address, one at a time, each by forked
+    child of the node
+    :param address: address of node
+    :param once: exit after first coordinator disconnects
+    :param authkey: shared key, required on TCP
+    :return:
+    """
+    family, address = parse_address(address)
+    if family == socket.AF_INET and authkey is None:
+        raise ValueError('Node listening on TCP requires authentication key')
+    listener = socket.socket(family, socket.SOCK_STREAM)
+    if family == socket.AF_INET:
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind(address)
+    listener.listen(1)
+    try:
+        while True:
+            connection, peer = listener.accept()
+            pid = os.fork()
+            if pid == 0:
+                listener.close()
+                _serve_connection(connection, peer or address, authkey)
+            connection.close()
+            os.waitpid(pid, 0)
+            if once:
+                return
+    finally:
+        listener.close()
+        if family == socket.AF_UNIX:
+            os.unlink(address)
+
+
+def _serve_connection(connection, peer, authkey):
+    """
+    Serve one coordinator in forked child and exit it, so test modules
+    imported and paths added for the coordinator do not outlive the
+    connection and next coordinator benchmarks the current code
+    :param connection: connected socket
+    :param peer: address of coordinator
+    :param authkey: shared key or None
+    :return: never returns
+    """
+    code = 0
+    try:
+        with connection, connection.makefile('rb') as commands, \
+                connection.makefile('wb') as results:
+            connection.settimeout(_HANDSHAKE_TIMEOUT)
+            try:
+                authenticated = accept_peer(commands, results, authkey)
+            except (OSError, ValueError):
+                authenticated = False
+            if not authenticated:
+                log.warning('Peer %s failed authentication', peer)
+                return
+            connection.settimeout(None)
+            log.info('Coordinator %s connected', peer)
+            NodeServer().serve(commands, results)
+    except BaseException:
+        code = 1
+        log.exception('Serving coordinator %s failed', peer)
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(code)
+
+
+def main(argv=None):
+    parser = optparse.OptionParser(usage='%prog [options] ADDRESS',
+                                   description='Benchmark tests handed out by pypete coordinator. '
+                                               'ADDRESS is host:port or path of Unix socket.')
+    parser.add_option('--once', action='store_true', default=False,
+                      help='Exit after first coordinator disconnects')
+    parser.add_option('--authkey-file', default=None, metavar='FILE',
+                      help='File with key shared with coordinators, PYPETE_AUTHKEY environment '
+                           'variable is used without it; required on TCP')
+    options, args = parser.parse_args(argv)
+    if len(args) != 1:
+        parser.error('exactly one ADDRESS is required')
+    authkey = read_authkey(options.authkey_file)
+    if parse_address(args[0])[0] == socket.AF_INET and authkey is None:
+        parser.error('authentication key is required on TCP, use --authkey-file or PYPETE_AUTHKEY')
+    logging.basicConfig(level=logging.INFO)
+    try:
+        serve(args[0], options.once, authkey)
+    except KeyboardInterrupt:
+        pass
+
+
+class Node(Client):
+    """
+    Connection to remote node
+    :param address: address of node
+    :param authkey: shared key or None
+    """
+
+    def __init__(self, address, authkey=None):
+        family, target = parse_address(address)
+        self.address = address
+        self.socket = socket.socket(family, socket.SOCK_STREAM)
+        self.socket.connect(target)
+        super(Node, self).__init__(self.socket.makefile('wb'), self.socket.makefile('rb'),
+                                   list(sys.path))
+        try:
+            connect_peer(self.commands, self.results, authkey)
+        except Exception:
+            self.close()
+            raise
+        self.factor = 1.0
+
+    def reference(self):
+        """
+        Run reference micro-benchmark on node
+        :return: time in seconds
+        """
+        return _DOUBLE.unpack(self.call('reference'))[0]
+
+    def exited(self):
+        return 'Node {0} closed connection'.format(self.address)
+
+    def close(self):
+        super(Node, self).close()
+        self.socket.close()
+
+
+def reference_factor(node, samples=REFERENCE_SAMPLES):
+    """
+    Run reference micro-benchmark alternately here and on node and return
+    ratio of fastest times. Ratio is 1 when the difference is within twice
+    the noise of reference samples or MIN_SCALING.
+    :param node: Node
+    :param samples: number of samples on each side
+    :return: factor of timings of node
+    """
+    local, remote = [], []
+    for _ in range(samples):
+        local.append(reference_time())
+        remote.append(node.reference())
+    noise = max(statistics.stdev(times) / statistics.mean(times) for times in (local, remote))
+    factor = min(local) / min(remote)
+    if abs(factor - 1) <= max(2 * noise, MIN_SCALING):
+        return 1.0
+    return factor
+
+
+def scale_measurement(measurement, factor):
+    """
+    Scale times in measurement of node by its factor
+    :param measurement: dict returned by Benchmark.measure
+    :param factor: factor of node
+    :return: measurement
+    """
+    measurement['timing'] = [t * factor for t in measurement['timing']]
+    if 'fixture' in measurement:
+        measurement['fixture'] = [t * factor for t in measurement['fixture']]
+    if 'sections' in measurement:
+        measurement['sections'] = dict((path, [t * factor for t in samples])
+                                       for path, samples in measurement['sections'].items())
+    for levels in measurement.get('concurrency', {}).values():
+        for level in levels:
+            level['throughput'] /= factor
+            level['latency'] *= factor
+    for name in ('user', 'system'):
+        if name in measurement.get('resources', {}):
+            measurement['resources'][name] *= factor
+    return measurement
+
+
+class NodePool(object):
+    """
+    Pool of remote nodes with interface of WorkerPool. Every node is served
+    by thread taking jobs from common queue; job is called with the node as
+    keyword argument. Node whose connection broke takes no more jobs.
+    :param addresses: addresses of nodes
+    :param authkey: shared key or None
+    """
+
+    def __init__(self, addresses, authkey=None):
+        self.nodes = [Node(address, authkey) for address in addresses]
+        for node in self.nodes:
+            node.factor = reference_factor(node)
+            log.info('Node %s scaling factor %.3f', node.address, node.factor)
+        self.jobs = queue.Queue()
+        self.done = {}
+        self.submitted = 0
+        self.condition = threading.Condition()
+        self.threads = [threading.Thread(target=self._serve, args=(node,)) for node in self.nodes]
+        for thread in self.threads:
+            thread.daemon = True
+            thread.start()
+
+    def _serve(self, node):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            key, func, args = job
+            try:
+                result = (True, func(*args, node=node))
+            except Exception:
+                result = (False, traceback.format_exc())
+            with self.condition:
+                self.done[key] = result
+                self.condition.notify_all()
+            if node.broken:
+                log.error('Node %s failed, it takes no more benchmarks', node.address)
+                return
+
+    def submit(self, key, func, *args):
+        """
+        Queue ``func(*args, node=node)`` to be run with first free node
+        :param key: key under which result will be returned by join
+        :param func: function to run
+        :param args: arguments of function
+        :return:
+        """
+        self.submitted += 1
+        self.jobs.put((key, func, args))
+
+    def join(self):
+        """
+        Wait for all submitted jobs, jobs left when all nodes failed are
+        returned as failed
+        :return: dict key -> (success, result or formatted traceback)
+        """
+        with self.condition:
+            while len(self.done) < self.submitted and any(t.is_alive() for t in self.threads):
+                self.condition.wait(1.0)
+            while True:
+                try:
+                    key, _, _ = self.jobs.get_nowait()
+                except queue.Empty:
+                    break
+                self.done[key] = (False, 'No node left to run benchmark')
+            done, self.done = self.done, {}
+            self.submitted = 0
+        return done
+
+    def close(self):
+        for _ in self.threads:
+            self.jobs.put(None)
+        for node in self.nodes:
+            node.close()
+
+
+if __name__ == '__main__':
+    main()
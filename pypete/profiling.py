@@ -0,0 +1,164 @@
+"""
+CPU profiling of tests by cProfile. Profiles are dumped as ``.pstats`` files
+per test id; profile of previous run is kept next to it, so the two can be
+compared. Any two profiles of the same test can be compared by::
+
+    from pypete.profiling import diff_profiles
+    diff_profiles('old.pstats', 'new.pstats')
+"""
+from __future__ import division
+import os
+import re
+import cProfile
+import pstats
+
+
+def _loop(func, calls):
+    for _ in range(calls):
+        func()
+
+
+def _start(call):
+    # coroutine is resumed by event loop after every suspension, which
+    # profiler counts as call, so calls are counted by this function
+    return call()
+
+
+async def _await_loop(call, calls):
+    for _ in range(calls):
+        await _start(call)
+
+
+def _key(func):
+    return func.__code__.co_filename, func.__code__.co_firstlineno, func.__name__
+
+
+_LOOP = _key(_loop)
+_START = _key(_start)
+_AWAIT_LOOP = _key(_await_loop)
+
+
+def profile(func, calls):
+    """
+    Profile calls of func
+    :param func: callable without arguments
+    :param calls: number of calls
+    :return: pstats.Stats
+    """
+    profiler = cProfile.Profile()
+    profiler.runcall(_loop, func, calls)
+    return pstats.Stats(profiler)
+
+
+async def profile_awaits(call, calls):
+    """
+    Profile awaits of coroutines created by call, all of them in single
+    coroutine, so event loop is started only once
+    :param call: callable without arguments returning coroutine
+    :param calls: number of calls
+    :return: pstats.Stats
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        await _await_loop(call, calls)
+    finally:
+        profiler.disable()
+    return pstats.Stats(profiler)
+
+
+def profile_paths(directory, test_id):
+    """
+    Return paths of current and previous profile of test
+    :param directory: directory with profiles
+    :param test_id: id of test
+    :return: tuple of current and previous path
+    """
+    name = re.sub(r'[^\w.()-]+', '_', test_id)
+    return (os.path.join(directory, name + '.pstats'),
+            os.path.join(directory, name + '.prev.pstats'))
+
+
+def dump(stats, directory, test_id):
+    """
+    Dump profile of test, profile of previous run is kept
+    :param stats: pstats.Stats
+    :param directory: directory with profiles
+    :param test_id: id of test
+    :return: tuple of current and previous path, previous is None if test
+        was not profiled before
+    """
+    os.makedirs(directory, exist_ok=True)
+    path, previous = profile_paths(directory, test_id)
+    if os.path.exists(path):
+        os.rename(path, previous)
+    else:
+        previous = None
+    stats.dump_stats(path)
+    return path, previous
+
+
+def _calls(stats):
+    """
+    Number of calls of profiled function, i.e. calls made by _loop or of
+    _start for coroutine tests
+    """
+    if _START in stats.stats:
+        return stats.stats[_START][1]
+    return sum(nc for cc, nc, tt, ct, callers in stats.stats.values() if _LOOP in callers) or 1
+
+
+def _name(key):
+    filename, line, function = key
+    if filename == '~':
+        return function
+    return '{0}:{1}({2})'.format(filename, line, function)
+
+
+def _per_call(stats):
+    calls = _calls(stats)
+    return dict((key, (nc / calls, tt / calls, ct / calls))
+                for key, (cc, nc, tt, ct, callers) in stats.stats.items()
+                if key not in (_LOOP, _START, _AWAIT_LOOP) and '_lsprof.Profiler' not in key[2])
+
+
+def _load(stats):
+    if isinstance(stats, pstats.Stats):
+        return stats
+    return pstats.Stats(stats)
+
+
+def top_functions(stats, n=10):
+    """
+    Return functions with highest cumulative time
+    :param stats: pstats.Stats or path to dumped profile
+    :param n: number of functions
+    :return: list of dicts with function, calls, tottime and cumtime, all per
+        call of profiled function
+    """
+    per_call = _per_call(_load(stats))
+    keys = sorted(per_call, key=lambda k: per_call[k][2], reverse=True)[:n]
+    return [{'function': _name(key),
+             'calls': per_call[key][0],
+             'tottime': per_call[key][1],
+             'cumtime': per_call[key][2]} for key in keys]
+
+
+def diff_profiles(old, new, n=10):
+    """
+    Return functions whose cumulative time changed most between profiles
+    :param old: pstats.Stats or path to older profile
+    :param new: pstats.Stats or path to newer profile
+    :param n: number of functions
+    :return: list of dicts with function, old and new cumtime and their
+        difference, all per call of profiled function
+    """
+    old, new = _per_call(_load(old)), _per_call(_load(new))
+    zero = (0, 0, 0)
+    differences = [{'function': _name(key),
+                    'old': old.get(key, zero)[2],
+                    'new': new.get(key, zero)[2],
+                    'delta': new.get(key, zero)[2] - old.get(key, zero)[2]}
+                   for key in set(old) | set(new)]
+    differences.sort(key=lambda d: abs(d['delta']), reverse=True)
+    return differences[:n]
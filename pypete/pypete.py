@@ -6,13 +6,140 @@ line.
 Plugin run tests ``number`` times and this experiment is repeated ``repeat``
 times. So for measurement test will be ran ``times x repeat`` times. If ``number``
 equals 0, plugin computes optimal number of tests so the time of each
-experiment is bigger than ``threshold``.
+experiment is bigger than ``threshold``. Computed ``number`` is cached in
+the file with results together with hash of test code and reused until the
+code changes or time per call drifts more than ``calibration-tolerance``.
+
+Garbage collector is disabled during experiments by default, use
+``--pypete-gc on`` to keep it enabled or ``--pypete-gc collect`` to collect
+garbage before every experiment. ``--pypete-warmup N`` runs N discarded
+experiments first and ``--pypete-timer`` selects timer. Overhead of empty
+timing loop is measured and subtracted from every experiment.
+
+With ``--pypete-mode pedantic`` ``setUp`` and ``tearDown`` run around every
+call and only test body is timed, ``--pypete-mode batched`` sets up all calls
+of experiment first and times bodies back to back. Time of fixtures is
+reported separately.
+
+With ``--pypete-precision 2%`` experiment is repeated until 95% confidence
+interval of mean (or median) is within 2% of it, but at most ``max-samples``
+times and for ``max-time`` seconds. Number of samples is reported.
+
+With ``--pypete-histogram`` every call of test body is timed separately and
+50th, 90th, 99th and 99.9th percentiles of call latency are reported.
+
+With ``--pypete-fail-on-regression 5%`` every test is compared with samples
+from its best saved run by one-sided Mann-Whitney U test. Tests significantly
+slower (at ``--pypete-alpha`` level) are marked as failures when even the
+lower bound of bootstrap confidence interval of ratio of medians is more than
+5%, so noise does not fail them. Comparing with the best run fails the same
+regression in every following run and catches slow drift. Outcome of test
+is reported to nose only after it is benchmarked. Repeat must be big enough
+to reach the significance level, e.g. at least 5 for alpha 0.01.
+
+With ``--pypete-history FILE`` every result is appended to SQLite database
+as soon as it is measured. All runs are kept with their environment and
+last, best and worst values are derived from them.
+
+With ``--pypete-memory`` test is run once more under tracemalloc and its
+peak memory, retained memory, number of retained blocks and source lines
+allocating most are reported. tracemalloc does not count blocks freed in the
+meantime, so allocations per call are reported as retained blocks per call.
+Peak memory and retained blocks are also checked for regressions.
+
+With ``--pypete-profile DIR`` calibrated loop of every test is run once more
+under cProfile. Profile is saved to ``DIR/<test id>.pstats``, its hotspots
+are reported together with differences from the profile of previous run,
+which is kept as ``DIR/<test id>.prev.pstats``.
+
+Every test is run once first and its outcome is reported to nose. Only
+tests that passed are benchmarked.
+
+``--pypete-max-time-per-test`` limits time of calibration and experiments of
+every test, ``--pypete-suite-budget`` splits budget of the whole suite among
+tests. Tests that were noisy or regressed in their last run get bigger share.
+
+With ``--pypete-workers N`` benchmarks run in parallel in ``N`` worker
+processes, each pinned to its own CPU core.
+
+With ``--pypete-isolate`` every test is benchmarked in fresh Python
+interpreter, so state left by other tests does not affect it. Tests that can
+not be rebuilt there are benchmarked in process.
+
+With ``--pypete-baseline REV`` git revision REV is checked out to temporary
+worktree and every test is loaded into two fresh interpreters, one importing
+the baseline code. Their experiments alternate and speedup of current code
+against the baseline is reported with its 95% confidence interval.
+
+Generator tests decorated by ``@pypete.complexity(size=0)`` declare which
+argument of yielded cases is size of input. Time per call of their cases is
+fitted by O(1), O(log n), O(n), O(n log n) and O(n^2) models and the best
+fit is reported. Change of fitted complexity since last run is flagged.
+
+Tests decorated by ``@pypete.concurrent(levels=[1, 2, 4, 8, 16])`` are also
+called from that many threads at once (and processes with
+``processes=True``). Throughput, latency of one call and scaling efficiency
+relative to the lowest level are reported and stored.
+
+Coroutine tests (``async def``) are awaited in one event loop reused by all
+experiments, ``--pypete-loop uvloop`` selects uvloop. With
+``--pypete-async-tasks N`` every call gathers N concurrent runs of the test
+and throughput in tasks per second is reported.
+
+Benchmarked code can mark its phases by ``with pypete.section('parse'):``
+or ``@pypete.timed_section``. They do nothing outside of benchmark, during
+experiments their time is summed and reported per call as nested breakdown.
+Every section is checked for regressions on its own.
+
+With ``--pypete-resources`` resource usage of experiments is taken from
+``getrusage`` and ``/proc/self``: user and system CPU time, voluntary and
+involuntary context switches, minor and major page faults and bytes read and
+written per call and growth of max RSS and RSS.
+
+With ``--pypete-changed-only`` every test is fingerprinted by its bytecode
+and source files of its module and project modules imported by it. Tests
+with the same fingerprint as in the last run are not benchmarked, their last
+result is reused and marked as cached. Every test is benchmarked again at
+least every ``--pypete-full-run-every`` runs.
+
+With ``--pypete-nodes host:port,/path/to/socket`` benchmarks are handed out
+to ``pypete-worker`` processes listening on given addresses, possibly on
+other hosts with the same code. Connections are authenticated by key from
+``--pypete-nodes-authkey-file`` or ``PYPETE_AUTHKEY``, which is required on
+TCP. This process and every node run reference micro-benchmark alternately
+and timings of the node are scaled by ratio of their fastest reference
+times, unless it is within noise, so results of different hosts are
+comparable.
+
+Every run records fingerprint of its environment: CPU model, governor and
+frequency, load average and version, build and commit of Python. Reference
+micro-benchmark runs before and after the suite and drift of machine is
+reported. With ``--pypete-noise-threshold 5%`` noisy machine is reported as
+warning or, with ``--pypete-noise-action abort``, tests are not benchmarked
+at all and results file is left untouched. ``--pypete-normalize`` scales results of older runs by ratio of
+reference times before comparing them with current run.
+
+Samples are kept in compact arrays of doubles. Median, median absolute
+deviation, number of outliers outside of Tukey fences and bootstrap 95%
+confidence interval of median are reported for every test. With NumPy
+installed they are computed on vectors.
+
+Without nose ``python -m pypete [MODULE|FILE|DIRECTORY ...]`` runs functions
+named ``bench_*`` or decorated by ``@pypete.benchmark`` through the same
+measurement core. ``python -m pypete compare A.json B.json`` compares two
+results files and ``python -m pypete history TEST_ID FILE`` shows saved
+results of test from results file or history database.
+
+With ``--pypete-export FORMAT:PATH`` results are written as every test is
+measured to OpenMetrics text file (``openmetrics``) for textfile collector of
+node exporter, flat CSV table (``csv``) or JUnit XML with statistics as
+properties (``junit``). The option may be given more times.
 
 I recommend to use `PrettyTable <https://code.google.com/p/prettytable/>`_
 for better overview of test results. You can select file, where the results
 will be stored in json format. With file and prettytable you can see
 comparison of current, last, best and worst run of tests (best and worst
-are according to avg value).
+are according to median of samples).
 
 You can access all source codes at `my Github <https://github.com/Artimi/pypete>`_.
 
@@ -44,14 +171,6 @@ Example of usage:
 
     Pypete results:
     repeat = 3 and number = 0
-    test_fail (tests.BasicTest):
-    +--------+-------------+----------+----------+-----------+
-    | Metric | current [s] | last [s] | best [s] | worst [s] |
-    +--------+-------------+----------+----------+-----------+
-    |  best  |   0.000034  | 0.000033 | 0.000033 |  0.000033 |
-    |  avg   |   0.000037  | 0.000033 | 0.000033 |  0.000036 |
-    | worst  |   0.000039  | 0.000034 | 0.000034 |  0.000040 |
-    +--------+-------------+----------+----------+-----------+
     test_time (tests.BasicTest):
     +--------+-------------+----------+----------+-----------+
     | Metric | current [s] | last [s] | best [s] | worst [s] |
@@ -68,14 +187,6 @@ Example of usage:
     |  avg   |   0.002237  | 0.002238 | 0.002179 |  0.002276 |
     | worst  |   0.002252  | 0.002245 | 0.002201 |  0.002302 |
     +--------+-------------+----------+----------+-----------+
-    test_timed (tests.BasicTest):
-    +--------+-------------+----------+----------+-----------+
-    | Metric | current [s] | last [s] | best [s] | worst [s] |
-    +--------+-------------+----------+----------+-----------+
-    |  best  |   0.010448  | 0.010492 | 0.010442 |  0.010490 |
-    |  avg   |   0.010465  | 0.010541 | 0.010470 |  0.010645 |
-    | worst  |   0.010474  | 0.010621 | 0.010492 |  0.010751 |
-    +--------+-------------+----------+----------+-----------+
     tests.test_arguments(0.001,):
     +--------+-------------+----------+----------+-----------+
     | Metric | current [s] | last [s] | best [s] | worst [s] |
@@ -92,6 +203,10 @@ Example of usage:
     |  avg   |   0.002280  | 0.002262 | 0.002204 |  0.002286 |
     | worst  |   0.002288  | 0.002273 | 0.002222 |  0.002318 |
     +--------+-------------+----------+----------+-----------+
+    Complexity:
+    tests.test_arguments ... O(n), 1.19 s * g(n) from 2 sizes
+    test_fail (tests.BasicTest) ... not benchmarked, test did not pass
+    test_timed (tests.BasicTest) ... not benchmarked, test did not pass
 
     ----------------------------------------------------------------------
     Ran 6 tests in 1.619s
@@ -103,15 +218,84 @@ import timeit as ti
 import logging
 import os.path
 import json
-import datetime
-import math
 
 from nose.plugins.base import Plugin
 
+from pypete.aio import LOOPS, AsyncCase, is_coroutine_test
+from pypete.baseline import ABComparison, Worktree
+from pypete.case import test_generator
+from pypete.core import (Benchmark, experiment_record, parse_percentage, process_measurement,
+                         reuse_result, run_info)
+from pypete.environment import reference_sample
+from pypete.exporters import create_exporter, parse_export
+from pypete.histogram import PERCENTILES
+from pypete.history import History, new_record, robust_time, update_record
+from pypete.node import NodePool, read_authkey, scale_measurement
+from pypete.isolate import IsolationError, run_isolated
+from pypete.regression import check_sample_size, compare_with_best, regression_messages
+from pypete.report import detail_lines, extra_lines, summary_line
+from pypete.resources import METRICS as RESOURCE_METRICS
+from pypete.scaling import case_size, fit
+from pypete.scheduler import Scheduler, history_weight
+from pypete.timers import GC_MODES, TIMERS
+from pypete.workers import WorkerPool
+
 
 log = logging.getLogger('nose.plugins.pypete')
 
 
+class OutcomeRecorder(object):
+    """
+    Proxy of test result remembering whether test passed. When case is
+    given, outcome of any test is reported as outcome of that case. With
+    defer success and end of test that passed are held back until report,
+    so benchmark can still fail the test.
+    """
+
+    def __init__(self, result, case=None, defer=False):
+        self.result = result
+        self.case = case
+        self.defer = defer
+        self.passed = False
+        self.test = None
+
+    def addSuccess(self, test):
+        self.passed = True
+        self.test = self.case or test
+        if not self.defer:
+            self.result.addSuccess(self.test)
+
+    def stopTest(self, test):
+        if not (self.defer and self.passed):
+            self.result.stopTest(self.case or test)
+
+    def report(self, error=None):
+        """
+        Report held back outcome of test that passed
+        :param error: exc_info tuple failing the test or None
+        :return:
+        """
+        if not (self.defer and self.passed):
+            return
+        if error is None:
+            self.result.addSuccess(self.test)
+        else:
+            self.result.addFailure(self.test, error)
+        self.result.stopTest(self.test)
+
+    def __getattr__(self, name):
+        attr = getattr(self.result, name)
+        if self.case is None or not name.startswith(('add', 'startTest', 'stopTest')):
+            return attr
+        return lambda test, *args: attr(self.case, *args)
+
+
+class RegressionError(AssertionError):
+    """
+    Benchmark is significantly slower than its baseline
+    """
+
+
 class Pypete(Plugin):
     """
     Nose plugin for handling performance testing
@@ -138,9 +322,128 @@ class Pypete(Plugin):
         parser.add_option('--pypete-file', action='store', dest='file',
                           default=None, metavar='FILE',
                           help='Path to file to save statistics')
+        parser.add_option('--pypete-history', action='store', dest='history',
+                          default=None, metavar='FILE',
+                          help='Path to SQLite database keeping history of all runs')
         parser.add_option('--pypete-threshold', action='store', dest='threshold',
                           default=0.1, metavar='THRESHOLD', type=float,
                           help='Seconds to perform test with number set to auto')
+        parser.add_option('--pypete-calibration-tolerance', action='store',
+                          dest='calibration_tolerance', default=0.5, metavar='FLOAT', type=float,
+                          help='Relative drift of time per call from cached calibration '
+                               'after which number is recalibrated')
+        parser.add_option('--pypete-mode', action='store', dest='mode',
+                          default='default', choices=['default', 'pedantic', 'batched'],
+                          help='default times whole test call with setUp run once per experiment, '
+                               'pedantic runs setUp and tearDown around every call and times '
+                               'body only, batched sets up all calls of experiment first and '
+                               'times bodies back to back')
+        parser.add_option('--pypete-gc', action='store', dest='gc',
+                          default='off', choices=GC_MODES,
+                          help='Garbage collector during experiments: off, on or collect '
+                               'garbage before every experiment and keep it off')
+        parser.add_option('--pypete-warmup', action='store', dest='warmup',
+                          default=0, metavar='INTEGER', type=int,
+                          help='Number of discarded warm-up experiments')
+        parser.add_option('--pypete-timer', action='store', dest='timer',
+                          default='perf_counter', choices=sorted(TIMERS),
+                          help='Timer used for experiments')
+        parser.add_option('--pypete-precision', action='store', dest='precision',
+                          default=None, metavar='PERCENT',
+                          help='Keep repeating experiment until confidence interval of '
+                               'result is narrower than PERCENT, e.g. 2%')
+        parser.add_option('--pypete-precision-statistic', action='store',
+                          dest='precision_statistic', default='mean',
+                          choices=['mean', 'median'],
+                          help='Statistic whose confidence interval is used by precision')
+        parser.add_option('--pypete-max-samples', action='store', dest='max_samples',
+                          default=100, metavar='INTEGER', type=int,
+                          help='Maximal number of experiments with precision set')
+        parser.add_option('--pypete-max-time', action='store', dest='max_time',
+                          default=10.0, metavar='SECONDS', type=float,
+                          help='Maximal time spent by experiments of one test with precision set')
+        parser.add_option('--pypete-max-time-per-test', action='store',
+                          dest='max_time_per_test', default=None, metavar='SECONDS', type=float,
+                          help='Time budget for calibration and experiments of one test')
+        parser.add_option('--pypete-suite-budget', action='store', dest='suite_budget',
+                          default=None, metavar='SECONDS', type=float,
+                          help='Time budget for benchmarks of whole suite split among tests '
+                               'by their variance and regression history')
+        parser.add_option('--pypete-histogram', action='store_true', dest='histogram',
+                          default=False,
+                          help='Time individual calls and report percentiles of their latency')
+        parser.add_option('--pypete-fail-on-regression', action='store',
+                          dest='fail_on_regression', default=None, metavar='PERCENT',
+                          help='Fail tests significantly slower than their best run '
+                               'by more than PERCENT, e.g. 5%')
+        parser.add_option('--pypete-alpha', action='store', dest='alpha',
+                          default=0.05, metavar='FLOAT', type=float,
+                          help='Significance level of regression test')
+        parser.add_option('--pypete-memory', action='store_true', dest='memory',
+                          default=False,
+                          help='Measure memory allocated by test in one extra run under tracemalloc')
+        parser.add_option('--pypete-resources', action='store_true', dest='resources',
+                          default=False,
+                          help='Measure CPU time, context switches, page faults, I/O and RSS '
+                               'of experiments')
+        parser.add_option('--pypete-profile', action='store', dest='profile',
+                          default=None, metavar='DIR',
+                          help='Profile calibrated loop of every test by cProfile and save '
+                               'profiles to DIR')
+        parser.add_option('--pypete-profile-top', action='store', dest='profile_top',
+                          default=10, metavar='INTEGER', type=int,
+                          help='Number of hotspots reported for every profiled test')
+        parser.add_option('--pypete-isolate', action='store_true', dest='isolate',
+                          default=False,
+                          help='Benchmark every test in fresh Python interpreter')
+        parser.add_option('--pypete-baseline', action='store', dest='baseline',
+                          default=None, metavar='REV',
+                          help='Compare every test with git revision REV by alternating '
+                               'experiments of both versions')
+        parser.add_option('--pypete-baseline-pairs', action='store', dest='baseline_pairs',
+                          default=10, metavar='INTEGER', type=int,
+                          help='Number of pairs of baseline and current experiments')
+        parser.add_option('--pypete-workers', action='store', dest='workers',
+                          default=0, metavar='INTEGER', type=int,
+                          help='Number of worker processes pinned to their own cores '
+                               'running benchmarks in parallel, 0 means run in nose process')
+        parser.add_option('--pypete-nodes', action='store', dest='nodes',
+                          default=None, metavar='ADDRESSES',
+                          help='Comma separated addresses (host:port or Unix socket path) '
+                               'of pypete-worker nodes running benchmarks')
+        parser.add_option('--pypete-nodes-authkey-file', action='store',
+                          dest='nodes_authkey_file', default=None, metavar='FILE',
+                          help='File with key shared with nodes, PYPETE_AUTHKEY environment '
+                               'variable is used without it')
+        parser.add_option('--pypete-noise-threshold', action='store', dest='noise_threshold',
+                          default=None, metavar='PERCENT',
+                          help='Maximal noise and drift of reference benchmark, e.g. 5%')
+        parser.add_option('--pypete-noise-action', action='store', dest='noise_action',
+                          default='warn', type='choice', choices=('warn', 'abort'),
+                          help='What to do when machine is noisier than threshold: warn or '
+                               'abort benchmarking')
+        parser.add_option('--pypete-export', action='append', dest='export', default=[],
+                          metavar='FORMAT:PATH',
+                          help='Export results as they are measured, FORMAT is one of '
+                               'openmetrics, csv or junit, may be given more times')
+        parser.add_option('--pypete-normalize', action='store_true', dest='normalize',
+                          default=False,
+                          help='Scale results of older runs by ratio of reference times')
+        parser.add_option('--pypete-changed-only', action='store_true', dest='changed_only',
+                          default=False,
+                          help='Reuse last results of tests whose code and dependencies '
+                               'did not change')
+        parser.add_option('--pypete-full-run-every', action='store', dest='full_run_every',
+                          default=10, metavar='INTEGER', type=int,
+                          help='With changed-only, benchmark every test at least every '
+                               'INTEGER runs, 0 means never force')
+        parser.add_option('--pypete-loop', action='store', dest='loop',
+                          default='asyncio', type='choice', choices=LOOPS,
+                          help='Event loop awaiting coroutine tests: asyncio or uvloop')
+        parser.add_option('--pypete-async-tasks', action='store', dest='async_tasks',
+                          default=0, metavar='INTEGER', type=int,
+                          help='Number of concurrent runs of coroutine test gathered in '
+                               'every call, 0 means one awaited run')
 
     def configure(self, options, conf):
         """
@@ -155,65 +458,574 @@ class Pypete(Plugin):
         self.prettytable = options.prettytable
         self.file = options.file
         self.threshold = options.threshold
+        self.calibration_tolerance = options.calibration_tolerance
+        self.mode = options.mode
+        self.gc = options.gc
+        self.warmup = options.warmup
+        self.timer = options.timer
+        self.precision = parse_percentage(options.precision)
+        self.precision_statistic = options.precision_statistic
+        self.max_samples = options.max_samples
+        self.max_time = options.max_time
+        self.max_time_per_test = options.max_time_per_test
+        self.suite_budget = options.suite_budget
+        self._scheduler = None
+        self.histogram = options.histogram
+        self.memory = options.memory
+        self.profile = options.profile
+        self.profile_top = options.profile_top
+        self.isolate = options.isolate
+        self.core = Benchmark(repeat=self.repeat, number=self.number, threshold=self.threshold,
+                              mode=self.mode, gc=self.gc, warmup=self.warmup, timer=self.timer,
+                              precision=self.precision,
+                              precision_statistic=self.precision_statistic,
+                              max_samples=self.max_samples, max_time=self.max_time,
+                              histogram=self.histogram, memory=self.memory,
+                              profile=self.profile, profile_top=self.profile_top,
+                              loop=options.loop, tasks=options.async_tasks,
+                              resources=options.resources,
+                              calibration_tolerance=options.calibration_tolerance)
+        self.fail_on_regression = parse_percentage(options.fail_on_regression)
+        self.alpha = options.alpha
+        if self.fail_on_regression is not None:
+            check_sample_size(self.repeat, self.alpha)
+        self.workers = options.workers
+        self.nodes = options.nodes.split(',') if options.nodes else []
+        self.nodes_authkey_file = options.nodes_authkey_file
+        self.baseline = options.baseline
+        self.baseline_pairs = options.baseline_pairs
+        self._worktree = None
+        self._comparisons = {}
+        self.changed_only = options.changed_only
+        self.noise_threshold = parse_percentage(options.noise_threshold)
+        self.noise_action = options.noise_action
+        self.normalize = options.normalize
+        self.reference = None
+        self.aborted = False
+        self.full_run_every = options.full_run_every
+        self.history_file = options.history
+        self.export = options.export or []
+        for spec in self.export:
+            parse_export(spec)
+        self.exporters = []
+        self._history = None
+        self._history_pid = None
+        self._run_id = None
+        self.info = None
         self._old_stats = None
+        self._pool = None
+        self._pending = []
         self.results = []
+        self.not_benchmarked = []
+        self.complexities = []
+
+    def begin(self):
+        """
+        Measure noise of machine, register run in history and check out
+        baseline before any test is run
+        :return:
+        """
+        self.reference = reference_sample()
+        if self.noise_threshold is not None and self.reference['noise'] > self.noise_threshold:
+            log.warning('Machine is noisy, reference benchmark varies by %.1f%%',
+                        self.reference['noise'] * 100)
+            self.aborted = self.noise_action == 'abort'
+        if self.baseline:
+            self._worktree = Worktree(self.baseline)
+        if self.history_file:
+            self._run_id = self.history.start_run(self.get_info())
+        self.exporters = [create_exporter(spec, self.get_info()) for spec in self.export]
+
+    @property
+    def history(self):
+        """
+        History database, reopened in forked workers as SQLite connection
+        must not be shared between processes
+        :return: History
+        """
+        if self._history is None or self._history_pid != os.getpid():
+            self._history = History(self.history_file)
+            self._history.run_id = self._run_id
+            self._history_pid = os.getpid()
+        return self._history
+
+    def get_calibration(self, test):
+        """
+        Return cached calibration of test if the test code and mode, which
+        decides what is timed, did not change
+        :param test:
+        :return: calibration dict or None
+        """
+        return self.core.cached_calibration(self.old_record(test), test.test)
+
+    def old_record(self, test):
+        """
+        Return saved record of test
+        :param test:
+        :return: dict or None
+        """
+        try:
+            return self.old_stats[test.id()] if self.old_stats is not None else None
+        except KeyError:
+            return None
+
+    def cached_result(self, test):
+        """
+        Return last result of test if its fingerprint and measurement settings
+        did not change and it was not reused too many times in a row
+        :param test:
+        :return: processed results of test or None if test has to be benchmarked
+        """
+        old_test = self.old_record(test)
+        if old_test is None:
+            return None
+        stats = reuse_result(old_test, self.core.fingerprint(test.test), self.get_info(),
+                             self.full_run_every)
+        if stats is None:
+            return None
+        stats['test'] = test
+        if self.history_file:
+            experiment = experiment_record(self.get_info(), stats)
+            if 'calibration' in stats:
+                experiment['calibration'] = stats['calibration']
+            self.history.append(test.id(), experiment)
+        return stats
+
+    def measure(self, test, budget=None, core=None):
+        """
+        Measure test with cached calibration, in isolated interpreter if
+        selected
+        :param test:
+        :param budget: time budget of calibration and experiments in seconds
+        :param core: core of worker running the measurement
+        :return: dict with timing, number and optional measurements
+        """
+        calibration = self.get_calibration(test) if self.number == 0 else None
+        measurement = None
+        if self.isolate:
+            try:
+                measurement = run_isolated(self.core, test.test, test.id(), calibration, budget)
+            except IsolationError as e:
+                log.warning('Test %s benchmarked in process: %s', test, e)
+        if measurement is None:
+            measurement = self.core.measure(test.test, test.id(), calibration, budget)
+        if self.baseline:
+            speedup = self.compare_with_revision(test, measurement['number'], core)
+            if speedup is not None:
+                measurement['speedup'] = speedup
+        return measurement
+
+    def measure_on_node(self, test, calibration, budget, node):
+        """
+        Measure test on remote node and scale its timing by reference factor
+        of node
+        :param test:
+        :param calibration: cached calibration
+        :param budget: time budget of calibration and experiments in seconds
+        :param node: pypete.node.Node
+        :return: dict with timing, number and optional measurements
+        """
+        node.load(self.core, test.test)
+        measurement = scale_measurement(node.measure(test.id(), calibration, budget), node.factor)
+        measurement['node'] = {'address': node.address, 'factor': node.factor}
+        return measurement
 
-    def determine_number(self, test):
+    def comparison(self, core=None):
         """
-        Determine number so that it is bigger than threshold
+        Return interpreters comparing tests with baseline revision in nose
+        process or in workers on given core, created with first use
+        :param core: core of worker or None for nose process
+        :return: ABComparison
+        """
+        if core not in self._comparisons:
+            self._comparisons[core] = ABComparison(self._worktree, self.baseline_pairs, core)
+        return self._comparisons[core]
+
+    def compare_with_revision(self, test, number, core=None):
+        """
+        Compare test with baseline revision by alternating experiments
         :param test:
+        :param number: number of calls in one experiment
+        :param core: core of worker running the comparison
+        :return: speedup dict or None if test can not be compared
+        """
+        comparison = self.comparison(core)
+        try:
+            return comparison.compare(self.core, test.test, number)
+        except IsolationError as e:
+            log.warning('Test %s not compared with baseline: %s', test, e)
+            # interpreters are restarted, as the failure may have left them broken
+            comparison.close()
+            return None
+
+    @property
+    def pool(self):
+        """
+        Pool of workers or remote nodes, created with first use
+        :return: WorkerPool or NodePool
+        """
+        if self._pool is None and self.nodes:
+            self._pool = NodePool(self.nodes, read_authkey(self.nodes_authkey_file))
+        elif self._pool is None:
+            self._pool = WorkerPool(self.workers)
+        return self._pool
+
+    def prepareTest(self, test):
+        """
+        Wrap whole test suite so results from workers are collected and
+        outcomes of their tests reported before report
+        :param test: root test suite
         :return:
         """
-        init_number = 3
-        x = ti.timeit(test.test, number=init_number, setup=test.test.setUp)
-        number = int(math.ceil(self.threshold/(x / init_number)))
-        return number
+        if not self.workers and not self.nodes:
+            return None
+
+        def run(result):
+            test(result)
+            self.collect_results()
+        return run
 
     def prepareTestCase(self, test):
         """
-        Run before every test start
+        Take over running of test. Test is run once for correctness with its
+        outcome reported to nose and benchmarked only if it passed.
+        :param test:
+        :return: function running test
+        """
+        def run(result):
+            defer = self.fail_on_regression is not None
+            if is_coroutine_test(test.test):
+                outcome = OutcomeRecorder(result, test.test, defer)
+                AsyncCase(test.test, self.core.loop)(outcome)
+            else:
+                outcome = OutcomeRecorder(result, defer=defer)
+                test.test(outcome)
+            cached = self.cached_result(test) if self.changed_only and outcome.passed else None
+            if cached is not None:
+                self.add_result(cached)
+                outcome.report()
+            elif outcome.passed and self.aborted:
+                self.add_not_benchmarked(test, 'machine is too noisy')
+                outcome.report()
+            elif outcome.passed:
+                self.benchmark(test, outcome)
+            else:
+                self.add_not_benchmarked(test, 'test did not pass')
+        return run
+
+    @property
+    def scheduler(self):
+        """
+        Scheduler of suite budget, created with first use. With workers
+        budget is multiplied by their number as they run in parallel.
+        :return: Scheduler
+        """
+        if self._scheduler is None:
+            expected = len(self.old_stats) if self.old_stats else None
+            parallel = len(self.nodes) or self.workers
+            self._scheduler = Scheduler(self.suite_budget * max(parallel, 1), expected)
+        return self._scheduler
+
+    def get_budget(self, test):
+        """
+        Return time budget of test and its weight in schedule
         :param test:
+        :return: tuple of budget in seconds or None and weight
+        """
+        if self.suite_budget is None:
+            return self.max_time_per_test, None
+        try:
+            old_test = self.old_stats[test.id()] if self.old_stats is not None else None
+        except KeyError:
+            old_test = None
+        weight = history_weight(old_test)
+        return self.scheduler.allocate(weight, self.max_time_per_test), weight
+
+    def benchmark(self, test, outcome):
+        """
+        Benchmark test in worker or in nose process and report its outcome
+        :param test:
+        :param outcome: OutcomeRecorder of correctness run
+        :return:
+        """
+        budget, weight = self.get_budget(test)
+        if self.workers or self.nodes:
+            self._pending.append((test, outcome))
+            if self.nodes:
+                calibration = self.get_calibration(test) if self.number == 0 else None
+                self.pool.submit(len(self._pending) - 1, self.measure_on_node, test,
+                                 calibration, budget)
+            else:
+                if self.baseline:
+                    # interpreters are started once per worker core here, so
+                    # that forked workers reuse them and nose process closes them
+                    for core in self.pool.worker_cores:
+                        self.comparison(core).start()
+                self.pool.submit(len(self._pending) - 1, self.measure, test, budget)
+            if weight is not None:
+                self.scheduler.spend(weight, budget)
+            return
+        start = ti.default_timer()
+        try:
+            measurement = self.measure(test, budget)
+        except Exception:
+            log.exception('Benchmark of %s failed', test)
+            self.add_not_benchmarked(test, 'benchmark raised exception')
+            outcome.report()
+            return
+        finally:
+            if weight is not None:
+                self.scheduler.spend(weight, ti.default_timer() - start)
+        stats = self._process_measurement(test, measurement)
+        self.add_result(stats)
+        self.report_outcome(outcome, stats)
+
+    def collect_results(self):
+        """
+        Wait for workers and append their results in order of submission
+        :return:
+        """
+        if not self._pending:
+            return
+        done = self.pool.join()
+        for i, (test, outcome) in enumerate(self._pending):
+            success, value = done[i]
+            if success:
+                stats = self._process_measurement(test, value)
+                self.add_result(stats)
+                self.report_outcome(outcome, stats)
+            else:
+                log.error('Benchmark of %s failed in worker:\n%s', test, value)
+                self.add_not_benchmarked(test, 'benchmark raised exception')
+                outcome.report()
+        self._pending = []
+
+    def add_result(self, stats):
+        """
+        Keep processed results of test for report and export them
+        :param stats: processed results
         :return:
         """
-        if self.number == 0:
-            number = self.determine_number(test)
-        else:
-            number = self.number
-        timing = ti.repeat(test.test, setup=test.test.setUp,
-                           repeat=self.repeat, number=number)
-        stats = self._process_timing(test, timing, self.repeat, number)
         self.results.append(stats)
+        for exporter in self.exporters:
+            exporter.write(stats['test'].id(), stats)
 
-    def _process_timing(self, test, timing, repeat, number):
-        stats = {'test': test,
-                 'best': min(timing)/number,
-                 'worst': max(timing)/number,
-                 'average': sum(timing)/repeat/number}
+    def add_not_benchmarked(self, test, reason):
+        """
+        Keep test that was not benchmarked for report and export it
+        :param test:
+        :param reason: why test was not benchmarked
+        :return:
+        """
+        self.not_benchmarked.append((test, reason))
+        for exporter in self.exporters:
+            exporter.skip(test.id(), reason)
+
+    def _process_measurement(self, test, measurement):
+        stats = process_measurement(measurement)
+        stats['test'] = test
+        if self.number == 0:
+            stats['calibration'] = self.core.calibrate(self.old_record(test), test.test, test.id(),
+                                                       stats['best'], measurement['number'])
+        if self.changed_only:
+            stats['fingerprint'] = self.core.fingerprint(test.test)
+        if self.fail_on_regression is not None:
+            stats['regression'] = self.compare_with_baseline(test, stats)
+        if self.history_file:
+            experiment = experiment_record(self.get_info(), stats)
+            if 'calibration' in stats:
+                experiment['calibration'] = stats['calibration']
+            self.history.append(test.id(), experiment)
         return stats
 
+    def fit_complexities(self):
+        """
+        Group results of generator tests marked by pypete.complexity and fit
+        complexity of every group
+        :return:
+        """
+        if self.complexities:
+            return
+        groups = {}
+        for r in self.results:
+            generator = test_generator(r['test'].test)
+            marker = getattr(generator, 'pypete_complexity', None)
+            if marker is None or r['best'] <= 0:
+                continue
+            group = '{0}.{1}'.format(generator.__module__, generator.__qualname__)
+            size = case_size(marker, r['test'].test.arg)
+            times, members = groups.setdefault(group, ({}, []))
+            times[size] = min(times.get(size, r['best']), r['best'])
+            members.append(r)
+        for group, (times, members) in sorted(groups.items()):
+            if len(times) < 2:
+                log.warning('Complexity of %s not fitted, it has less than 2 sizes', group)
+                continue
+            sizes = sorted(times)
+            complexity = fit(sizes, [times[n] for n in sizes])
+            complexity['group'] = group
+            complexity['sizes'] = len(sizes)
+            complexity['previous'] = self.previous_complexity(group)
+            complexity['changed'] = complexity['previous'] not in (None, complexity['complexity'])
+            if self.history_file:
+                self.history.append_complexity(group, complexity)
+            for r in members:
+                r['complexity'] = complexity['complexity']
+            self.complexities.append(complexity)
+
+    def previous_complexity(self, group):
+        """
+        Return complexity of generator test fitted in last run
+        :param group: id of generator test
+        :return: name of complexity or None
+        """
+        if self.history_file:
+            return self.history.last_complexity(group, self._run_id)
+        for test_id, old_test in (self.old_stats or {}).items():
+            if test_id.startswith(group + '(') and 'complexity' in old_test['last']:
+                return old_test['last']['complexity']
+        return None
+
+    def measure_drift(self):
+        """
+        Run reference benchmark after the suite and record drift of machine
+        :return:
+        """
+        if self.reference is None or 'after' in self.reference:
+            return
+        after = reference_sample()
+        self.reference['after'] = after['time']
+        self.reference['drift'] = after['time'] / self.reference['time'] - 1
+        self.reference['noise'] = max(self.reference['noise'], after['noise'])
+        if self.history_file:
+            self.history.update_run(self.get_info())
+
+    def normalization(self, experiment):
+        """
+        Return factor scaling times of older experiment to speed of machine
+        in current run
+        :param experiment: saved experiment
+        :return: float
+        """
+        if not self.normalize or self.reference is None:
+            return 1.0
+        old = experiment.get('info', {}).get('reference')
+        if not old or not old.get('time'):
+            return 1.0
+        return self.reference['time'] / old['time']
+
+    def compare_with_baseline(self, test, stats):
+        """
+        Compare results with best run of test, see pypete.regression
+        :param test:
+        :param stats: processed results of test
+        :return: dict with ratios, p-values and verdicts or None without baseline
+        """
+        old_test = self.old_record(test)
+        if old_test is None:
+            return None
+        best = old_test['best']
+        return compare_with_best(stats, best, self.alpha, self.fail_on_regression,
+                                 self.normalization(best))
+
+    def regression_messages(self, r):
+        """
+        Return descriptions of regressions of test
+        :param r: processed results of test
+        :return: list of strings
+        """
+        return regression_messages(r.get('regression'), self.alpha)
+
+    def report_outcome(self, outcome, stats):
+        """
+        Report outcome of benchmarked test, regressed test fails
+        :param outcome: OutcomeRecorder of correctness run
+        :param stats: processed results of test
+        :return:
+        """
+        messages = self.regression_messages(stats)
+        if not messages:
+            outcome.report()
+            return
+        message = '{0}: {1}'.format(stats['test'].id(), ', '.join(messages))
+        outcome.report((RegressionError, RegressionError(message), None))
+
     @property
     def old_stats(self):
         """
-        Loads old_stats from json file if accessible
+        Loads old_stats from history database or json file if accessible.
+        Summaries from history database include only runs before current one.
         :return:
         """
-        if self._old_stats is None and self.file and os.path.exists(self.file):
+        if self._old_stats is None and self.history_file:
+            self._old_stats = self.history.summaries(before_run=self._run_id)
+        elif self._old_stats is None and self.file and os.path.exists(self.file):
             with open(self.file) as f:
                 self._old_stats = json.load(f)
         return self._old_stats
 
-    def table_append_columns(self, table, old_test):
+    def table_metrics(self, test):
+        """
+        Return metrics shown in PrettyTable as tuples of name, current value
+        and function getting the value from saved experiment
+        :param test:
+        :return: list of tuples
+        """
+        metrics = [('best', test['best'], lambda e: e['best']),
+                   ('avg', test['average'], lambda e: e['avg']),
+                   ('worst', test['worst'], lambda e: e['worst'])]
+        if 'median' in test:
+            metrics.append(('median', test['median'], robust_time))
+            metrics.append(('mad', test['mad'], lambda e: e['mad']))
+        if 'fixture' in test:
+            metrics.append(('fixture', test['fixture'], lambda e: e['fixture']))
+        if 'percentiles' in test:
+            for percent in PERCENTILES:
+                name = 'p{0:g}'.format(percent)
+                metrics.append((name, test['percentiles'][name],
+                                lambda e, name=name: e['percentiles'][name]))
+        return metrics
+
+    def table_memory_metrics(self, test):
+        """
+        Return memory metrics shown in PrettyTable in the same form as
+        table_metrics
+        :param test:
+        :return: list of tuples
+        """
+        return [(name, test['memory'][name], lambda e, name=name: e['memory'][name])
+                for name in ('peak', 'retained', 'retained_blocks')]
+
+    def table_resource_metrics(self, test):
+        """
+        Return resource metrics shown in PrettyTable in the same form as
+        table_metrics
+        :param test:
+        :return: list of tuples
+        """
+        return [(name, test['resources'][name], lambda e, name=name: e['resources'][name])
+                for name in RESOURCE_METRICS if name in test['resources']]
+
+    def table_append_columns(self, table, old_test, metrics, unit='s', value_format='{0:.6f}'):
         """
         Append columns with values from older experiments
         :param table: PrettyTable
         :param old_test:
+        :param metrics: metrics as returned by table_metrics
+        :param unit: unit of metrics
+        :param value_format: format of values
         :return:
         """
+        def format_value(get, experiment):
+            factor = self.normalization(experiment) if unit == 's' else 1.0
+            try:
+                return value_format.format(get(experiment) * factor)
+            except KeyError:
+                return '-'
+
         def add_column(measurement):
-            table.add_column('{0} [s]'.format(measurement),
-                             ['{0:.6f}'.format(old_test[measurement]['best']),
-                              '{0:.6f}'.format(old_test[measurement]['avg']),
-                              '{0:.6f}'.format(old_test[measurement]['worst'])])
+            table.add_column('{0} [{1}]'.format(measurement, unit),
+                             [format_value(get, old_test[measurement]) for _, _, get in metrics])
         add_column('last')
         add_column('best')
         add_column('worst')
@@ -229,16 +1041,25 @@ class Pypete(Plugin):
         except ImportError:
             raise ImportError('PrettyTable is optional dependency. Download it or don\'t use it')
         test_id = test['test'].id()
-        table = PrettyTable(['Metric', 'current [s]'])
-        table.add_row(['best', '{0[best]:.6f}'.format(test)])
-        table.add_row(['avg', '{0[average]:.6f}'.format(test)])
-        table.add_row(['worst', '{0[worst]:.6f}'.format(test)])
-        if self.old_stats is not None:
-            try:
-                self.table_append_columns(table, self.old_stats[test_id])
-            except KeyError:
-                pass
-        return table.get_string()
+        try:
+            old_test = self.old_stats[test_id] if self.old_stats is not None else None
+        except KeyError:
+            old_test = None
+
+        def make_table(metrics, unit, value_format):
+            table = PrettyTable(['Metric', 'current [{0}]'.format(unit)])
+            for name, value, _ in metrics:
+                table.add_row([name, value_format.format(value)])
+            if old_test is not None:
+                self.table_append_columns(table, old_test, metrics, unit, value_format)
+            return table.get_string()
+
+        tables = [make_table(self.table_metrics(test), 's', '{0:.6f}')]
+        if 'memory' in test:
+            tables.append(make_table(self.table_memory_metrics(test), 'B', '{0:.0f}'))
+        if 'resources' in test:
+            tables.append(make_table(self.table_resource_metrics(test), 'per call', '{0:.6g}'))
+        return '\n'.join(tables)
 
     def report(self, stream):
         """
@@ -246,43 +1067,104 @@ class Pypete(Plugin):
         :param stream:
         :return:
         """
+        self.collect_results()
+        self.fit_complexities()
+        self.measure_drift()
         stream.writeln('Pypete results:')
         stream.writeln('repeat = {1} and number = {2}'.format(len(self.results), self.repeat, self.number))
         if self.prettytable:
             for r in self.results:
-                stream.writeln('{0}: '.format(str(r['test'])))
+                stream.writeln('{0}{1}: '.format(str(r['test']), ' [cached]' if 'reused' in r else ''))
                 stream.writeln(self.get_prettytable(r))
+                for line in extra_lines(r, self.baseline):
+                    stream.writeln(line)
+                if self.precision:
+                    stream.writeln('{0[repeat]} samples of number {0[number]}'.format(r))
         else:
             for r in self.results:
-                stream.writeln('{0} ... best {1[best]:.6f} s, avg {1[average]:.6f} s,'
-                               ' worst {1[worst]:.6f} s'.format(str(r['test']), r))
+                stream.writeln(summary_line(str(r['test']), r))
+                for line in detail_lines(r, self.precision) + extra_lines(r, self.baseline):
+                    stream.writeln(line)
+        if self.complexities:
+            self.report_complexities(stream)
+        if self.reference is not None and 'after' in self.reference:
+            self.report_reference(stream)
+        if self.suite_budget is not None:
+            stream.writeln('suite budget {0:.1f} s, {1:.1f} s left'.format(
+                self.scheduler.budget, self.scheduler.remaining))
+        for test, reason in self.not_benchmarked:
+            stream.writeln('{0} ... not benchmarked, {1}'.format(str(test), reason))
+        if self.fail_on_regression is not None:
+            self.report_regressions(stream)
         stream.writeln('')
 
+    def report_reference(self, stream):
+        """
+        Write noise and drift of machine measured by reference benchmark
+        :param stream:
+        :return:
+        """
+        reference = self.reference
+        stream.writeln('reference {0[time]:.6f} s before, {0[after]:.6f} s after suite, '
+                       'drift {0[drift]:+.1%}, noise {0[noise]:.1%}'.format(reference))
+        if self.noise_threshold is not None and max(abs(reference['drift']), reference['noise']) > \
+                self.noise_threshold:
+            stream.writeln('WARNING: machine noise exceeds {0:.1%}, results may be '
+                           'unreliable'.format(self.noise_threshold))
+
+    def report_complexities(self, stream):
+        """
+        Write fitted complexities of generator tests
+        :param stream:
+        :return:
+        """
+        stream.writeln('Complexity:')
+        for c in self.complexities:
+            line = '{0[group]} ... {0[complexity]}, {0[coefficient]:.3g} s * g(n) from {0[sizes]} sizes'.format(c)
+            if c['changed']:
+                line += ', changed from {0[previous]}'.format(c)
+            stream.writeln(line)
+
+    def report_regressions(self, stream):
+        """
+        Write summary of comparison with best run
+        :param stream:
+        :return:
+        """
+        compared = [r for r in self.results if r.get('regression')]
+        regressed = [r for r in compared if self.regression_messages(r)]
+        stream.writeln('Regressions: {0} of {1} compared tests worse by more than {2:.1%}'.format(
+            len(regressed), len(compared), self.fail_on_regression))
+        for r in regressed:
+            stream.writeln('{0} ... {1}'.format(str(r['test']), ', '.join(self.regression_messages(r))))
+
     def finalize(self, result):
         """
         Ran after all tests are done. If selected file option, save results of testing
         :param result:
         :return:
         """
-        if self.file:
+        self.collect_results()
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+        for comparison in self._comparisons.values():
+            comparison.close()
+        self._comparisons = {}
+        if self._worktree is not None:
+            self._worktree.remove()
+            self._worktree = None
+        # aborted run measured nothing, so results file is left as it is
+        if self.file and not self.aborted:
             stats = self.get_stats()
             with open(self.file, 'w') as f:
                 json.dump(stats, f, indent=2)
-
-    def _get_dict_experiment(self, info, test):
-        return {
-            'info': info,
-            'best': test['best'],
-            'avg': test['average'],
-            'worst': test['worst'],
-        }
-
-    def _new_record(self, dict_experiment):
-        return {
-            'last': dict_experiment,
-            'best': dict_experiment,
-            'worst': dict_experiment
-        }
+        for exporter in self.exporters:
+            exporter.close()
+        self.exporters = []
+        if self._history is not None:
+            self._history.close()
+            self._history = None
 
     def update_old_test(self, test_id, dict_experiment):
         """
@@ -291,32 +1173,41 @@ class Pypete(Plugin):
         :param dict_experiment: current results
         :return:
         """
-        try:
-            old_test = self.old_stats[test_id]
-        except KeyError:
-            return self._new_record(dict_experiment)
-        old_test['last'] = dict_experiment
-        if old_test['best']['avg'] > dict_experiment['avg']:
-            old_test['best'] = dict_experiment
-        if old_test['worst']['avg'] < dict_experiment['avg']:
-            old_test['worst'] = dict_experiment
-        return old_test
+        return update_record(self.old_stats.get(test_id), dict_experiment)
+
+    def get_info(self):
+        """
+        Return information about current run and its environment, created
+        once per run
+        :return: dict
+        """
+        if self.info is None:
+            self.info = run_info(self.core, baseline=self.baseline, reference=self.reference)
+        return self.info
 
     def get_stats(self):
         """
-        Return dictionary with stats to save
+        Return dictionary with stats to save. Records of tests that were not
+        benchmarked in this run, and with results file of tests that did not
+        run at all, are kept unchanged.
         :return: dict
         """
         result = {}
-        current_date = str(datetime.datetime.now())
-        info = {'date': current_date,
-                'repeat': self.repeat,
-                'number': self.number}
+        if isinstance(self.old_stats, dict):
+            result.update(self.old_stats)
+        for test, _ in self.not_benchmarked:
+            try:
+                result[test.id()] = self.old_stats[test.id()]
+            except (KeyError, TypeError):
+                pass
+        info = self.get_info()
         for test in self.results:
             test_id = test['test'].id()
-            dict_experiment = self._get_dict_experiment(info, test)
+            dict_experiment = experiment_record(info, test)
             if self.old_stats is None:
-                result[test_id] = self._new_record(dict_experiment)
+                result[test_id] = new_record(dict_experiment)
             else:
                 result[test_id] = self.update_old_test(test_id, dict_experiment)
+            if 'calibration' in test:
+                result[test_id]['calibration'] = test['calibration']
         return result
@@ -0,0 +1,43 @@
+"""
+Reference micro-benchmark measuring speed of Python interpreter on the
+machine. Results from different machines or from different times on one
+machine are made comparable by ratio of their reference times.
+"""
+from __future__ import division
+import timeit
+
+from pypete import stats as statistics
+
+
+# seconds of timed blocks of one reference measurement
+DURATION = 0.1
+
+# number of timed blocks of one reference measurement
+BLOCKS = 5
+
+
+def _workload():
+    # integer arithmetic, dict and list operations, string formatting and calls
+    counts = {}
+    for i in range(500):
+        key = i % 31
+        counts[key] = counts.get(key, 0) + i * i
+    values = sorted(counts.values(), reverse=True)
+    return len(''.join('{0:x}'.format(v) for v in values[:10]))
+
+
+def reference_time(duration=DURATION, blocks=BLOCKS):
+    """
+    Time of one call of reference workload, median of blocks of calls taking
+    together at least given duration. Number of calls in block is calibrated
+    first and one more block is run untimed, which warms the interpreter up.
+    :param duration: seconds of all timed blocks
+    :param blocks: number of timed blocks
+    :return: seconds
+    """
+    timer = timeit.Timer(_workload)
+    number = 1
+    while timer.timeit(number) < duration / blocks:
+        number *= 2
+    timer.timeit(number)
+    return statistics.median([timer.timeit(number) / number for _ in range(blocks)])
@@ -0,0 +1,119 @@
+"""
+Detection of regressions against results of earlier run. Timing regressed
+when one-sided Mann-Whitney U test finds current samples significantly
+slower and even the lower bound of bootstrap confidence interval of ratio
+of medians exceeds allowed regression, so noise alone does not fail a test.
+Results are compared with the best saved experiment, not the last one, so
+regression saved by earlier run fails again and slow drift by steps under
+the allowed regression fails once it adds up.
+"""
+from __future__ import division
+
+from pypete import stats as statistics
+
+
+# growth of retained blocks per call that is a regression at any threshold
+MIN_RETAINED_BLOCKS = 1
+
+
+def check_sample_size(repeat, alpha):
+    """
+    Raise error when samples of given size can never be significantly
+    different at alpha level
+    :param repeat: number of samples of current and earlier run
+    :param alpha: significance level
+    :return:
+    """
+    if statistics.minimal_p_value(repeat, repeat) > alpha:
+        needed = repeat
+        while statistics.minimal_p_value(needed, needed) > alpha:
+            needed += 1
+        raise ValueError('Regression test at significance {0:g} needs at least {1} samples, '
+                         'repeat is {2}'.format(alpha, needed, repeat))
+
+
+def compare_samples(samples, baseline, alpha, threshold):
+    """
+    Compare samples with baseline samples
+    :param samples: current samples
+    :param baseline: samples of earlier run
+    :param alpha: significance level
+    :param threshold: allowed relative regression
+    :return: dict with ratio of medians, its confidence interval, p-value and verdict
+    """
+    ratio = statistics.median(samples) / statistics.median(baseline)
+    low, high = statistics.ratio_bootstrap_interval(samples, baseline, confidence=1 - alpha)
+    p = statistics.mann_whitney(samples, baseline)
+    return {'ratio': ratio,
+            'low': low,
+            'high': high,
+            'p': p,
+            'regressed': p <= alpha and low - 1 > threshold}
+
+
+def compare_with_best(stats, best, alpha, threshold, factor=1.0):
+    """
+    Compare results of test with its best saved experiment. Peak memory,
+    which does not fluctuate, regressed when its ratio exceeds allowed
+    regression. Retained blocks per call, which stand for allocations per
+    call, regressed when they grew by allowed regression and by at least
+    MIN_RETAINED_BLOCKS.
+    :param stats: processed results of test
+    :param best: best saved experiment of test
+    :param alpha: significance level
+    :param threshold: allowed relative regression
+    :param factor: normalization of times of best experiment
+    :return: dict with comparisons and verdicts or None without baseline samples
+    """
+    if not best.get('samples'):
+        return None
+    regression = compare_samples(stats['samples'], [s * factor for s in best['samples']],
+                                 alpha, threshold)
+    if 'memory' in stats and 'memory' in best and best['memory']['peak'] > 0:
+        memory_ratio = stats['memory']['peak'] / best['memory']['peak']
+        regression['memory_ratio'] = memory_ratio
+        regression['memory_regressed'] = memory_ratio - 1 > threshold
+    if 'memory' in stats and 'retained_blocks' in best.get('memory', {}):
+        blocks = stats['memory']['retained_blocks']
+        best_blocks = best['memory']['retained_blocks']
+        regression['blocks'] = (best_blocks, blocks)
+        regression['blocks_regressed'] = \
+            blocks - best_blocks >= max(threshold * abs(best_blocks), MIN_RETAINED_BLOCKS)
+    sections = {}
+    for path, samples in stats.get('sections', {}).items():
+        baseline = best.get('sections', {}).get(path)
+        if not baseline or statistics.median(baseline) <= 0:
+            continue
+        sections[path] = compare_samples(samples, [s * factor for s in baseline],
+                                         alpha, threshold)
+    if sections:
+        regression['sections'] = sections
+    return regression
+
+
+def regression_messages(regression, alpha):
+    """
+    Return descriptions of regressions
+    :param regression: dict returned by compare_with_best or None
+    :param alpha: significance level
+    :return: list of strings
+    """
+    regression = regression or {}
+    messages = []
+
+    def describe(comparison):
+        return '{0:.1%} slower than best run ({1:.0%} CI {2:.1%} to {3:.1%}, p = {4:.3g})'.format(
+            comparison['ratio'] - 1, 1 - alpha, comparison['low'] - 1, comparison['high'] - 1,
+            comparison['p'])
+    if regression.get('regressed'):
+        messages.append(describe(regression))
+    if regression.get('memory_regressed'):
+        messages.append('peak memory {0:.1%} higher than best run'.format(
+            regression['memory_ratio'] - 1))
+    if regression.get('blocks_regressed'):
+        messages.append('retained blocks per call grew from {0[0]:.1f} to {0[1]:.1f}'
+                        ' since best run'.format(regression['blocks']))
+    for path, section in sorted(regression.get('sections', {}).items()):
+        if section['regressed']:
+            messages.append('section {0} {1}'.format(path, describe(section)))
+    return messages
@@ -0,0 +1,142 @@
+"""
+Text report of processed results of one test, shared by the plugin and
+standalone runner
+"""
+from __future__ import division
+
+from pypete import stats as statistics
+from pypete.resources import METRICS as RESOURCE_METRICS
+
+
+def summary_line(name, stats):
+    """
+    Return first line of report of test
+    :param name: name of test
+    :param stats: processed results
+    :return: string
+    """
+    return '{0} ... best {1[best]:.6f} s, avg {1[average]:.6f} s, worst {1[worst]:.6f} s{2}'.format(
+        name, stats, ', cached' if 'reused' in stats else '')
+
+
+def detail_lines(stats, samples=False):
+    """
+    Return lines with robust statistics, fixture, percentiles and memory
+    :param stats: processed results
+    :param samples: whether to report number of samples
+    :return: list of strings
+    """
+    lines = []
+    if samples:
+        lines.append('    {0[repeat]} samples of number {0[number]}'.format(stats))
+    if 'median' in stats:
+        lines.append('    median {0[median]:.6f} s, MAD {0[mad]:.6f} s, 95% CI'
+                     ' {0[ci][0]:.6f} - {0[ci][1]:.6f} s, {0[outliers]} outliers'.format(stats))
+    if 'fixture' in stats:
+        lines.append('    fixture {0[fixture]:.6f} s per call'.format(stats))
+    if 'percentiles' in stats:
+        percentiles = sorted(stats['percentiles'].items(), key=lambda item: float(item[0][1:]))
+        lines.append('    ' + ', '.join('{0} {1:.6f} s'.format(name, value)
+                                        for name, value in percentiles))
+    if 'memory' in stats:
+        lines.append('    memory peak {0[peak]} B, retained {0[retained]:.0f} B,'
+                     ' {0[retained_blocks]:.1f} retained blocks per call'.format(stats['memory']))
+    return lines
+
+
+def extra_lines(stats, baseline=None):
+    """
+    Return lines of optional measurements: memory allocating lines, profile,
+    speedup, concurrency, async, node, sections and resources
+    :param stats: processed results
+    :param baseline: name of baseline revision of speedup
+    :return: list of strings
+    """
+    lines = []
+    if 'memory' in stats:
+        lines.extend(memory_lines(stats['memory']))
+    if 'profile' in stats:
+        lines.extend(profile_lines(stats['profile']))
+    if 'speedup' in stats:
+        lines.append('    speedup {0[ratio]:.3f}x against {1} (95% CI {0[low]:.3f}x - {0[high]:.3f}x,'
+                     ' {0[pairs]} pairs)'.format(stats['speedup'], baseline))
+    if 'concurrency' in stats:
+        lines.extend(concurrency_lines(stats['concurrency']))
+    if 'async' in stats:
+        lines.append(async_line(stats['async']))
+    if 'node' in stats:
+        lines.append('    measured on node {0[address]}, timing scaled by {0[factor]:.3f}'.format(
+            stats['node']))
+    if 'sections' in stats:
+        lines.extend(section_lines(stats))
+    if 'resources' in stats:
+        lines.append('    resources per call: ' + ', '.join(
+            '{0} {1:.6g}'.format(name, stats['resources'][name])
+            for name in RESOURCE_METRICS if name in stats['resources']))
+    return lines
+
+
+def memory_lines(memory):
+    """
+    Return source lines that allocated most memory
+    :param memory: memory measurement
+    :return: list of strings
+    """
+    return ['    {0[file]}:{0[line]} {0[size]:.0f} B in {0[count]:.1f} blocks: {0[source]}'.format(line)
+            for line in memory['top']]
+
+
+def profile_lines(profile):
+    """
+    Return hotspots of profile and changes since previous profile
+    :param profile: profile measurement
+    :return: list of strings
+    """
+    lines = ['    hotspots per call, cumulative time:']
+    lines.extend('      {0[cumtime]:.6f} s {0[calls]:>10.1f} calls  {0[function]}'.format(f)
+                 for f in profile['top'])
+    if 'diff' in profile:
+        lines.append('    changes since previous profile:')
+        lines.extend('      {0[delta]:+.6f} s  {0[function]}'.format(d) for d in profile['diff'])
+    return lines
+
+
+def concurrency_lines(concurrency):
+    """
+    Return throughput and scaling efficiency curve of concurrency levels
+    :param concurrency: concurrency measurement
+    :return: list of strings
+    """
+    return ['    {0:>3} {1:<9} {2[throughput]:>12.1f} ops/s, latency {2[latency]:.6f} s,'
+            ' efficiency {2[efficiency]:>6.1%} {3}'.format(
+                level['level'], kind, level, '#' * int(round(level['efficiency'] * 20)))
+            for kind in ('threads', 'processes') for level in concurrency.get(kind, [])]
+
+
+def section_lines(stats):
+    """
+    Return nested breakdown of sections, time per call and share of test
+    :param stats: processed results
+    :return: list of strings
+    """
+    lines = ['    sections per call:']
+    for path in sorted(stats['sections']):
+        per_call = statistics.mean(stats['sections'][path])
+        share = per_call / stats['average'] if stats['average'] > 0 else 0.0
+        lines.append('    {0}{1} {2:.6f} s ({3:.1%})'.format(
+            '  ' * (path.count('/') + 1), path.rsplit('/', 1)[-1], per_call, share))
+    return lines
+
+
+def async_line(measurement):
+    """
+    Return throughput of coroutine test
+    :param measurement: async measurement
+    :return: string
+    """
+    if measurement['tasks']:
+        calls = '{0} concurrent tasks per call'.format(measurement['tasks'])
+    else:
+        calls = 'one await per call'
+    return '    {0} loop, {1}, throughput {2:.1f} tasks/s'.format(
+        measurement['loop'], calls, measurement['throughput'])
@@ -0,0 +1,86 @@
+"""
+Resource usage of benchmark from ``resource.getrusage`` and ``/proc/self``.
+Snapshots are taken before and after the timed experiments and their
+difference is divided by number of calls. Counters not available on the
+platform are left out.
+"""
+from __future__ import division
+import sys
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+# name -> (getrusage field, scale)
+_RUSAGE = {
+    'user': ('ru_utime', 1),
+    'system': ('ru_stime', 1),
+    'voluntary_switches': ('ru_nvcsw', 1),
+    'involuntary_switches': ('ru_nivcsw', 1),
+    'minor_faults': ('ru_minflt', 1),
+    'major_faults': ('ru_majflt', 1),
+    # kilobytes on Linux, bytes on macOS
+    'max_rss': ('ru_maxrss', 1 if sys.platform == 'darwin' else 1024),
+}
+
+# name -> (file in /proc/self, key, scale)
+_PROC = {
+    'read': ('io', 'rchar', 1),
+    'written': ('io', 'wchar', 1),
+    'rss': ('status', 'VmRSS', 1024),
+}
+
+# metrics that are not divided by number of calls
+TOTALS = ('max_rss', 'rss')
+
+METRICS = ('user', 'system', 'voluntary_switches', 'involuntary_switches',
+           'minor_faults', 'major_faults', 'read', 'written', 'max_rss', 'rss')
+
+
+def _read_proc(name):
+    values = {}
+    try:
+        with open('/proc/self/{0}'.format(name)) as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                values[key] = value.split()
+    except (IOError, OSError):
+        pass
+    return values
+
+
+def snapshot():
+    """
+    Return current resource counters of process
+    :return: dict name -> value
+    """
+    values = {}
+    if resource is not None:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        for name, (field, scale) in _RUSAGE.items():
+            values[name] = getattr(usage, field) * scale
+    proc = dict((name, _read_proc(name)) for name in set(p[0] for p in _PROC.values()))
+    for name, (source, key, scale) in _PROC.items():
+        if key in proc[source]:
+            values[name] = int(proc[source][key][0]) * scale
+    return values
+
+
+def usage(before, after, calls):
+    """
+    Return resource usage between two snapshots per call. User and system
+    time are in seconds, I/O and memory in bytes. Max RSS and RSS are
+    growth over all calls.
+    :param before: snapshot
+    :param after: snapshot
+    :param calls: number of calls between snapshots
+    :return: dict name -> value
+    """
+    result = {}
+    for name in METRICS:
+        if name in before and name in after:
+            delta = after[name] - before[name]
+            result[name] = delta if name in TOTALS else delta / calls
+    return result
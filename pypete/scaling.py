@@ -0,0 +1,81 @@
+"""
+Empirical complexity of generator tests. Generator decorated by
+``pypete.complexity`` declares which argument of yielded cases is size of
+input, time per call of its cases is then fitted by models ``c * g(n)``
+and the model with the smallest relative error is reported.
+"""
+from __future__ import division
+import math
+
+
+# name -> growth function, ordered from the simplest; logarithm of n + 1 is
+# positive for every size, so series starting at size 1 can be logarithmic
+MODELS = [
+    ('O(1)', lambda n: 1.0),
+    ('O(log n)', lambda n: math.log(n + 1, 2)),
+    ('O(n)', lambda n: float(n)),
+    ('O(n log n)', lambda n: n * math.log(n + 1, 2)),
+    ('O(n^2)', lambda n: float(n) ** 2),
+]
+
+
+def complexity(size=0):
+    """
+    Mark generator test so that complexity of yielded cases is fitted
+
+        @pypete.complexity(size=0)
+        def test_sort():
+            for n in (100, 1000, 10000):
+                yield sort_random, n
+
+    :param size: index of argument of yielded cases that is size of input or
+        function taking the arguments and returning size
+    :return: decorator
+    """
+    def decorator(func):
+        func.pypete_complexity = {'size': size}
+        return func
+    return decorator
+
+
+def case_size(marker, arg):
+    """
+    Return size of input of yielded case
+    :param marker: dict set by complexity decorator
+    :param arg: arguments of yielded case
+    :return: number
+    """
+    size = marker['size']
+    if callable(size):
+        return size(*arg)
+    return arg[size]
+
+
+def fit(sizes, times):
+    """
+    Fit times by every model with least squares of relative errors and
+    return the best fit. Fits within 10% of the smallest error prefer the
+    simpler model.
+    :param sizes: sizes of input
+    :param times: times per call
+    :return: dict with complexity, coefficient and relative error of every model
+    """
+    errors = {}
+    coefficients = {}
+    for name, growth in MODELS:
+        try:
+            g = [growth(n) for n in sizes]
+        except ValueError:
+            continue
+        if any(x <= 0 for x in g):
+            continue
+        coefficient = sum(x / t for x, t in zip(g, times)) / sum((x / t) ** 2 for x, t in zip(g, times))
+        errors[name] = math.sqrt(sum((1 - coefficient * x / t) ** 2 for x, t in zip(g, times)) / len(g))
+        coefficients[name] = coefficient
+    smallest = min(errors.values())
+    best = next(name for name, _ in MODELS
+                if name in errors and errors[name] <= smallest * 1.1 + 1e-12)
+    return {'complexity': best,
+            'coefficient': coefficients[best],
+            'error': errors[best],
+            'errors': errors}
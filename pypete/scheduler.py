@@ -0,0 +1,71 @@
+"""
+Scheduling of time budget of the whole suite among benchmarks
+"""
+from __future__ import division
+
+from pypete import stats as statistics
+
+
+def history_weight(old_test):
+    """
+    Weight of test by its history. Noisy tests (by coefficient of variation
+    of samples of last run) and tests whose last run was more than 10% slower
+    than best run get bigger share of budget.
+    :param old_test: saved record of test with last, best and worst or None
+    :return: float between 1 and 6
+    """
+    if old_test is None:
+        return 1.0
+    weight = 1.0
+    samples = old_test['last'].get('samples')
+    if samples and len(samples) > 1:
+        mean = statistics.mean(samples)
+        if mean > 0:
+            weight += min(10 * statistics.stdev(samples) / mean, 4.0)
+    if old_test['last']['avg'] > 1.1 * old_test['best']['avg']:
+        weight += 1.0
+    return weight
+
+
+class Scheduler(object):
+    """
+    Splits budget of suite among tests. Every test gets share of remaining
+    budget given by its weight relative to the mean weight of tests expected
+    to remain. Expected number of tests is taken from history; without it
+    every test gets at most tenth of the remaining budget.
+    """
+
+    def __init__(self, budget, expected_tests=None):
+        self.budget = budget
+        self.remaining = budget
+        self.expected_tests = expected_tests
+        self.done = 0
+        self.weights = 0.0
+
+    def allocate(self, weight, limit=None):
+        """
+        Return time budget of next test
+        :param weight: weight of test
+        :param limit: maximal budget of one test
+        :return: seconds
+        """
+        mean_weight = self.weights / self.done if self.done else 1.0
+        if self.expected_tests:
+            others = max(self.expected_tests - self.done - 1, 0)
+        else:
+            others = 9
+        share = max(self.remaining, 0) * weight / (weight + others * mean_weight)
+        if limit is not None:
+            share = min(share, limit)
+        return share
+
+    def spend(self, weight, seconds):
+        """
+        Record that test finished
+        :param weight: weight of test
+        :param seconds: time spent by test
+        :return:
+        """
+        self.remaining -= seconds
+        self.weights += weight
+        self.done += 1
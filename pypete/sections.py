@@ -0,0 +1,134 @@
+"""
+Timers of sections of benchmarked code. Code under test marks its phases
+
+    with pypete.section('parse'):
+        ...
+
+or decorates functions by ``@pypete.timed_section``. Without running
+benchmark ``section`` returns shared context manager doing nothing. During
+timed experiments time of every section is summed per experiment, nested
+sections are recorded under path of names joined by ``/``.
+"""
+import functools
+import time
+
+
+_recorder = None
+
+
+class _NullSection(object):
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SECTION = _NullSection()
+
+
+class _Section(object):
+
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self):
+        recorder = self.recorder
+        recorder.stack.append(self.name)
+        self.path = '/'.join(recorder.stack)
+        self.start = recorder.timer()
+        return self
+
+    def __exit__(self, *exc_info):
+        recorder = self.recorder
+        elapsed = recorder.timer() - self.start
+        recorder.stack.pop()
+        totals = recorder.totals
+        totals[self.path] = totals.get(self.path, 0) + elapsed
+        return False
+
+
+def section(name):
+    """
+    Context manager timing section of code
+    :param name: name of section
+    :return: context manager
+    """
+    if _recorder is None:
+        return _NULL_SECTION
+    return _Section(_recorder, name)
+
+
+def timed_section(name=None):
+    """
+    Decorator timing every call of function as section, used either as
+    ``@timed_section`` named by function or ``@timed_section('name')``
+    :param name: name of section or decorated function
+    :return: decorator or decorated function
+    """
+    def decorator(func, name=name):
+        name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _recorder is None:
+                return func(*args, **kwargs)
+            with _Section(_recorder, name):
+                return func(*args, **kwargs)
+        return wrapper
+    if callable(name):
+        return decorator(name, None)
+    return decorator
+
+
+class Recorder(object):
+    """
+    Sums of section times in nanoseconds in current experiment and time per
+    call of every section in finished experiments
+    """
+
+    def __init__(self, timer=time.perf_counter_ns):
+        self.timer = timer
+        self.stack = []
+        self.totals = {}
+        self.samples = {}
+        self.experiments = 0
+
+    def finish_experiment(self, number):
+        """
+        Close current experiment, sections not entered in it get zero
+        :param number: number of calls in experiment
+        :return:
+        """
+        for path in set(self.samples) | set(self.totals):
+            self.samples.setdefault(path, [0.0] * self.experiments).append(
+                self.totals.get(path, 0) / number / 1e9)
+        self.totals = {}
+        self.experiments += 1
+
+
+class SectionTimer(object):
+    """
+    Timer recording sections during experiments of wrapped timer
+    """
+
+    def __init__(self, timer):
+        self.timer = timer
+        self.recorder = Recorder()
+
+    def timeit(self, number):
+        global _recorder
+        _recorder = self.recorder
+        try:
+            return self.timer.timeit(number)
+        finally:
+            _recorder = None
+            self.recorder.finish_experiment(number)
+
+    def repeat(self, repeat, number):
+        return [self.timeit(number) for _ in range(repeat)]
+
+    def __getattr__(self, name):
+        return getattr(self.timer, name)
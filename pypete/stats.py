@@ -0,0 +1,365 @@
+"""
+Statistical helpers for evaluation of timings. Samples are kept in compact
+``array('d')`` buffers; when NumPy is installed robust statistics and
+bootstrap work on them as vectors without copying, otherwise pure Python
+implementation is used. NumPy is imported on first use, so tools that only
+read results start fast.
+"""
+from __future__ import division
+import math
+import random
+from array import array
+from collections import Counter
+
+_NUMPY = []
+
+
+def _numpy():
+    """
+    Import NumPy on first use
+    :return: numpy module or None if it is not installed
+    """
+    if not _NUMPY:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        _NUMPY.append(numpy)
+    return _NUMPY[0]
+
+
+# two-sided 95% quantiles of Student's t-distribution for 1 to 30 degrees of freedom
+_T_95 = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+         2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+         2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
+_Z_95 = 1.96
+
+
+def mean(values):
+    return sum(values) / len(values)
+
+
+def median(values):
+    ordered = sorted(values)
+    n = len(ordered)
+    middle = n // 2
+    if n % 2:
+        return ordered[middle]
+    return (ordered[middle - 1] + ordered[middle]) / 2
+
+
+def stdev(values):
+    """
+    Sample standard deviation
+    """
+    n = len(values)
+    if n < 2:
+        return 0.0
+    m = mean(values)
+    return math.sqrt(sum((x - m) ** 2 for x in values) / (n - 1))
+
+
+def mean_interval(values):
+    """
+    95% confidence interval of mean using Student's t-distribution
+    :param values: samples
+    :return: tuple low, high
+    """
+    n = len(values)
+    m = mean(values)
+    if n < 2:
+        return m, m
+    t = _T_95[n - 2] if n - 2 < len(_T_95) else _Z_95
+    half = t * stdev(values) / math.sqrt(n)
+    return m - half, m + half
+
+
+def median_interval(values):
+    """
+    Distribution free 95% confidence interval of median based on order
+    statistics. For few samples the interval is range of samples.
+    :param values: samples
+    :return: tuple low, high
+    """
+    ordered = sorted(values)
+    n = len(ordered)
+    half = _Z_95 * math.sqrt(n) / 2
+    low = max(int(math.floor(n / 2 - half)), 0)
+    high = min(int(math.ceil(n / 2 + half)), n - 1)
+    return ordered[low], ordered[high]
+
+
+def ratio_interval(numerators, denominators):
+    """
+    Geometric mean of paired ratios with its 95% confidence interval,
+    computed as interval of mean of logarithms of ratios
+    :param numerators: samples
+    :param denominators: samples paired with numerators
+    :return: tuple ratio, low, high
+    """
+    logs = [math.log(x / y) for x, y in zip(numerators, denominators) if x > 0 and y > 0]
+    if not logs:
+        return float('nan'), float('nan'), float('nan')
+    low, high = mean_interval(logs)
+    return math.exp(mean(logs)), math.exp(low), math.exp(high)
+
+
+def relative_precision(values, statistic='mean'):
+    """
+    Half width of 95% confidence interval relative to the estimate
+    :param values: samples
+    :param statistic: 'mean' or 'median'
+    :return: float, infinity if estimate is zero
+    """
+    if statistic == 'median':
+        low, high = median_interval(values)
+        estimate = median(values)
+    else:
+        low, high = mean_interval(values)
+        estimate = mean(values)
+    if estimate <= 0:
+        return float('inf')
+    return (high - low) / 2 / estimate
+
+
+def _u_distribution(m, n):
+    """
+    Number of orderings of samples of sizes m and n for every value of
+    Mann-Whitney U statistic, computed by recurrence
+    f(m, n, u) = f(m - 1, n, u - n) + f(m, n - 1, u)
+    """
+    # table[j] holds counts for current i and j, rows are built up in i
+    table = [[1] for _ in range(n + 1)]
+    for i in range(1, m + 1):
+        row = [[1]]
+        for j in range(1, n + 1):
+            previous_i = table[j]
+            previous_j = row[j - 1]
+            counts = [0] * (i * j + 1)
+            for u, count in enumerate(previous_i):
+                counts[u + j] += count
+            for u, count in enumerate(previous_j):
+                counts[u] += count
+            row.append(counts)
+        table = row
+    return table[n]
+
+
+def _rank_sum(x, y):
+    """
+    Sum of ranks of x in pooled samples, tied values get average rank
+    """
+    pooled = sorted([(v, 0) for v in x] + [(v, 1) for v in y])
+    total = 0.0
+    i = 0
+    while i < len(pooled):
+        j = i
+        while j + 1 < len(pooled) and pooled[j + 1][0] == pooled[i][0]:
+            j += 1
+        rank = (i + j) / 2 + 1
+        total += rank * sum(1 for k in range(i, j + 1) if pooled[k][1] == 0)
+        i = j + 1
+    return total
+
+
+def mann_whitney(x, y):
+    """
+    One-sided Mann-Whitney U test of hypothesis that values in x tend to be
+    greater than values in y. Exact distribution is used for small samples
+    without ties, normal approximation with tie correction otherwise.
+    U is computed from ranks, so large samples take O((m + n) log(m + n)).
+    :param x: samples
+    :param y: samples
+    :return: p-value
+    """
+    m, n = len(x), len(y)
+    u = _rank_sum(x, y) - m * (m + 1) / 2
+    counter = Counter(x)
+    counter.update(y)
+    ties = len(counter) != m + n
+    if not ties and m * n <= 400:
+        counts = _u_distribution(m, n)
+        return sum(counts[int(math.ceil(u)):]) / sum(counts)
+    total = m + n
+    tie_sum = sum(t ** 3 - t for t in counter.values() if t > 1)
+    variance = m * n / 12 * ((total + 1) - tie_sum / (total * (total - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (u - m * n / 2 - 0.5) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def as_array(values):
+    """
+    Return samples as compact buffer of doubles
+    :param values: samples
+    :return: array('d')
+    """
+    if isinstance(values, array) and values.typecode == 'd':
+        return values
+    return array('d', values)
+
+
+def _vector(values):
+    numpy = _numpy()
+    return numpy.frombuffer(as_array(values), dtype=numpy.float64)
+
+
+def _percentile(ordered, q):
+    """
+    Percentile of sorted values with linear interpolation
+    """
+    position = (len(ordered) - 1) * q / 100
+    low = int(math.floor(position))
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def quartiles(values):
+    """
+    First and third quartile of samples
+    :param values: samples
+    :return: tuple q1, q3
+    """
+    numpy = _numpy()
+    if numpy is not None:
+        q1, q3 = numpy.percentile(_vector(values), [25, 75])
+        return float(q1), float(q3)
+    ordered = sorted(values)
+    return _percentile(ordered, 25), _percentile(ordered, 75)
+
+
+def mad(values):
+    """
+    Median absolute deviation from median
+    :param values: samples
+    :return: float
+    """
+    numpy = _numpy()
+    if numpy is not None:
+        vector = _vector(values)
+        return float(numpy.median(numpy.abs(vector - numpy.median(vector))))
+    m = median(values)
+    return median([abs(x - m) for x in values])
+
+
+def reject_outliers(values, k=1.5):
+    """
+    Remove samples outside of Tukey fences, i.e. further than k times
+    interquartile range from quartiles
+    :param values: samples
+    :param k: multiple of interquartile range
+    :return: array('d') of kept samples
+    """
+    q1, q3 = quartiles(values)
+    low, high = q1 - k * (q3 - q1), q3 + k * (q3 - q1)
+    numpy = _numpy()
+    if numpy is not None:
+        vector = _vector(values)
+        return as_array(vector[(vector >= low) & (vector <= high)])
+    return array('d', [x for x in values if low <= x <= high])
+
+
+def bootstrap_interval(values, resamples=1000, confidence=0.95, seed=0):
+    """
+    Percentile bootstrap confidence interval of median. With NumPy
+    resamples are drawn and reduced as matrix in batches of about million
+    samples.
+    :param values: samples
+    :param resamples: number of bootstrap resamples
+    :param confidence: confidence level
+    :param seed: seed of random generator, so intervals are reproducible
+    :return: tuple low, high
+    """
+    n = len(values)
+    if n < 2:
+        return (values[0], values[0]) if n else (float('nan'), float('nan'))
+    numpy = _numpy()
+    if numpy is not None:
+        vector = _vector(values)
+        generator = numpy.random.default_rng(seed)
+        batch = max(1, min(resamples, 1000000 // n))
+        estimates = []
+        for start in range(0, resamples, batch):
+            indexes = generator.integers(0, n, size=(min(batch, resamples - start), n))
+            estimates.append(numpy.median(vector[indexes], axis=1))
+        low, high = numpy.percentile(numpy.concatenate(estimates),
+                                     [(1 - confidence) / 2 * 100, (1 + confidence) / 2 * 100])
+        return float(low), float(high)
+    generator = random.Random(seed)
+    estimates = sorted(median(generator.choices(values, k=n)) for _ in range(resamples))
+    return (_percentile(estimates, (1 - confidence) / 2 * 100),
+            _percentile(estimates, (1 + confidence) / 2 * 100))
+
+
+def ratio_bootstrap_interval(numerators, denominators, resamples=1000, confidence=0.95,
+                             seed=0):
+    """
+    Percentile bootstrap confidence interval of ratio of medians of two
+    independent samples, both samples are resampled
+    :param numerators: samples
+    :param denominators: samples
+    :param resamples: number of bootstrap resamples
+    :param confidence: confidence level
+    :param seed: seed of random generator, so intervals are reproducible
+    :return: tuple low, high
+    """
+    numpy = _numpy()
+    if numpy is not None:
+        generator = numpy.random.default_rng(seed)
+        estimates = []
+        for values in (numerators, denominators):
+            vector = _vector(values)
+            indexes = generator.integers(0, len(vector), size=(resamples, len(vector)))
+            estimates.append(numpy.median(vector[indexes], axis=1))
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            ratios = estimates[0] / estimates[1]
+        low, high = numpy.percentile(ratios, [(1 - confidence) / 2 * 100,
+                                              (1 + confidence) / 2 * 100])
+        return float(low), float(high)
+    generator = random.Random(seed)
+    estimates = []
+    for _ in range(resamples):
+        denominator = median(generator.choices(denominators, k=len(denominators)))
+        numerator = median(generator.choices(numerators, k=len(numerators)))
+        estimates.append(numerator / denominator if denominator > 0 else float('inf'))
+    estimates.sort()
+    return (_percentile(estimates, (1 - confidence) / 2 * 100),
+            _percentile(estimates, (1 + confidence) / 2 * 100))
+
+
+def minimal_p_value(m, n):
+    """
+    Smallest p-value one-sided Mann-Whitney U test of samples of given
+    sizes can reach, i.e. when all values of one sample exceed the other
+    :param m: size of first sample
+    :param n: size of second sample
+    :return: float
+    """
+    return 1 / math.comb(m + n, m)
+
+
+def summarize(values):
+    """
+    Robust statistics of samples: median, median absolute deviation,
+    interquartile range, standard deviation, number of outliers and
+    bootstrap confidence interval of median
+    :param values: samples
+    :return: dict
+    """
+    values = as_array(values)
+    q1, q3 = quartiles(values)
+    numpy = _numpy()
+    if numpy is not None:
+        vector = _vector(values)
+        m = float(numpy.median(vector))
+        deviation = float(vector.std(ddof=1)) if len(vector) > 1 else 0.0
+    else:
+        m = median(values)
+        deviation = stdev(values)
+    return {'median': m,
+            'mad': mad(values),
+            'iqr': q3 - q1,
+            'stdev': deviation,
+            'outliers': len(values) - len(reject_outliers(values)),
+            'ci': bootstrap_interval(values)}
@@ -0,0 +1,94 @@
+"""
+Timers with control of garbage collector and subtraction of loop overhead
+"""
+from __future__ import division
+import gc
+import time
+import timeit
+from contextlib import contextmanager
+
+
+def _seconds(timer_ns):
+    def timer():
+        return timer_ns() / 1e9
+    return timer
+
+
+# name -> (timer in seconds, timer in nanoseconds)
+TIMERS = {
+    'perf_counter': (time.perf_counter, time.perf_counter_ns),
+    'perf_counter_ns': (_seconds(time.perf_counter_ns), time.perf_counter_ns),
+    'process_time_ns': (_seconds(time.process_time_ns), time.process_time_ns),
+    'thread_time_ns': (_seconds(time.thread_time_ns), time.thread_time_ns),
+}
+
+GC_MODES = ('off', 'on', 'collect')
+
+
+@contextmanager
+def gc_control(mode):
+    """
+    Set garbage collector for experiment: ``off`` disables it, ``on``
+    enables it and ``collect`` collects garbage first and disables it
+    :param mode: one of GC_MODES
+    :return:
+    """
+    enabled = gc.isenabled()
+    if mode == 'collect':
+        gc.collect()
+    if mode == 'on':
+        gc.enable()
+    else:
+        gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+        else:
+            gc.disable()
+
+
+def _noop():
+    pass
+
+
+_loop_overhead = {}
+
+
+def loop_overhead(timer, calls=10000, repeat=5):
+    """
+    Time of one iteration of timeit loop calling empty function, i.e. what is
+    measured besides the test itself. Result is cached per timer.
+    :param timer: timer in seconds
+    :param calls: number of calls in one measurement
+    :param repeat: number of measurements, minimum is taken
+    :return: seconds
+    """
+    if timer not in _loop_overhead:
+        empty = timeit.Timer(_noop, timer=timer)
+        _loop_overhead[timer] = min(empty.repeat(repeat=repeat, number=calls)) / calls
+    return _loop_overhead[timer]
+
+
+class Timer(timeit.Timer):
+    """
+    timeit.Timer with garbage collector mode and subtraction of loop overhead
+    """
+
+    def __init__(self, stmt, setup, timer=time.perf_counter, gc_mode='off'):
+        if gc_mode == 'on':
+            # timeit disables collector before setup is run
+            def setup_with_gc(setup=setup):
+                gc.enable()
+                setup()
+            setup = setup_with_gc
+        super(Timer, self).__init__(stmt, setup, timer)
+        self.gc_mode = gc_mode
+        self.overhead = loop_overhead(timer)
+
+    def timeit(self, number=timeit.default_number):
+        if self.gc_mode == 'collect':
+            gc.collect()
+        timing = super(Timer, self).timeit(number)
+        return max(timing - number * self.overhead, 0.0)
@@ -0,0 +1,129 @@
+"""
+Parallel execution of benchmarks in forked worker processes. Every slot of
+the pool owns one CPU core and the worker running in it is pinned to that core
+with ``os.sched_setaffinity``, so benchmarks running at the same time do not
+compete for the same core. When more cores are available the first one is
+kept for the coordinator, i.e. nose process running correctness tests, which
+is pinned to it while the pool exists.
+"""
+import os
+import logging
+import traceback
+import multiprocessing
+import multiprocessing.connection
+
+
+log = logging.getLogger('nose.plugins.pypete')
+
+
+def available_cores():
+    """
+    Return list of cores the current process is allowed to run on
+    :return: list of core numbers
+    """
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(multiprocessing.cpu_count()))
+
+
+def pin_to_core(core):
+    """
+    Pin current process to given core if platform supports it
+    :param core: core number
+    :return:
+    """
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, [core])
+
+
+def pin_to_cores(cores):
+    """
+    Pin current process to given cores if platform supports it
+    :param cores: core numbers
+    :return:
+    """
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cores)
+
+
+def _worker(core, connection, func, args):
+    pin_to_core(core)
+    try:
+        result = (True, func(*args, core=core))
+    except Exception:
+        result = (False, traceback.format_exc())
+    connection.send(result)
+    connection.close()
+
+
+class WorkerPool(object):
+    """
+    Pool of worker processes pinned to dedicated cores. Worker is forked for
+    every submitted job, so it sees the test exactly as nose loaded it; job is
+    called with the core as keyword argument.
+    """
+
+    def __init__(self, workers):
+        self.cores = available_cores()
+        worker_cores = self.cores[1:] if len(self.cores) > 1 else self.cores
+        if workers > len(worker_cores):
+            log.warning('Only %d cores available for workers, using %d workers instead of %d',
+                        len(worker_cores), len(worker_cores), workers)
+        if len(self.cores) > 1:
+            pin_to_core(self.cores[0])
+        else:
+            log.warning('Single core is shared by workers and nose process')
+        self.worker_cores = worker_cores[:workers]
+        self.free_cores = list(self.worker_cores)
+        self.running = {}
+        self.done = {}
+        self._context = multiprocessing.get_context('fork')
+
+    def submit(self, key, func, *args):
+        """
+        Run ``func(*args, core=core)`` in worker pinned to a free core. Blocks
+        while all cores are busy.
+        :param key: key under which result will be returned by join
+        :param func: function to run
+        :param args: arguments of function
+        :return:
+        """
+        while not self.free_cores:
+            self._wait()
+        core = self.free_cores.pop(0)
+        receiver, sender = self._context.Pipe(duplex=False)
+        process = self._context.Process(target=_worker, args=(core, sender, func, args))
+        process.start()
+        sender.close()
+        self.running[core] = (key, process, receiver)
+
+    def _wait(self):
+        connections = dict((running[2], core) for core, running in self.running.items())
+        for connection in multiprocessing.connection.wait(list(connections)):
+            core = connections[connection]
+            key, process, receiver = self.running.pop(core)
+            try:
+                self.done[key] = receiver.recv()
+            except EOFError:
+                self.done[key] = (False, 'Worker exited with code {0}'.format(process.exitcode))
+            receiver.close()
+            process.join()
+            self.free_cores.append(core)
+
+    def join(self):
+        """
+        Wait for all submitted jobs
+        :return: dict key -> (success, result or formatted traceback)
+        """
+        while self.running:
+            self._wait()
+        done, self.done = self.done, {}
+        return done
+
+    def close(self):
+        """
+        Wait for running jobs and release the core of coordinator
+        :return:
+        """
+        self.join()
+        pin_to_cores(self.cores)
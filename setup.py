@@ -21,6 +21,10 @@ setup(name='pypete',
       entry_points={
           'nose.plugins.0.10': [
               'pypete = pypete:Pypete'
+          ],
+          'console_scripts': [
+              'pypete = pypete.cli:main',
+              'pypete-worker = pypete.node:main'
           ]
       }
 )
\ No newline at end of file
@@ -0,0 +1,116 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from pypete.cli import compare, format_result, iter_items, write_records
+
+
+class IterItemsTest(unittest.TestCase):
+    data = {'a': 1, 'b': [1.5, 2.25, {'c': 'x, y}'}], 'long.test.id': 12345678, 'e': None}
+
+    def test_items(self):
+        text = json.dumps(self.data, indent=2)
+        for size in (1, 2, 3, 7, 1 << 16):
+            self.assertEqual(list(iter_items(io.StringIO(text), size)), list(self.data.items()))
+
+    def test_number_split_by_chunk(self):
+        self.assertEqual(list(iter_items(io.StringIO('{"a": 123456789}'), 9)), [('a', 123456789)])
+        self.assertEqual(list(iter_items(io.StringIO('{"a":123456789}'), 7)), [('a', 123456789)])
+
+    def test_empty(self):
+        self.assertEqual(list(iter_items(io.StringIO(' { } '))), [])
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            list(iter_items(io.StringIO('[1, 2]')))
+        with self.assertRaises(ValueError):
+            list(iter_items(io.StringIO('{"a": 1')))
+
+
+def _record(samples):
+    experiment = {'info': {'date': '2020-01-01'},
+                  'best': min(samples), 'avg': sum(samples) / len(samples),
+                  'worst': max(samples), 'median': sorted(samples)[len(samples) // 2],
+                  'repeat': len(samples), 'number': 1, 'samples': samples}
+    return {'last': experiment, 'best': experiment, 'worst': experiment}
+
+
+class CompareTest(unittest.TestCase):
+
+    class options(object):
+        alpha = 0.05
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, records):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as f:
+            json.dump(records, f)
+        return path
+
+    def test_compare(self):
+        baseline = self.write('baseline.json', {
+            'slower': _record([1.0, 1.01, 0.99, 1.02, 0.98, 1.0]),
+            'same': _record([1.0, 1.01, 0.99, 1.02, 0.98, 1.0]),
+            'removed': _record([1.0])})
+        candidate = self.write('candidate.json', {
+            'slower': _record([2.0, 2.01, 1.99, 2.02, 1.98, 2.0]),
+            'same': _record([1.0, 1.01, 0.99, 1.02, 0.98, 1.0]),
+            'added': _record([1.0])})
+        out = io.StringIO()
+        self.assertEqual(compare(self.options, baseline, candidate, out), 1)
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith('slower ...'))
+        self.assertTrue(lines[0].endswith('2.000x, slower'))
+        self.assertTrue(lines[1].endswith('no significant change'))
+        self.assertTrue(lines[2].endswith('new'))
+        self.assertTrue(lines[3].startswith('removed ...'))
+
+
+class WriteRecordsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'pypete.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def load(self):
+        with open(self.path) as f:
+            return json.load(f)
+
+    def test_new_file(self):
+        write_records(self.path, {'b': {'x': 2}, 'a': {'x': 1}})
+        self.assertEqual(self.load(), {'a': {'x': 1}, 'b': {'x': 2}})
+
+    def test_update_keeps_other_records(self):
+        with open(self.path, 'w') as f:
+            json.dump({'a': {'x': 1}, 'b': {'x': [1.5, 2.5]}}, f)
+        write_records(self.path, {'a': {'x': 3}, 'c': {'x': None}})
+        self.assertEqual(self.load(), {'a': {'x': 3}, 'b': {'x': [1.5, 2.5]}, 'c': {'x': None}})
+        self.assertFalse(os.path.exists(self.path + '.tmp'))
+
+
+class FormatResultTest(unittest.TestCase):
+
+    def test_format(self):
+        stats = {'best': 1.0, 'average': 2.0, 'worst': 3.0, 'median': 2.0, 'mad': 0.5,
+                 'ci': (1.5, 2.5), 'outliers': 0, 'repeat': 3, 'number': 10,
+                 'percentiles': {'p99.9': 3.0, 'p50': 2.0, 'p90': 2.5}}
+        lines = format_result('test', stats)
+        self.assertEqual(lines[0], 'test ... best 1.000000 s, avg 2.000000 s, worst 3.000000 s')
+        self.assertEqual(lines[1], '    3 samples of number 10')
+        self.assertTrue(lines[2].startswith('    median 2.000000 s, MAD 0.500000 s'))
+        self.assertEqual(lines[3], '    p50 2.000000 s, p90 2.500000 s, p99.9 3.000000 s')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+import time
+import unittest
+
+from pypete.core import Benchmark
+
+
+class SleepingTimer(object):
+
+    def __init__(self, duration):
+        self.duration = duration
+        self.calls = 0
+
+    def timeit(self, number):
+        self.calls += 1
+        time.sleep(self.duration)
+        return 0.001 * (1 + self.calls % 2)
+
+
+class SampleTest(unittest.TestCase):
+
+    def test_precision(self):
+        timing = Benchmark(repeat=3, precision=10.0).sample(SleepingTimer(0), 1)
+        self.assertEqual(len(timing), 3)
+
+    def test_max_samples(self):
+        timing = Benchmark(repeat=3, precision=0.0001, max_samples=7).sample(SleepingTimer(0), 1)
+        self.assertEqual(len(timing), 7)
+
+    def test_budget_from_first_experiment(self):
+        benchmark = Benchmark(repeat=20, precision=0.0001)
+        self.assertLess(len(benchmark.sample(SleepingTimer(0.01), 1, budget=0.03)), 20)
+        self.assertEqual(len(benchmark.sample(SleepingTimer(0.01), 1, budget=0)), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
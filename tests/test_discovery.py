@@ -0,0 +1,51 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+from pypete.discovery import discover, import_path
+
+
+class ImportPathTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = list(sys.path)
+        self.modules = set(sys.modules)
+
+    def tearDown(self):
+        sys.path[:] = self.path
+        for name in set(sys.modules) - self.modules:
+            del sys.modules[name]
+        shutil.rmtree(self.directory)
+
+    def write(self, name, source):
+        path = os.path.join(self.directory, name)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as f:
+            f.write(source)
+        return path
+
+    def test_same_file(self):
+        path = self.write('bench_same.py', 'value = 1\n')
+        self.assertIs(import_path(path), import_path(path))
+
+    def test_same_name_in_other_directories(self):
+        first = import_path(self.write('a/bench_twice.py', 'value = 1\n'))
+        second = import_path(self.write('b/bench_twice.py', 'value = 2\n'))
+        self.assertNotEqual(first.__name__, second.__name__)
+        self.assertEqual((first.value, second.value), (1, 2))
+
+    def test_discover(self):
+        self.write('a/bench_twice.py', 'def bench_a():\n    pass\n')
+        self.write('b/bench_twice.py', 'def bench_b():\n    pass\n')
+        ids = [bench_id for bench_id, case in discover([self.directory])]
+        self.assertEqual(len(ids), 2)
+        self.assertTrue(ids[0].endswith('.bench_a'))
+        self.assertTrue(ids[1].endswith('.bench_b'))
+
+
+if __name__ == '__main__':
+    unittest.main()
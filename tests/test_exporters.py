@@ -0,0 +1,74 @@
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+from xml.etree import ElementTree
+
+from pypete.exporters import JUnitExporter, create_exporter, parse_export
+
+
+STATS = {'best': 1.0, 'median': 1.5, 'average': 1.6, 'worst': 2.0, 'repeat': 3, 'number': 10,
+         'ci': (1.2, 1.8), 'outliers': 1}
+
+INFO = {'date': '2020-01-01 00:00:00.123456'}
+
+
+class ExportersTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def export(self, fmt):
+        path = os.path.join(self.directory, 'results.' + fmt)
+        exporter = create_exporter('{0}:{1}'.format(fmt, path), INFO)
+        exporter.write('tests.Test.test_a', STATS)
+        exporter.skip('tests.test_gen(0.5,)', 'benchmark did not pass')
+        exporter.close()
+        return path
+
+    def test_parse_export(self):
+        self.assertEqual(parse_export('csv:a:b.csv'), ('csv', 'a:b.csv'))
+        for spec in ('csv', 'csv:', 'xml:out.xml'):
+            with self.assertRaises(ValueError):
+                parse_export(spec)
+
+    def test_junit_names(self):
+        self.assertEqual(JUnitExporter.names('tests.Test.test_a'), ('"tests.Test"', '"test_a"'))
+        self.assertEqual(JUnitExporter.names('tests.test_gen(0.5, "a.b")'),
+                         ('"tests"', '\'test_gen(0.5, "a.b")\''))
+
+    def test_junit(self):
+        suite = ElementTree.parse(self.export('junit')).getroot().find('testsuite')
+        self.assertEqual(suite.get('timestamp'), '2020-01-01T00:00:00')
+        measured, skipped = suite.findall('testcase')
+        self.assertEqual(measured.get('classname'), 'tests.Test')
+        self.assertEqual(float(measured.get('time')), 1.5)
+        properties = dict((p.get('name'), p.get('value')) for p in measured.iter('property'))
+        self.assertEqual(properties['ci_high'], '1.8')
+        self.assertEqual(skipped.get('name'), 'test_gen(0.5,)')
+        self.assertEqual(skipped.find('skipped').get('message'), 'benchmark did not pass')
+
+    def test_csv(self):
+        with open(self.export('csv'), newline='') as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['test'], 'tests.Test.test_a')
+        self.assertEqual(float(rows[0]['median']), 1.5)
+        self.assertEqual(rows[0]['cached'], '0')
+
+    def test_openmetrics(self):
+        path = self.export('openmetrics')
+        self.assertFalse(os.path.exists(path + '.tmp'))
+        with open(path) as f:
+            lines = f.read().splitlines()
+        self.assertIn('pypete_benchmark_seconds{test="tests.Test.test_a",statistic="median"} 1.5',
+                      lines)
+        self.assertEqual(lines[-1], '# EOF')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import pypete
+
+
+MODULE = '''
+def test_membership(value='gamma'):
+    assert value in {'alpha', 'beta', 'gamma', 'delta', ('x', 'y')}
+'''
+
+SCRIPT = '''
+import fingerprinted
+from pypete.fingerprint import code_fingerprint, dependency_fingerprint
+print(code_fingerprint(fingerprinted.test_membership))
+print(dependency_fingerprint(fingerprinted.test_membership))
+'''
+
+
+class FingerprintTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        with open(os.path.join(self.directory, 'fingerprinted.py'), 'w') as f:
+            f.write(MODULE)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def fingerprints(self, seed):
+        env = dict(os.environ, PYTHONHASHSEED=str(seed), PYTHONPATH=os.pathsep.join(
+            [self.directory, os.path.dirname(os.path.dirname(os.path.abspath(pypete.__file__)))]))
+        return subprocess.check_output([sys.executable, '-c', SCRIPT], env=env,
+                                       cwd=self.directory).split()
+
+    def test_same_in_every_process(self):
+        fingerprints = set(tuple(self.fingerprints(seed)) for seed in range(1, 6))
+        self.assertEqual(len(fingerprints), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+
+from pypete.fixtures import BatchedTimer, PedanticTimer
+
+
+calls = []
+
+
+class StatefulCase(unittest.TestCase):
+
+    def __init__(self, methodName='runTest'):
+        super(StatefulCase, self).__init__(methodName)
+        self.state = []
+
+    def setUp(self):
+        self.state.append('setUp')
+
+    def tearDown(self):
+        self.state.append('tearDown')
+
+    def body(self):
+        calls.append(list(self.state))
+
+
+class TimerTest(unittest.TestCase):
+
+    def setUp(self):
+        del calls[:]
+
+    def test_batched_sets_up_new_instances(self):
+        timer = BatchedTimer(StatefulCase('body'))
+        timer.timeit(5)
+        self.assertEqual(calls, [['setUp']] * 5)
+        self.assertEqual(len(timer.fixture), 1)
+
+    def test_pedantic(self):
+        case = StatefulCase('body')
+        PedanticTimer(case).timeit(2)
+        self.assertEqual(calls, [['setUp'], ['setUp', 'tearDown', 'setUp']])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+
+from pypete.histogram import Histogram, record_calls
+
+
+class HistogramTest(unittest.TestCase):
+
+    def test_small_values_are_exact(self):
+        histogram = Histogram(precision=8)
+        for value in range(1, 101):
+            histogram.record(value)
+        self.assertEqual(histogram.percentile(50), 50)
+        self.assertEqual(histogram.percentile(100), 100)
+        self.assertEqual(histogram.percentiles((50, 99)), {'p50': 50, 'p99': 99})
+
+    def test_relative_error(self):
+        histogram = Histogram(precision=8)
+        for value in (10 ** 3, 10 ** 6, 10 ** 9):
+            histogram.record(value)
+        for percent, value in ((1, 10 ** 3), (50, 10 ** 6), (100, 10 ** 9)):
+            self.assertLess(abs(histogram.percentile(percent) / value - 1), 2 ** -7)
+
+    def test_count_and_clamp(self):
+        histogram = Histogram(precision=4, max_bits=10)
+        histogram.record(-5, count=3)
+        histogram.record(10 ** 9)
+        self.assertEqual(histogram.total, 4)
+        self.assertEqual(histogram.percentile(75), 0)
+        self.assertLessEqual(histogram.percentile(100), 1 << 10)
+
+    def test_empty(self):
+        self.assertIsNone(Histogram().percentile(50))
+
+    def test_record_calls(self):
+        calls = []
+        histogram = record_calls(lambda: calls.append(1), 50)
+        self.assertEqual(len(calls), 50)
+        self.assertEqual(histogram.total, 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import os
+import sys
+import time
+import shutil
+import socket
+import tempfile
+import unittest
+import importlib
+import subprocess
+
+from pypete.core import Benchmark
+from pypete.isolate import IsolationError
+from pypete.node import Node
+
+
+class NodeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.address = os.path.join(self.directory, 'node.sock')
+        self.output = os.path.join(self.directory, 'calls')
+        self.path = list(sys.path)
+        # source of both versions of test module has the same size and maybe
+        # modification time, so cached bytecode could hide the change
+        self.dont_write_bytecode = sys.dont_write_bytecode
+        sys.dont_write_bytecode = True
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(p for p in sys.path if p),
+                   PYTHONDONTWRITEBYTECODE='1')
+        env.pop('PYPETE_AUTHKEY', None)
+        self.node = subprocess.Popen([sys.executable, '-m', 'pypete.node', self.address],
+                                     env=env, stderr=subprocess.DEVNULL)
+        # socket file exists as soon as it is bound, node listens a bit later
+        deadline = time.time() + 10
+        while True:
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.address)
+                break
+            except OSError:
+                self.assertLess(time.time(), deadline, 'node did not start')
+                time.sleep(0.01)
+            finally:
+                probe.close()
+
+    def tearDown(self):
+        self.node.terminate()
+        self.node.wait()
+        sys.path[:] = self.path
+        sys.dont_write_bytecode = self.dont_write_bytecode
+        sys.modules.pop('node_case', None)
+        shutil.rmtree(self.directory)
+
+    def write_case(self, version):
+        with open(os.path.join(self.directory, 'node_case.py'), 'w') as f:
+            f.write('import unittest\n\n\n'
+                    'class Case(unittest.TestCase):\n'
+                    '    def test(self):\n'
+                    '        with open({0!r}, "a") as f:\n'
+                    '            f.write({1!r})\n'.format(self.output, str(version)))
+        sys.modules.pop('node_case', None)
+        importlib.invalidate_caches()
+        sys.path.insert(0, self.directory)
+        try:
+            return importlib.import_module('node_case').Case('test')
+        finally:
+            sys.path.remove(self.directory)
+
+    def calls(self, case, path=True):
+        if os.path.exists(self.output):
+            os.unlink(self.output)
+        if path:
+            sys.path.insert(0, self.directory)
+        try:
+            node = Node(self.address)
+        finally:
+            if path:
+                sys.path.remove(self.directory)
+        try:
+            node.load(Benchmark(), case)
+            node.experiments(number=2)
+        finally:
+            node.close()
+        with open(self.output) as f:
+            return f.read()
+
+    def test_module_changed_between_connections(self):
+        self.assertEqual(self.calls(self.write_case(1)), '11')
+        self.assertEqual(self.calls(self.write_case(2)), '22')
+
+    def test_path_of_coordinator_not_kept(self):
+        self.calls(self.write_case(1))
+        with self.assertRaises(IsolationError):
+            self.calls(self.write_case(1), path=False)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,243 @@
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import tempfile
+import unittest
+import subprocess
+
+
+# nose 1.3.7 uses ABC aliases removed from collections in Python 3.10
+NOSE = ('import collections, collections.abc\n'
+        'collections.Callable = collections.abc.Callable\n'
+        'import nose\n'
+        'nose.main()\n')
+
+SUITE = '''import os
+import unittest
+
+
+def record(name):
+    with open(os.path.join(os.path.dirname(__file__), 'calls'), 'a') as f:
+        f.write('{0} {1}\\n'.format(os.getpid(), name))
+
+
+class Case(unittest.TestCase):
+
+    def test_pass(self):
+        record('pass')
+
+    def test_fail(self):
+        record('fail')
+        self.fail('broken')
+'''
+
+
+class PluginTestCase(unittest.TestCase):
+    """
+    Runs nose with the plugin on suite written to temporary directory
+    """
+    suite = SUITE
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.results_file = os.path.join(self.directory, 'pypete.json')
+        self.write('suite.py', self.suite)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, source):
+        with open(os.path.join(self.directory, name), 'w') as f:
+            f.write(source)
+
+    def nose(self, *args, **env):
+        """
+        Run nose with the plugin on suite with few fast experiments
+        :return: tuple of exit code and output
+        """
+        command = [sys.executable, '-c', NOSE, '--with-pypete', '--pypete-file', self.results_file,
+                   '--pypete-repeat', '3', '--pypete-number', '5'] + list(args) + ['suite.py']
+        process = subprocess.run(command, cwd=self.directory, stdout=subprocess.PIPE,
+                                 stderr=subprocess.STDOUT, universal_newlines=True,
+                                 env=dict(os.environ, **env), timeout=300)
+        return process.returncode, process.stdout
+
+    def results(self):
+        with open(self.results_file) as f:
+            return json.load(f)
+
+    def calls(self):
+        """
+        Return calls of test bodies and reset them
+        :return: list of tuples of pid of calling process and name of test
+        """
+        path = os.path.join(self.directory, 'calls')
+        with open(path) as f:
+            calls = [(int(pid), name) for pid, name in (line.split() for line in f)]
+        os.unlink(path)
+        return calls
+
+
+class WorkersTest(PluginTestCase):
+
+    def test_workers(self):
+        code, output = self.nose('--pypete-workers', '1')
+        self.assertEqual(code, 1, output)
+        self.assertIn('FAIL: test_fail', output)
+        self.assertEqual(list(self.results()), ['suite.Case.test_pass'])
+        self.assertRegex(output, r'test_pass \(suite\.Case\S*\) \.\.\. best')
+        # correctness runs in nose process, benchmark in forked worker
+        self.assertEqual(len(set(pid for pid, name in self.calls())), 2)
+
+
+class CalibrationCacheTest(PluginTestCase):
+
+    def calibrate(self):
+        code, output = self.nose('--pypete-number', '0', '--pypete-calibration-tolerance', '10')
+        self.assertEqual(code, 1, output)
+        return self.results()['suite.Case.test_pass']
+
+    def test_cached_time_per_call(self):
+        record = self.calibrate()
+        self.assertIn('per_call', record['calibration'])
+        # number follows threshold of 0.1 s from cached time per call
+        record['calibration']['per_call'] = 0.025
+        with open(self.results_file, 'w') as f:
+            json.dump({'suite.Case.test_pass': record}, f)
+        self.assertEqual(self.calibrate()['last']['number'], 4)
+        # changed code of test is calibrated again
+        self.write('suite.py', self.suite.replace("        record('pass')\n",
+                                                  "        record('pass')\n" * 2, 1))
+        self.assertNotEqual(self.calibrate()['last']['number'], 4)
+
+
+class RunOnceTest(PluginTestCase):
+
+    def test_run_once(self):
+        code, output = self.nose()
+        self.assertEqual(code, 1, output)
+        self.assertIn('FAIL: test_fail', output)
+        self.assertRegex(output, r'test_fail \(suite\.Case\S*\) \.\.\. not benchmarked')
+        calls = [name for pid, name in self.calls()]
+        # one correctness run and 3 experiments of 5 calls, failing test runs once
+        self.assertEqual(calls.count('pass'), 16)
+        self.assertEqual(calls.count('fail'), 1)
+        self.assertEqual(list(self.results()), ['suite.Case.test_pass'])
+
+
+class IsolateTest(PluginTestCase):
+
+    def test_isolate(self):
+        code, output = self.nose('--pypete-isolate')
+        self.assertEqual(code, 1, output)
+        self.assertNotIn('benchmarked in process', output)
+        calls = self.calls()
+        # benchmark runs in fresh interpreter, not in nose process
+        self.assertEqual(len(set(pid for pid, name in calls if name == 'pass')), 2)
+        self.assertEqual(self.results()['suite.Case.test_pass']['last']['repeat'], 3)
+
+
+@unittest.skipIf(shutil.which('git') is None, 'git is not available')
+class BaselineTest(PluginTestCase):
+    suite = 'from work import work\n\n\ndef test_work():\n    work()\n'
+
+    def git(self, *args):
+        subprocess.check_call(('git', '-c', 'user.name=test', '-c', 'user.email=test@example.com')
+                              + args, cwd=self.directory, stdout=subprocess.DEVNULL)
+
+    def test_speedup(self):
+        self.write('work.py', 'def work():\n    return sum(range(100))\n')
+        self.git('init', '-q')
+        self.git('add', 'suite.py', 'work.py')
+        self.git('commit', '-q', '-m', 'baseline')
+        self.write('work.py', 'def work():\n    return sum(range(10000))\n')
+        code, output = self.nose('--pypete-baseline', 'HEAD', '--pypete-baseline-pairs', '4')
+        self.assertEqual(code, 0, output)
+        self.assertIn('against HEAD', output)
+        speedup = self.results()['suite.test_work']['last']['speedup']
+        self.assertEqual(speedup['pairs'], 4)
+        self.assertLess(speedup['ratio'], 0.5)
+
+
+class ChangedOnlyTest(PluginTestCase):
+
+    def test_changed_only(self):
+        self.nose('--pypete-changed-only')
+        self.calls()
+        code, output = self.nose('--pypete-changed-only')
+        self.assertEqual(code, 1, output)
+        self.assertRegex(output, r'test_pass \(suite\.Case\S*\) \.\.\. best .*, cached')
+        # cached test still runs once for correctness
+        self.assertEqual(sorted(name for pid, name in self.calls()), ['fail', 'pass'])
+        self.assertIn('reused', self.results()['suite.Case.test_pass']['last'])
+        self.write('suite.py', self.suite.replace("        record('pass')\n",
+                                                  "        record('pass')\n" * 2, 1))
+        code, output = self.nose('--pypete-changed-only')
+        self.assertNotIn('cached', output)
+        self.assertNotIn('reused', self.results()['suite.Case.test_pass']['last'])
+
+
+class NodeTest(PluginTestCase):
+
+    def setUp(self):
+        super(NodeTest, self).setUp()
+        self.address = os.path.join(self.directory, 'node.sock')
+        env = dict(os.environ)
+        env.pop('PYPETE_AUTHKEY', None)
+        self.node = subprocess.Popen([sys.executable, '-m', 'pypete.node', self.address],
+                                     env=env, stderr=subprocess.DEVNULL)
+        # socket file exists as soon as it is bound, node listens a bit later
+        deadline = time.time() + 10
+        while True:
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.address)
+                break
+            except OSError:
+                self.assertLess(time.time(), deadline, 'node did not start')
+                time.sleep(0.01)
+            finally:
+                probe.close()
+
+    def tearDown(self):
+        self.node.terminate()
+        self.node.wait()
+        super(NodeTest, self).tearDown()
+
+    def test_node(self):
+        code, output = self.nose('--pypete-nodes', self.address)
+        self.assertEqual(code, 1, output)
+        self.assertIn('measured on node', output)
+        node = self.results()['suite.Case.test_pass']['last']['node']
+        self.assertEqual(node['address'], self.address)
+        calls = self.calls()
+        self.assertEqual(len(set(pid for pid, name in calls if name == 'pass')), 2)
+
+
+class EnvironmentTest(PluginTestCase):
+
+    def test_recorded(self):
+        code, output = self.nose()
+        self.assertEqual(code, 1, output)
+        self.assertRegex(output, r'reference .* s before, .* s after suite, drift')
+        info = self.results()['suite.Case.test_pass']['last']['info']
+        self.assertEqual(info['environment']['cpus'], os.cpu_count())
+        self.assertIn('python', info['environment'])
+        self.assertGreater(info['reference']['time'], 0)
+        self.assertIn('drift', info['reference'])
+
+    def test_noisy_machine_aborts(self):
+        code, output = self.nose('--pypete-noise-threshold', '0%', '--pypete-noise-action', 'abort')
+        self.assertEqual(code, 1, output)
+        self.assertIn('Machine is noisy', output)
+        self.assertIn('FAIL: test_fail', output)
+        # tests still run once for correctness, nothing is benchmarked or saved
+        self.assertEqual(sorted(name for pid, name in self.calls()), ['fail', 'pass'])
+        self.assertFalse(os.path.exists(self.results_file))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,18 @@
+import timeit
+import unittest
+
+from pypete.reference import reference_time
+
+
+class ReferenceTimeTest(unittest.TestCase):
+
+    def test_duration(self):
+        start = timeit.default_timer()
+        time = reference_time(duration=0.05, blocks=5)
+        self.assertGreaterEqual(timeit.default_timer() - start, 0.05)
+        self.assertGreater(time, 0)
+        self.assertLess(time, 0.01)
+
+
+if __name__ == '__main__':
+    unittest.main()
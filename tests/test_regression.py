@@ -0,0 +1,45 @@
+import unittest
+
+from pypete.regression import compare_with_best, regression_messages
+
+
+SAMPLES = [1.0, 1.01, 0.99, 1.02, 0.98, 1.0]
+
+
+def _stats(blocks, peak=1000):
+    return {'samples': SAMPLES,
+            'memory': {'peak': peak, 'retained': 0, 'retained_blocks': blocks}}
+
+
+class CompareWithBestTest(unittest.TestCase):
+
+    def compare(self, stats, best):
+        return regression_messages(compare_with_best(stats, best, 0.05, 0.1), 0.05)
+
+    def test_same(self):
+        self.assertEqual(self.compare(_stats(2), _stats(2)), [])
+
+    def test_slower(self):
+        stats = dict(_stats(2), samples=[2 * s for s in SAMPLES])
+        messages = self.compare(stats, _stats(2))
+        self.assertEqual(len(messages), 1)
+        self.assertIn('slower than best run', messages[0])
+
+    def test_peak_memory(self):
+        self.assertEqual(self.compare(_stats(2, peak=2000), _stats(2)),
+                         ['peak memory 100.0% higher than best run'])
+
+    def test_retained_blocks(self):
+        self.assertEqual(self.compare(_stats(1), _stats(0)),
+                         ['retained blocks per call grew from 0.0 to 1.0 since best run'])
+        self.assertEqual(self.compare(_stats(0.5), _stats(0)), [])
+        self.assertEqual(self.compare(_stats(105), _stats(100)), [])
+
+    def test_without_memory_of_best(self):
+        best = _stats(0)
+        del best['memory']
+        self.assertEqual(self.compare(_stats(5), best), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
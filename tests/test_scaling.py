@@ -0,0 +1,41 @@
+import math
+import unittest
+
+from pypete.scaling import case_size, fit
+
+
+class ScalingTest(unittest.TestCase):
+    sizes = [10, 100, 1000, 10000]
+
+    def test_linear(self):
+        result = fit(self.sizes, [2e-6 * n for n in self.sizes])
+        self.assertEqual(result['complexity'], 'O(n)')
+        self.assertAlmostEqual(result['coefficient'], 2e-6)
+        self.assertAlmostEqual(result['error'], 0.0)
+
+    def test_quadratic(self):
+        self.assertEqual(fit(self.sizes, [1e-9 * n * n for n in self.sizes])['complexity'],
+                         'O(n^2)')
+
+    def test_n_log_n(self):
+        self.assertEqual(fit(self.sizes, [n * math.log(n, 2) for n in self.sizes])['complexity'],
+                         'O(n log n)')
+
+    def test_simpler_model_preferred(self):
+        self.assertEqual(fit(self.sizes, [1.0, 1.01, 0.99, 1.0])['complexity'], 'O(1)')
+
+    def test_series_from_size_one(self):
+        sizes = [1, 10, 100, 1000, 10000]
+        self.assertEqual(fit(sizes, [1 + math.log(n, 2) for n in sizes])['complexity'],
+                         'O(log n)')
+        self.assertEqual(fit(sizes, [1 + n * math.log(n, 2) for n in sizes])['complexity'],
+                         'O(n log n)')
+        self.assertEqual(fit(sizes, [2.0 * n for n in sizes])['complexity'], 'O(n)')
+
+    def test_case_size(self):
+        self.assertEqual(case_size({'size': 1}, ('a', 5)), 5)
+        self.assertEqual(case_size({'size': lambda items: len(items)}, ([1, 2, 3],)), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
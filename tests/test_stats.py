@@ -0,0 +1,106 @@
+import unittest
+
+from pypete import stats
+
+
+class StatsTest(unittest.TestCase):
+
+    def test_median(self):
+        self.assertEqual(stats.median([3, 1, 2]), 2)
+        self.assertEqual(stats.median([4, 1, 3, 2]), 2.5)
+
+    def test_stdev(self):
+        self.assertAlmostEqual(stats.stdev([2, 4, 4, 4, 5, 5, 7, 9]), 2.138089935)
+        self.assertEqual(stats.stdev([1]), 0.0)
+
+    def test_mean_interval(self):
+        low, high = stats.mean_interval([1.0, 2.0, 3.0])
+        self.assertAlmostEqual((low + high) / 2, 2.0)
+        self.assertAlmostEqual(high - 2.0, 4.303 / 3 ** 0.5)
+        self.assertEqual(stats.mean_interval([5.0]), (5.0, 5.0))
+
+    def test_median_interval_contains_median(self):
+        values = list(range(100))
+        low, high = stats.median_interval(values)
+        self.assertLess(low, 49.5)
+        self.assertGreater(high, 49.5)
+
+    def test_relative_precision(self):
+        self.assertEqual(stats.relative_precision([0.0, 0.0]), float('inf'))
+        self.assertAlmostEqual(stats.relative_precision([1.0, 1.0, 1.0], 'median'), 0.0)
+
+    def test_ratio_interval(self):
+        ratio, low, high = stats.ratio_interval([2.0, 4.0, 6.0], [1.0, 2.0, 3.0])
+        self.assertAlmostEqual(ratio, 2.0)
+        self.assertAlmostEqual(low, 2.0)
+        self.assertAlmostEqual(high, 2.0)
+
+    def test_mann_whitney_exact(self):
+        slower = [10, 11, 12, 13, 14]
+        faster = [1, 2, 3, 4, 5]
+        self.assertAlmostEqual(stats.mann_whitney(slower, faster), stats.minimal_p_value(5, 5))
+        self.assertAlmostEqual(stats.mann_whitney(faster, slower), 1.0)
+
+    def test_mann_whitney_ties(self):
+        p = stats.mann_whitney([1, 1, 2, 2], [1, 1, 2, 2])
+        self.assertGreater(p, 0.3)
+        self.assertLess(p, 0.7)
+
+    def test_rank_sum_ties(self):
+        self.assertEqual(stats._rank_sum([1, 2], [2, 3]), 1 + 2.5)
+
+    def test_minimal_p_value(self):
+        self.assertAlmostEqual(stats.minimal_p_value(3, 3), 1 / 20)
+
+
+class RobustStatsTest(unittest.TestCase):
+    """
+    Robust statistics with NumPy, when it is installed
+    """
+    values = [1.0, 2.0, 3.0, 4.0, 100.0]
+
+    def test_quartiles(self):
+        self.assertEqual(stats.quartiles(self.values), (2.0, 4.0))
+
+    def test_mad(self):
+        self.assertEqual(stats.mad(self.values), 1.0)
+
+    def test_reject_outliers(self):
+        self.assertEqual(list(stats.reject_outliers(self.values)), [1.0, 2.0, 3.0, 4.0])
+
+    def test_bootstrap_interval(self):
+        low, high = stats.bootstrap_interval(self.values)
+        self.assertLessEqual(low, 3.0)
+        self.assertGreaterEqual(high, 3.0)
+        self.assertEqual(stats.bootstrap_interval(self.values), (low, high))
+        self.assertEqual(stats.bootstrap_interval([2.0]), (2.0, 2.0))
+
+    def test_ratio_bootstrap_interval(self):
+        low, high = stats.ratio_bootstrap_interval([2.0, 2.1, 1.9, 2.0], [1.0, 1.05, 0.95, 1.0])
+        self.assertLessEqual(low, 2.0)
+        self.assertGreaterEqual(high, 2.0)
+
+    def test_summarize(self):
+        summary = stats.summarize(self.values)
+        self.assertEqual(summary['median'], 3.0)
+        self.assertEqual(summary['mad'], 1.0)
+        self.assertEqual(summary['iqr'], 2.0)
+        self.assertEqual(summary['outliers'], 1)
+        self.assertLessEqual(summary['ci'][0], 3.0)
+
+
+class PurePythonStatsTest(RobustStatsTest):
+    """
+    Robust statistics without NumPy
+    """
+
+    def setUp(self):
+        self.numpy = stats._NUMPY[:]
+        stats._NUMPY[:] = [None]
+
+    def tearDown(self):
+        stats._NUMPY[:] = self.numpy
+
+
+if __name__ == '__main__':
+    unittest.main()